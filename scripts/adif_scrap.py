@@ -1,23 +1,55 @@
 import sys
 import os
 import time
-import json
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import json
+from urllib.parse import urljoin
+
+from lxml import html as lxml_html
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from esperas import EsperaTabla
+from navegador import crear_driver, driver_vivo, soltar_driver
+import filtro_red
+import instrumentacion
+import publicacion
+from sesion_http import crear_sesion
 
 # --- CONFIGURACIÓN ---
-URL_ADIF = "https://www.adif.es/w/71801-barcelona-sants?pageFromPlid=335"
+URL_ADIF = os.environ.get("URL_ADIF", "https://www.adif.es/w/71801-barcelona-sants?pageFromPlid=335")
 OUTPUT_FILE = os.path.join(os.getcwd(), "public", "trenes_sants.json")
+SELECTOR_FILAS = "#horas-trenes-estacion-llegadas tbody tr"
+SELECTOR_CARGAR_MAS = "#tabla-horas-trenes-llegadas-load-more input"
+WHITELIST = ["AVE", "AVLO", "OUIGO", "IRYO", "ALVIA", "EUROMED", "INTERCITY", "TGV", "LD", "MD", "AVANT"]
+# "bulk" = toda la tabla en una sola llamada execute_script; "celda" = modo clásico (~5 round-trips por tren)
+MODO_EXTRACCION = os.environ.get("ADIF_EXTRACCION", "bulk")
+REINTENTOS = int(os.environ.get("ADIF_REINTENTOS", "1")) # Reintentos con Chrome nuevo si el navegador muere
+
+# Texto de las celdas de las filas a partir de la n-ésima, en una sola llamada: la tabla
+# entera en la extracción bulk y solo lo nuevo tras cada "Cargar más" para no perderlo si
+# Chrome muere (innerText conserva el salto de línea del <br>).
+JS_CELDAS_DESDE = """
+var filas = document.querySelectorAll(arguments[0]), out = [];
+for (var i = arguments[1]; i < filas.length; i++) {
+    var celdas = filas[i].querySelectorAll('td'), fila = [];
+    for (var j = 0; j < celdas.length; j++) fila.push(celdas[j].innerText || '');
+    out.push(fila);
+}
+return out;
+"""
 
 def click_js(driver, elemento):
     driver.execute_script("arguments[0].click();", elemento)
 
+# Regex compiladas una vez (antes se recompilaban/buscaban por cada fila)
+RE_PREFIJO_TREN = re.compile(r'^(RF|RI|MD|R\d+|IL)\s*-\s*')
+RE_HORA = re.compile(r"\d{2}:\d{2}")
+# Una sola regex con todas las marcas = any(marca in texto for marca in WHITELIST)
+RE_WHITELIST = re.compile("|".join(re.escape(m) for m in WHITELIST))
+RE_EXCLUIDOS = re.compile("RODALIES|CERCANIAS")
+RE_ESPACIOS = re.compile(r"[^\S\n]+")
+
 def limpiar_hora(texto_hora):
     """Si hay salto de línea (12:00\n12:10), nos quedamos con la última."""
     if not texto_hora: return ""
@@ -27,140 +59,351 @@ def limpiar_hora(texto_hora):
 def limpiar_nombre_tren(texto_sucio):
     # Convierte "RF - AVE 03662" en "AVE 03662"
     texto = texto_sucio.replace('\n', ' ')
-    limpio = re.sub(r'^(RF|RI|MD|R\d+|IL)\s*-\s*', '', texto)
+    limpio = RE_PREFIJO_TREN.sub('', texto)
     return limpio.strip()
 
-def obtener_trenes():
+def procesar_celdas(textos):
+    """Textos de las celdas de una fila -> {hora, origen, tren, via}, o None si no es de larga distancia."""
+    if len(textos) < 3: return None
+
+    hora_raw = textos[0].strip()
+    origen = textos[1].strip()
+    tipo_raw = textos[2].strip().upper()
+    via = textos[3].strip() if len(textos) > 3 else "-"
+
+    # Limpieza
+    hora_real = limpiar_hora(hora_raw)
+    tipo_limpio = limpiar_nombre_tren(tipo_raw)
+
+    # Validaciones
+    if not RE_HORA.match(hora_real): return None
+
+    # Filtros
+    if not RE_WHITELIST.search(tipo_limpio) or RE_EXCLUIDOS.search(tipo_raw): return None
+    return {
+        "hora": hora_real,
+        "origen": origen,
+        "tren": tipo_limpio,
+        "via": via
+    }
+
+def normalizar_celda(texto):
+    # Igual que WebElement.text: espacios (y &nbsp;) colapsados, líneas recortadas y sin vacías
+    lineas = (RE_ESPACIOS.sub(" ", l).strip() for l in texto.split("\n"))
+    return "\n".join(l for l in lineas if l)
+
+def celdas_desde(driver, desde=0):
+    """[[texto_celda, ...], ...] de las filas a partir de `desde`, en una sola llamada."""
+    filas = driver.execute_script(JS_CELDAS_DESDE, SELECTOR_FILAS, desde)
+    return [[normalizar_celda(t) for t in fila[:4]] for fila in filas]
+
+def celdas_por_elemento(driver):
+    """Modo clásico (fallback): find_elements + .text por celda, ~5 round-trips WebDriver por fila."""
+    celdas = []
+    for fila in driver.find_elements(By.CSS_SELECTOR, SELECTOR_FILAS):
+        try:
+            celdas.append([celda.text for celda in fila.find_elements(By.TAG_NAME, "td")[:4]])
+        except: continue
+    return celdas
+
+def trenes_de_celdas(filas_celdas):
+    return [t for t in (procesar_celdas(c) for c in filas_celdas) if t]
+
+# --- MOTOR HTTP (SIN CHROME) ---
+# El portlet de Liferay responde a los POST del formulario y a la paginación sin JavaScript:
+# reproducimos esas peticiones con una sesión keep-alive y leemos la tabla con lxml.
+# Sin verificar contra la web real, así que por defecto seguimos con Selenium; en "auto" solo
+# aceptamos la tabla HTTP si la paginación termina de forma inequívoca, si no caemos a Selenium.
+MOTOR = os.environ.get("ADIF_MOTOR", "selenium") # selenium | auto | http
+CAMPOS_EXTRA_HTTP = json.loads(os.environ.get("ADIF_HTTP_CAMPOS", "{}")) # Sobrescriben los del formulario
+MIN_TRENES_HTTP = 10 # Sants recibe decenas al día: menos que esto = respuesta sospechosa -> fallback
+MAX_PAGINAS_HTTP = 30
+XPATH_FILAS = "//*[@id='horas-trenes-estacion-llegadas']//tbody/tr"
+XPATH_CARGAR_MAS = "//*[@id='tabla-horas-trenes-llegadas-load-more']//input"
+ETIQUETAS_BLOQUE = {"div", "p", "li", "ul", "ol", "tr", "table", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+def _oculto(el):
+    estilo = (el.get("style") or "").replace(" ", "").lower()
+    return el.get("hidden") is not None or "display:none" in estilo
+
+def texto_celda(celda):
+    """Como WebElement.text: <br> y bloques = salto de línea, espacios colapsados, sin líneas vacías ni ocultos."""
+    trozos = []
+
+    def visitar(el):
+        if not isinstance(el.tag, str) or el.tag in ("script", "style") or _oculto(el):
+            return
+        if el.tag == "br" or el.tag in ETIQUETAS_BLOQUE: trozos.append("\n")
+        if el.text: trozos.append(el.text)
+        for hijo in el:
+            visitar(hijo)
+            if hijo.tail: trozos.append(hijo.tail)
+        if el.tag in ETIQUETAS_BLOQUE: trozos.append("\n")
+
+    visitar(celda)
+    return normalizar_celda("".join(trozos))
+
+def celdas_html(doc):
+    """[[texto_celda, ...], ...] de las filas de la tabla de llegadas."""
+    # Solo la tabla de llegadas: cualquier otro <tr> colaría filas ajenas. Si no aparece,
+    # salen cero filas y obtener_trenes cae a Selenium.
+    filas = doc.xpath(XPATH_FILAS)
+    return [[texto_celda(td) for td in fila.xpath("./td")[:4]] for fila in filas]
+
+def _enviar(sesion, form, url_base, boton=None, extra=None):
+    """Envía un <form> como lo haría el navegador (campos + botón pulsado) y devuelve el HTML parseado."""
+    campos = dict(form.form_values())
+    if boton is not None and boton.get("name"):
+        campos[boton.get("name")] = boton.get("value", "")
+    campos.update(extra or {})
+    accion = urljoin(url_base, (boton.get("formaction") if boton is not None else None) or form.get("action") or url_base)
+    if (form.get("method") or "get").lower() == "post":
+        r = sesion.post(accion, data=campos, timeout=20)
+    else:
+        r = sesion.get(accion, params=campos, timeout=20)
+    r.raise_for_status()
+    return lxml_html.fromstring(r.content, base_url=r.url), r.url
+
+def consultar_llegadas_http(sesion, doc, url_base):
+    """Pestaña de llegadas + larga distancia + "Consultar", sin navegador."""
+    botones = doc.xpath("//*[@id='tab-llegadas']//input[@value='Consultar']") or doc.xpath("//input[@value='Consultar']")
+    if not botones:
+        raise ValueError("No aparece el botón Consultar")
+    boton = botones[0]
+    form = next(boton.iterancestors("form"), None)
+    if form is None:
+        raise ValueError("El botón Consultar no está dentro de un formulario")
+    # Larga distancia: el segundo radio, como en el modo Selenium
+    extra = {}
+    radios = form.xpath(".//input[@type='radio']")
+    if len(radios) > 1 and radios[1].get("name"):
+        extra[radios[1].get("name")] = radios[1].get("value", "on")
+    extra.update(CAMPOS_EXTRA_HTTP)
+    return _enviar(sesion, form, url_base, boton, extra)
+
+def cargar_mas_http(sesion, doc, url_base):
+    """La petición de "Cargar más" (formulario o URL del botón), o None si el botón está deshabilitado."""
+    botones = doc.xpath(XPATH_CARGAR_MAS)
+    # Sin botón o con el botón oculto no sabemos si es el final o si lo pinta el JavaScript:
+    # publicar eso como el día entero es peor que caer a Selenium
+    if not botones:
+        raise ValueError("No aparece 'Cargar más': no podemos confirmar el final de la tabla")
+    boton = botones[0]
+    if any(_oculto(el) for el in [boton] + list(boton.iterancestors())):
+        raise ValueError("'Cargar más' oculto: no podemos confirmar el final de la tabla")
+    if boton.get("disabled") is not None:
+        return None
+    form = next(boton.iterancestors("form"), None)
+    if form is not None:
+        return _enviar(sesion, form, url_base, boton)
+    url = boton.get("data-url") or boton.get("data-href") or boton.get("formaction")
+    if not url:
+        raise ValueError("'Cargar más' solo funciona con JavaScript")
+    r = sesion.get(urljoin(url_base, url), timeout=20)
+    r.raise_for_status()
+    return lxml_html.fromstring(r.content, base_url=r.url), r.url
+
+def obtener_trenes_http(sesion=None):
+    """
+    Trenes de la tabla de llegadas sin Chrome. Lanza excepción si la página no cuadra o si la
+    paginación no termina claramente (botón deshabilitado o una página sin filas nuevas).
+    """
+    sesion = sesion or crear_sesion(cabeceras={"Referer": URL_ADIF})
+    print(f"⚡ Motor HTTP: {URL_ADIF}")
+    r = sesion.get(URL_ADIF, timeout=20)
+    r.raise_for_status()
+    doc, url = consultar_llegadas_http(sesion, lxml_html.fromstring(r.content, base_url=r.url), r.url)
+
+    # La paginación puede devolver la tabla entera o solo las filas nuevas: unimos sin repetir
+    filas, vistas = [], set()
+    for pagina in range(MAX_PAGINAS_HTTP):
+        nuevas = [c for c in celdas_html(doc) if tuple(c) not in vistas]
+        vistas.update(tuple(c) for c in nuevas)
+        filas.extend(nuevas)
+        if pagina and not nuevas:
+            break
+        siguiente = cargar_mas_http(sesion, doc, url)
+        if siguiente is None:
+            break
+        doc, url = siguiente
+        instrumentacion.contar("paginas")
+    else:
+        raise ValueError(f"La tabla sigue paginando tras {MAX_PAGINAS_HTTP} páginas")
+
+    print(f"📊 Filas encontradas en HTML: {len(filas)}")
+    instrumentacion.contar("filas", len(filas))
+    datos = trenes_de_celdas(filas)
+    if len(datos) < MIN_TRENES_HTTP:
+        raise ValueError(f"Solo {len(datos)} trenes en la respuesta (mínimo {MIN_TRENES_HTTP})")
+    print(f"   ✅ {len(datos)} trenes leídos sin navegador.")
+    return datos
+
+def obtener_trenes(pool=None, motor=MOTOR):
+    """Selenium por defecto; con motor "auto", HTTP primero y Selenium si la tabla no cuadra."""
+    if motor in ("auto", "http"):
+        try:
+            with instrumentacion.tramo("adif/http"):
+                return obtener_trenes_http()
+        except Exception as e:
+            print(f"⚠️ Motor HTTP no disponible ({e}).")
+            if motor == "http": return []
+            print("   ↳ Fallback a Selenium...")
+    return obtener_trenes_selenium(pool=pool)
+
+# --- MOTOR SELENIUM ---
+def obtener_trenes_selenium(pool=None, reintentos=REINTENTOS, modo_extraccion=MODO_EXTRACCION):
+    """
+    Scrape con reintentos: si Chrome muere a mitad de la carga, el reintento empieza de cero
+    con un navegador nuevo (la web no deja saltar a una hora, así que reanudar repetiría los
+    mismos clicks). Si todo falla, devolvemos el intento que más trenes cosechó en vez de nada.
+    """
+    mejor = []
+    for intento in range(reintentos + 1):
+        datos, completo = obtener_trenes_intento(pool, modo_extraccion)
+        if completo:
+            return datos
+        if len(datos) > len(mejor): mejor = datos
+        if intento < reintentos:
+            print(f"🔁 Carga interrumpida con {len(datos)} trenes. Reintento {intento + 1}/{reintentos} con un Chrome nuevo...")
+    print(f"⚠️ Carga incompleta tras {reintentos + 1} intentos: devolvemos {len(mejor)} trenes.")
+    return mejor
+
+def obtener_trenes_intento(pool, modo_extraccion=MODO_EXTRACCION):
+    """Un intento con un Chrome: (trenes, completo)."""
     print("🚀 Iniciando Scraper de Trenes Sants (Modo GitHub Actions)...")
     
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--window-size=1920,1080')
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver = pool.tomar() if pool else crear_driver()
+    filtro = filtro_red.aplicar(driver, "adif")
     datos = []
+    completo = False
+    espera = EsperaTabla(driver, SELECTOR_FILAS, contenedor="#horas-trenes-estacion-llegadas")
+
+    cosechadas = [] # Celdas de las filas ya leídas, por si Chrome muere antes de acabar
+    guardadas = 0 # Filas de la tabla actual ya cosechadas
+    clicks = 0
+
+    def cosechar():
+        # Solo lo nuevo de la tabla desde la última cosecha
+        nonlocal guardadas
+        total = espera.contar_filas()
+        if total <= guardadas: return
+        cosechadas.extend(celdas_desde(driver, guardadas))
+        guardadas = total
 
     try:
-        driver.get(URL_ADIF)
-        wait = WebDriverWait(driver, 20) # Aumentado tiempo de espera inicial
+        with instrumentacion.tramo("adif/navegacion"):
+            driver.get(URL_ADIF)
+            wait = WebDriverWait(driver, 20) # Aumentado tiempo de espera inicial
         
-        # 1. MATAR COOKIES (Crítico para que no tapen el botón de cargar)
-        try: driver.execute_script("var b=document.querySelector('#onetrust-banner-sdk'); if(b) b.remove();")
-        except: pass
+            # 1. MATAR COOKIES (Crítico para que no tapen el botón de cargar)
+            try: driver.execute_script("var b=document.querySelector('#onetrust-banner-sdk'); if(b) b.remove();")
+            except: pass
 
-        # 2. NAVEGACIÓN
-        print("👆 Configurando filtros...")
-        # Espera explicita a la pestaña
-        tab_llegadas = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a[href='#tab-llegadas']")))
-        click_js(driver, tab_llegadas)
-        time.sleep(2)
+            # 2. NAVEGACIÓN
+            print("👆 Configurando filtros...")
+            # Espera explicita a la pestaña
+            tab_llegadas = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a[href='#tab-llegadas']")))
+            click_js(driver, tab_llegadas)
+            time.sleep(2)
 
-        # Seleccionar Radio Button (Larga Distancia)
-        radios = driver.find_elements(By.CSS_SELECTOR, "input[type='radio']")
-        if len(radios) > 1: click_js(driver, radios[1])
+            # Seleccionar Radio Button (Larga Distancia)
+            radios = driver.find_elements(By.CSS_SELECTOR, "input[type='radio']")
+            if len(radios) > 1: click_js(driver, radios[1])
         
-        # Botón Consultar
-        btn_consultar = driver.find_element(By.CSS_SELECTOR, "input[value='Consultar']")
-        click_js(driver, btn_consultar)
-        print("⏳ Consulta enviada. Esperando tabla...")
-        time.sleep(6) # Damos tiempo a la carga inicial
+            # Botón Consultar
+            btn_consultar = driver.find_element(By.CSS_SELECTOR, "input[value='Consultar']")
+            click_js(driver, btn_consultar)
+            print("⏳ Consulta enviada. Esperando tabla...")
+            espera.hasta_filas(1, fijo=6, techo=20) # Damos tiempo a la carga inicial
+            cosechar()
 
         # 3. BUCLE "PAC-MAN" MEJORADO
-        print("🔄 Buscando trenes ocultos (Scroll infinito)...")
-        intentos_fallidos = 0
+        with instrumentacion.tramo("adif/cargar_mas"):
+            print("🔄 Buscando trenes ocultos (Scroll infinito)...")
+            intentos_fallidos = 0
         
-        while True:
-            try:
-                # Scroll al fondo de la página
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1.5)
-
-                # Buscamos el botón específico
-                botones_carga = driver.find_elements(By.CSS_SELECTOR, "#tabla-horas-trenes-llegadas-load-more input")
+            while True:
+                try:
+                    # Scroll al fondo de la página
+                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+                    # Buscamos el botón específico (como mucho lo que antes dormíamos)
+                    botones_carga = espera.hasta(lambda d: d.find_elements(By.CSS_SELECTOR, SELECTOR_CARGAR_MAS), fijo=1.5, techo=1.5)
                 
-                if botones_carga:
-                    boton = botones_carga[0]
-                    # Truco: Scroll específico al elemento para asegurar que es "clickable"
-                    driver.execute_script("arguments[0].scrollIntoView(true);", boton)
-                    time.sleep(0.5)
+                    if botones_carga:
+                        boton = botones_carga[0]
+                        # Truco: Scroll específico al elemento para asegurar que es "clickable"
+                        driver.execute_script("arguments[0].scrollIntoView(true);", boton)
+                        espera.hasta(lambda d: boton.is_displayed(), fijo=0.5, techo=0.5)
                     
-                    if boton.is_displayed():
-                        print("   ⬇️ Clic en 'Cargar más'...")
-                        click_js(driver, boton)
-                        time.sleep(3.5) # Espera para que carguen filas
-                        intentos_fallidos = 0 # Reiniciar contador
+                        if boton.is_displayed():
+                            print("   ⬇️ Clic en 'Cargar más'...")
+                            espera.tras_accion(lambda: click_js(driver, boton), fijo=3.5) # Espera a que carguen filas
+                            instrumentacion.contar("clicks")
+                            clicks += 1
+                            cosechar()
+                            intentos_fallidos = 0 # Reiniciar contador
+                        else:
+                            print("   ⚠️ Botón detectado pero no visible. Reintentando scroll...")
+                            intentos_fallidos += 1
                     else:
-                        print("   ⚠️ Botón detectado pero no visible. Reintentando scroll...")
-                        intentos_fallidos += 1
-                else:
-                    print("   ✅ No hay más botones de carga.")
-                    break
+                        print("   ✅ No hay más botones de carga.")
+                        break
                 
-                # Seguridad para no buclear infinito si se atasca
-                if intentos_fallidos > 3:
-                    print("   ⚠️ Demasiados intentos fallidos. Saliendo del bucle.")
-                    break
+                    # Seguridad para no buclear infinito si se atasca
+                    if intentos_fallidos > 3:
+                        print("   ⚠️ Demasiados intentos fallidos. Saliendo del bucle.")
+                        break
 
-            except Exception as e:
-                print(f"   ⚠️ Error en bucle de carga: {e}")
-                break
+                except Exception as e:
+                    print(f"   ⚠️ Error en bucle de carga: {e}")
+                    break
 
-        # 4. EXTRACCIÓN Y LIMPIEZA
-        print("👀 Procesando filas extraídas...")
-        filas = driver.find_elements(By.CSS_SELECTOR, "#horas-trenes-estacion-llegadas tbody tr")
-        print(f"📊 Filas encontradas en HTML: {len(filas)}")
-        
-        whitelist = ["AVE", "AVLO", "OUIGO", "IRYO", "ALVIA", "EUROMED", "INTERCITY", "TGV", "LD", "MD", "AVANT"]
+        espera.resumen()
 
-        for fila in filas:
-            try:
-                celdas = fila.find_elements(By.TAG_NAME, "td")
-                if len(celdas) < 3: continue
+        # Sin botón puede ser el final de la tabla... o un Chrome muerto (el bucle se traga el error)
+        if not driver_vivo(driver):
+            raise RuntimeError(f"Chrome no responde tras {clicks} clicks")
 
-                hora_raw = celdas[0].text.strip()
-                origen = celdas[1].text.strip()
-                tipo_raw = celdas[2].text.strip().upper()
-                via = celdas[3].text.strip() if len(celdas) > 3 else "-"
-                
-                # Limpieza
-                hora_real = limpiar_hora(hora_raw)
-                tipo_limpio = limpiar_nombre_tren(tipo_raw)
+        # 4. EXTRACCIÓN Y LIMPIEZA
+        with instrumentacion.tramo("adif/extraccion"):
+            print(f"👀 Procesando filas extraídas (modo {modo_extraccion})...")
+            celdas = None
+            if modo_extraccion == "bulk":
+                try:
+                    celdas = celdas_desde(driver, 0)
+                except Exception as e:
+                    print(f"   ⚠️ Extracción bulk fallida ({e}). Usando modo por celda.")
+            if celdas is None:
+                celdas = celdas_por_elemento(driver)
+            print(f"📊 Filas encontradas en HTML: {len(celdas)}")
+            instrumentacion.contar("filas", len(celdas))
 
-                # Validaciones
-                if not re.match(r"\d{2}:\d{2}", hora_real): continue
-                
-                # Filtros
-                es_valido = any(marca in tipo_limpio for marca in whitelist)
-                if "RODALIES" in tipo_raw or "CERCANIAS" in tipo_raw: es_valido = False
-
-                if es_valido:
-                    datos.append({
-                        "hora": hora_real,
-                        "origen": origen,
-                        "tren": tipo_limpio,
-                        "via": via
-                    })
-            except: continue
+            datos = trenes_de_celdas(celdas)
+        completo = True
 
     except Exception as e:
         print(f"❌ Error crítico: {e}")
         # Opcional: Imprimir el HTML si falla para debuggear en los logs de GitHub
         # print(driver.page_source[:1000]) 
+        # Lo cosechado hasta el fallo antes que nada
+        datos = trenes_de_celdas(cosechadas)
     finally:
-        driver.quit()
+        try: filtro.informe()
+        except: pass
+        soltar_driver(driver, pool)
 
+    return datos, completo
+
+def guardar_trenes(datos):
     # 5. GUARDADO
     if datos:
         datos.sort(key=lambda x: x['hora'])
         
-        # Crear directorio si no existe
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(datos, f, ensure_ascii=False, indent=4)
+        # JSON minificado + feed con hash y delta para la app (crea el directorio si no existe)
+        with instrumentacion.tramo("adif/escritura"):
+            publicacion.publicar("trenes_sants", datos, ruta=OUTPUT_FILE)
+        instrumentacion.contar("trenes", len(datos))
         
         print(f"💾 ¡ÉXITO! {len(datos)} trenes guardados en: {OUTPUT_FILE}")
         # Imprimir muestra para verificar en los logs de la Action
@@ -169,4 +412,5 @@ def obtener_trenes():
         print("⚠️ No se han extraído datos válidos.")
 
 if __name__ == "__main__":
-    obtener_trenes()
+    instrumentacion.iniciar("adif_scrap")
+    guardar_trenes(obtener_trenes())
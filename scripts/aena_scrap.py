@@ -6,6 +6,8 @@ import os
 import time
 import json
 import re
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
 
 # Instalación automática (Solo Colab)
 if 'google.colab' in sys.modules:
@@ -18,13 +20,27 @@ if 'google.colab' in sys.modules:
     else:
         print("✅ Entorno ya estaba listo.")
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from esperas import EsperaTabla
+from navegador import crear_driver, driver_vivo, soltar_driver
+import filtro_red
+import instrumentacion
+import publicacion
+from modelo_pax import cargar_modelo, iata_origen
+
+AENA_URL = os.environ.get("AENA_URL", "https://www.aena.es/es/infovuelos.html")
+
+# "bulk" = una sola llamada execute_script para toda la tabla; "elemento" = modo clásico
+MODO_EXTRACCION = os.environ.get("AENA_EXTRACCION", "bulk")
+PATRON_HORA = re.compile(r"^\d{2}:\d{2}$")
+TECHO_CLICK = 3.0 # Máximo por click de "see more" (antes: sleep fijo de 0.6s)
+# "streaming" = cosechar las filas nuevas tras cada click (sin FASE 2); "clasico" = leer todo al final
+MODO_FASE1 = os.environ.get("AENA_FASE1", "streaming")
+PODAR_DOM = os.environ.get("AENA_PODAR", "1") != "0" # Quitar del DOM las filas ya cosechadas
+REINTENTOS = int(os.environ.get("AENA_REINTENTOS", "1")) # Reintentos con Chrome nuevo si el navegador muere
 
 # =============================================================================
 # 2. FUNCIONES DE PARSEO (V4 - ANCLA)
@@ -78,6 +94,67 @@ def parsear_fila_aena_v4(texto_fila, hora_detectada):
             break 
     return obj
 
+# =============================================================================
+# 2b. PARSER V5 (COMPILADO, UNA SOLA PASADA) - SALIDA IDÉNTICA A V4
+# =============================================================================
+BLACKLIST_ESTADO = ("EN HORA", "RETRASADO", "ATERRIZADO", "PROGRAMADO",
+                    "CANCELADO", "DESVIADO", "SALA", "CINTA", "LLEGADA",
+                    "FINALIZADO", "OPERANDO", "EMBARCANDO", "ÚLTIMA LLAMADA")
+# Una sola regex con todas las alternativas = any(x in texto for x in BLACKLIST_ESTADO)
+RE_ESTADO = re.compile("|".join(re.escape(x) for x in BLACKLIST_ESTADO))
+RE_VUELO = re.compile(r"^[A-Z]{2,3}\d{3,4}$")
+TERMINALES = {"T1": "T1", "T2": "T2", "TERMINAL T1": "T1", "TERMINAL T2": "T2"}
+LONGITUDES_TERMINAL = frozenset(len(t) for t in TERMINALES)
+
+def parsear_fila_aena_v5(texto_fila, hora_detectada):
+    partes = [p.strip() for p in texto_fila.split(" | ")]
+    obj = {
+        "hora": hora_detectada, "vuelo": "N/A", "aerolinea": "N/A",
+        "origen": "N/A", "terminal": "N/A", "sala": "", "estado": "Programado"
+    }
+    n = len(partes)
+    # Estado
+    if RE_ESTADO.search(partes[-1].upper()):
+        obj["estado"] = partes[-1]
+    elif n > 1 and RE_ESTADO.search(partes[-2].upper()):
+        obj["estado"] = partes[-2]
+
+    # Terminal y vuelo en la misma pasada (primera aparición de cada uno)
+    idx_terminal = idx_vuelo = -1
+    for i, p in enumerate(partes):
+        if idx_terminal == -1 and len(p) in LONGITUDES_TERMINAL:
+            terminal = TERMINALES.get(p.upper())
+            if terminal:
+                obj["terminal"] = terminal
+                idx_terminal = i
+        if idx_vuelo == -1 and RE_VUELO.match(p):
+            idx_vuelo = i
+        if idx_terminal != -1 and idx_vuelo != -1:
+            break
+
+    # Sala
+    if idx_terminal != -1 and n > idx_terminal + 1:
+        posible_sala = partes[idx_terminal + 1]
+        if len(posible_sala) < 6:
+            obj["sala"] = posible_sala
+            if obj["terminal"] == "T2" and "C" in posible_sala.upper():
+                obj["terminal"] = "T2C (EasyJet)"
+            elif obj["terminal"] == "T2":
+                obj["terminal"] = f"T2{posible_sala}"
+
+    # Vuelo y Origen
+    if idx_vuelo != -1:
+        obj["vuelo"] = partes[idx_vuelo]
+        if idx_vuelo + 1 < n:
+            candidato_origen = partes[idx_vuelo + 1]
+            if (":" not in candidato_origen and "T1" not in candidato_origen and "T2" not in candidato_origen
+                    and not RE_ESTADO.search(candidato_origen.upper())):
+                obj["origen"] = candidato_origen
+    return obj
+
+# Parser usado por todos los modos de extracción (v4 queda como referencia para el benchmark)
+parsear_fila_aena = parsear_fila_aena_v5
+
 def limpiar_y_deduplicar(datos):
     print(f"\n🧹 Procesando {len(datos)} vuelos crudos...")
     unicos = {}
@@ -97,173 +174,537 @@ def limpiar_y_deduplicar(datos):
     lista.sort(key=lambda x: (x['dia_relativo'], x['hora']))
     return lista
 
+class ProcesadorFilasAena:
+    """
+    Estado del parseo (día relativo bidireccional + filas ya vistas) para poder alimentarlo
+    por lotes mientras la tabla se va cargando. Un solo lote = procesar_filas_aena.
+    """
+    def __init__(self, hora_inicio=-1):
+        self.resultado = []
+        self.dia_parseo = 0
+        self.min_anterior_parseo = hora_inicio
+        self.filas_procesadas_ids = set()
+        self.primer_lote = True
+
+    def procesar(self, filas):
+        if self.primer_lote and filas:
+            self.primer_lote = False
+            if self.min_anterior_parseo == -1:
+                h_txt = filas[0][0]
+                if PATRON_HORA.match(h_txt):
+                    self.min_anterior_parseo = int(h_txt.split(':')[0])*60 + int(h_txt.split(':')[1])
+
+        for hora_str, texto_fila in filas:
+            try:
+                if not PATRON_HORA.match(hora_str): continue
+                if texto_fila in self.filas_procesadas_ids: continue
+
+                m_actual = int(hora_str.split(':')[0])*60 + int(hora_str.split(':')[1])
+
+                # LÓGICA BIDIRECCIONAL TAMBIÉN AQUÍ PARA ASIGNAR EL DÍA CORRECTO
+                diferencia = self.min_anterior_parseo - m_actual
+                if diferencia > 600:
+                    self.dia_parseo += 1 # Pasamos a mañana
+                elif diferencia < -600:
+                    self.dia_parseo -= 1 # Oops, volvimos a ayer (desorden)
+
+                self.min_anterior_parseo = m_actual
+
+                obj = parsear_fila_aena(texto_fila, hora_str)
+                # Si el desorden hace que dia_parseo sea -1, lo forzamos a 0
+                obj["dia_relativo"] = max(0, self.dia_parseo)
+
+                if obj["vuelo"] != "N/A" or obj["origen"] != "N/A":
+                    self.resultado.append(obj)
+
+                self.filas_procesadas_ids.add(texto_fila)
+
+            except: continue
+        return self.resultado
+
+def procesar_filas_aena(filas, hora_inicio=-1):
+    """
+    Recibe [[hora, texto_fila], ...] ya extraídas del DOM y aplica el parseo V4
+    con la lógica bidireccional de día. Python puro: sin llamadas a WebDriver.
+    """
+    return ProcesadorFilasAena(hora_inicio).procesar(filas)
+
 # =============================================================================
-# 3. MOTOR TURBO (LÓGICA BIDIRECCIONAL + 50 CLICKS)
+# 3. EXTRACCIÓN DEL DOM (BULK vs POR ELEMENTO)
 # =============================================================================
-def obtener_vuelos_turbo():
-    options = Options()
-    options.add_argument('--headless') 
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--window-size=1920,1080')
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    url = "https://www.aena.es/es/infovuelos.html"
-    datos_recolectados = []
+XPATH_HORAS = "//*[contains(text(), ':') and string-length(text()) = 5]"
+
+# Una sola ida y vuelta: el navegador recorre todas las horas y devuelve
+# [[hora, texto_fila_padre], ...] serializado como un único JSON.
+JS_EXTRAER_FILAS = """
+var res = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var out = [];
+for (var i = 0; i < res.snapshotLength; i++) {
+    var el = res.snapshotItem(i);
+    var padre = el.parentElement ? el.parentElement.parentElement : null;
+    out.push([(el.innerText || el.textContent || '').trim(), padre ? (padre.innerText || '') : '']);
+}
+return JSON.stringify(out);
+"""
 
+# Sonda de progreso: solo la cola de la tabla, coste constante por click. El contenedor de
+# las filas (abuelo de la hora -> su padre) se localiza una vez, se marca y se reutiliza.
+SELECTOR_TABLA = "[data-itaxi-tabla]"
+JS_TABLA = """
+function __itaxiTabla(xpath) {
+    var t = window.__itaxiTabla;
+    if (t && t.isConnected) return t;
+    var el = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    var fila = el && el.parentElement ? el.parentElement.parentElement : null;
+    t = fila ? fila.parentElement : null;
+    if (t) t.setAttribute('data-itaxi-tabla', '1');
+    window.__itaxiTabla = t;
+    return t;
+}
+function __itaxiHora(nodo, xpath) {
+    var el = document.evaluate(xpath, nodo, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return el ? (el.innerText || el.textContent || '').trim() : null;
+}
+"""
+# {primera, ultima, filas}: primera = primera hora del documento (como antes, solo si se pide),
+# ultima = hora de la última fila con hora (mirando como mucho 10 filas desde el final).
+JS_PROGRESO = JS_TABLA + """
+var t = __itaxiTabla(arguments[0]);
+if (!t) return null;
+var ultima = null, nodo = t.lastElementChild;
+for (var i = 0; nodo && i < 10 && ultima === null; i++, nodo = nodo.previousElementSibling) {
+    ultima = __itaxiHora(nodo, '.' + arguments[0]);
+}
+var primera = arguments[1] ? __itaxiHora(document, arguments[0]) : null;
+return {primera: primera, ultima: ultima, filas: t.childElementCount};
+"""
+
+def sondear_progreso(driver, con_primera=False):
+    """Primera/última hora y nº de filas en una llamada, o None si no se localiza la tabla."""
+    return driver.execute_script(JS_PROGRESO, XPATH_HORAS, con_primera)
+
+def localizar_tabla(driver):
     try:
-        print(f"✈️ Entrando en AENA...")
-        driver.get(url)
-        time.sleep(3)
+        return bool(driver.execute_script(JS_TABLA + "return !!__itaxiTabla(arguments[0]);", XPATH_HORAS))
+    except Exception:
+        return False
 
-        # BÚSQUEDA
-        try: driver.execute_script("var b=document.querySelectorAll('.onetrust-pc-dark-filter, #onetrust-consent-sdk');b.forEach(e=>e.remove());")
-        except: pass
+# Streaming: solo las horas aún no cosechadas (se marcan con data-itaxi). Las filas ya
+# leídas se quitan del DOM salvo la última, que mantiene la cola de la tabla para la
+# lógica de día, la espera por filas y el botón "see more". Memoria del navegador plana.
+XPATH_HORAS_NUEVAS = "//*[contains(text(), ':') and string-length(text()) = 5 and not(@data-itaxi)]"
+JS_COSECHAR_FILAS = JS_TABLA + """
+__itaxiTabla(arguments[2]);
+var res = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var out = [], filas = [], podadas = 0;
+for (var i = 0; i < res.snapshotLength; i++) {
+    var el = res.snapshotItem(i);
+    var padre = el.parentElement ? el.parentElement.parentElement : null;
+    out.push([(el.innerText || el.textContent || '').trim(), padre ? (padre.innerText || '') : '']);
+    el.setAttribute('data-itaxi', '1');
+    if (padre && filas[filas.length - 1] !== padre) filas.push(padre);
+}
+if (arguments[1] && filas.length) {
+    if (window.__itaxiCola) filas.unshift(window.__itaxiCola);
+    window.__itaxiCola = filas.pop();
+    for (var j = 0; j < filas.length; j++) {
+        if (filas[j] !== window.__itaxiCola && filas[j].parentNode) { filas[j].parentNode.removeChild(filas[j]); podadas++; }
+    }
+}
+return JSON.stringify({filas: out, podadas: podadas});
+"""
+
+def normalizar_texto_fila(texto):
+    # Igual que WebElement.text: líneas recortadas, sin vacías, unidas con " | "
+    lineas = [l.strip() for l in texto.splitlines()]
+    return " | ".join(l for l in lineas if l)
+
+def extraer_filas_bulk(driver):
+    crudo = driver.execute_script(JS_EXTRAER_FILAS, XPATH_HORAS)
+    return [[hora, normalizar_texto_fila(texto)] for hora, texto in json.loads(crudo)]
+
+def cosechar_filas(driver, podar=PODAR_DOM):
+    """Filas añadidas desde la última cosecha, en una sola llamada. Devuelve (filas, nº de filas podadas)."""
+    crudo = json.loads(driver.execute_script(JS_COSECHAR_FILAS, XPATH_HORAS_NUEVAS, podar, XPATH_HORAS))
+    return [[hora, normalizar_texto_fila(texto)] for hora, texto in crudo["filas"]], crudo["podadas"]
+
+def extraer_filas_por_elemento(driver):
+    """Modo clásico (fallback): 2-3 round-trips WebDriver por vuelo."""
+    filas = []
+    for el in driver.find_elements(By.XPATH, XPATH_HORAS):
         try:
-            inp = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//input[contains(@placeholder, 'llegada')]")))
-            inp.send_keys("JOSEP TARRADELLAS BARCELONA-EL PRAT")
-            time.sleep(1)
-            driver.execute_script("arguments[0].click();", driver.find_element(By.ID, "btnBuscadorVuelos"))
-        except: pass
+            hora_str = el.text
+            if not PATRON_HORA.match(hora_str):
+                filas.append([hora_str, ""])
+                continue
+            fila_padre = el.find_element(By.XPATH, "./../..")
+            filas.append([hora_str, fila_padre.text.replace("\n", " | ")])
+        except: continue
+    return filas
+
+# =============================================================================
+# 4. PUNTO DE ENTRADA
+# =============================================================================
+def obtener_vuelos(pool=None, ventana_minutos=None):
+    """Tabla de llegadas vía Selenium (modo turbo)."""
+    return obtener_vuelos_turbo(pool=pool, ventana_minutos=ventana_minutos)
+
+# =============================================================================
+# 5. MOTOR TURBO (LÓGICA BIDIRECCIONAL + 50 CLICKS)
+# =============================================================================
+def pulsar_ver_mas(driver, espera):
+    """Scroll + click en "see more" esperando a que la tabla crezca. False si ya no hay botón."""
+    try:
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        visible = EC.visibility_of_element_located((By.CLASS_NAME, "btn-see-more"))
+        try:
+            btn = WebDriverWait(driver, 1).until(visible)
+        except TimeoutException:
+            # Si el botón existe pero sigue oculto (la tabla aún carga) le damos más margen
+            # antes de dar la tabla por terminada
+            if not driver.find_elements(By.CLASS_NAME, "btn-see-more"): return False
+            btn = WebDriverWait(driver, TECHO_CLICK * 2).until(visible)
+        espera.tras_accion(lambda: driver.execute_script("arguments[0].click();", btn), fijo=0.6, techo=TECHO_CLICK)
+        return True
+    except:
+        return False
+
+def obtener_vuelos_turbo(modo_extraccion=MODO_EXTRACCION, pool=None, ventana_minutos=None,
+                         modo_fase1=MODO_FASE1, podar_dom=PODAR_DOM, reintentos=REINTENTOS):
+    """
+    Carga la tabla pulsando "see more". Con `ventana_minutos` (refresco incremental)
+    para en cuanto cubre ese tramo desde la hora de inicio, sin mínimo de clicks.
+    En modo streaming las filas se parsean según llegan y se quitan del DOM (`podar_dom`).
+    Si Chrome muere, se reintenta con uno nuevo desde el principio (la web no deja saltar a
+    una hora: reanudar costaría los mismos clicks) y, si todo falla, nos quedamos con la
+    carga parcial más larga.
+    """
+    mejor = []
+    for intento in range(reintentos + 1):
+        datos, completo = obtener_vuelos_turbo_intento(modo_extraccion, pool, ventana_minutos, modo_fase1, podar_dom)
+        if completo:
+            return datos
+        if len(datos) > len(mejor): mejor = datos
+        if intento < reintentos:
+            print(f"🔁 Carga interrumpida con {len(datos)} vuelos. Reintento {intento + 1}/{reintentos} con un Chrome nuevo...")
+    # Parcial mejor que nada
+    print(f"⚠️ Carga incompleta tras {reintentos + 1} intentos: devolvemos {len(mejor)} vuelos.")
+    return mejor
+
+def obtener_vuelos_turbo_intento(modo_extraccion, pool, ventana_minutos, modo_fase1, podar_dom):
+    """Un intento con un Chrome: (vuelos, completo). completo=False si el navegador murió por el camino."""
+    driver = pool.tomar() if pool else crear_driver()
+    filtro = filtro_red.aplicar(driver, "aena")
+    url = AENA_URL
+    datos_recolectados = []
+    completo = False
+    procesador = None
+    espera = EsperaTabla(driver, XPATH_HORAS, tipo="xpath")
+
+    try:
+        with instrumentacion.tramo("aena/carga"):
+            print(f"✈️ Entrando en AENA...")
+            driver.get(url)
+            espera.hasta(lambda d: d.execute_script("return document.readyState") == "complete", fijo=3)
+
+            # BÚSQUEDA
+            try: driver.execute_script("var b=document.querySelectorAll('.onetrust-pc-dark-filter, #onetrust-consent-sdk');b.forEach(e=>e.remove());")
+            except: pass
+            try:
+                inp = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//input[contains(@placeholder, 'llegada')]")))
+                inp.send_keys("JOSEP TARRADELLAS BARCELONA-EL PRAT")
+                time.sleep(1)
+                driver.execute_script("arguments[0].click();", driver.find_element(By.ID, "btnBuscadorVuelos"))
+            except: pass
         
-        print("⏳ Esperando tabla...")
-        time.sleep(5)
+            print("⏳ Esperando tabla...")
+            espera.hasta_filas(1, fijo=5, techo=15)
+
+            # Con el contenedor localizado, las esperas cuentan sus hijos en vez de evaluar
+            # el XPath sobre todo el documento cada 50 ms, y solo sus mutaciones cuentan
+            # (spinners, banners o el propio botón no resuelven la espera antes de tiempo)
+            if localizar_tabla(driver):
+                espera.selector_filas, espera.tipo, espera.contenedor = SELECTOR_TABLA, "hijos", SELECTOR_TABLA
 
         # === FASE 1: CARGAR TODO ===
-        hora_inicio = -1
-        dia_actual = 0 
-        ultimo_minuto_check = -1
-        stop_flag = False
-        clicks = 0
-        MAX_PAGINAS = 80
-        MIN_CLICKS_OBLIGATORIOS = 50 
+        with instrumentacion.tramo("aena/fase1"):
+            hora_inicio = -1
+            dia_actual = 0 
+            ultimo_minuto_check = -1
+            stop_flag = False
+            clicks = 0
+            MAX_PAGINAS = 80
+            MIN_CLICKS_OBLIGATORIOS = 50 
+            streaming = modo_fase1 == "streaming"
+            primera_vista = ultima_vista = None
+            filas_tabla = 0
 
-        print(f"\n🚀 FASE 1: Carga Rápida (Requisito: >{MIN_CLICKS_OBLIGATORIOS} clicks y 24h reales)...")
+            print(f"\n🚀 FASE 1: Carga Rápida (Requisito: >{MIN_CLICKS_OBLIGATORIOS} clicks y 24h reales, modo {modo_fase1})...")
 
-        while not stop_flag and clicks < MAX_PAGINAS:
-            try:
-                elementos_hora = driver.find_elements(By.XPATH, "//*[contains(text(), ':') and string-length(text()) = 5]")
-                if elementos_hora:
-                    # Capturar hora inicio
-                    if hora_inicio == -1:
-                        h_ini = elementos_hora[0].text
-                        if re.match(r"^\d{2}:\d{2}$", h_ini):
-                            hora_inicio = int(h_ini.split(':')[0])*60 + int(h_ini.split(':')[1])
-                            ultimo_minuto_check = hora_inicio
-                            print(f"⏱️ Hora Inicio: {h_ini}")
-
-                    # Mirar el último visible
-                    h_fin = elementos_hora[-1].text
-                    if re.match(r"^\d{2}:\d{2}$", h_fin):
-                        m_act = int(h_fin.split(':')[0])*60 + int(h_fin.split(':')[1])
+            while not stop_flag and clicks < MAX_PAGINAS:
+                try:
+                    lote = []
+                    if streaming:
+                        # Cosechamos lo nuevo antes de mirar la cola: las mismas horas que veía el modo clásico
+                        try:
+                            lote, podadas = cosechar_filas(driver, podar_dom)
+                        except Exception as e:
+                            print(f"   ⚠️ Cosecha en streaming fallida ({e}). Seguimos en modo clásico.")
+                            streaming = False
+                        else:
+                            instrumentacion.contar("filas", len(lote))
+                            instrumentacion.contar("filas_podadas", podadas)
+                            filas_tabla += len(lote)
+                            if lote:
+                                if primera_vista is None: primera_vista = lote[0][0]
+                                ultima_vista = lote[-1][0]
+                    if not streaming:
+                        # Una llamada acotada a la cola; el XPath completo solo si no hay contenedor
+                        progreso = sondear_progreso(driver, hora_inicio == -1)
+                        if progreso and progreso.get("ultima"):
+                            primera_vista, ultima_vista = progreso.get("primera"), progreso["ultima"]
+                            filas_tabla = progreso["filas"]
+                        else:
+                            elementos_hora = driver.find_elements(By.XPATH, XPATH_HORAS)
+                            if elementos_hora:
+                                primera_vista = elementos_hora[0].text if hora_inicio == -1 else None
+                                ultima_vista = elementos_hora[-1].text
+                                filas_tabla = len(elementos_hora)
+                    if ultima_vista is not None:
+                        # Capturar hora inicio
+                        if hora_inicio == -1 and primera_vista:
+                            h_ini = primera_vista
+                            if re.match(r"^\d{2}:\d{2}$", h_ini):
+                                hora_inicio = int(h_ini.split(':')[0])*60 + int(h_ini.split(':')[1])
+                                ultimo_minuto_check = hora_inicio
+                                print(f"⏱️ Hora Inicio: {h_ini}")
+
+                        # Las filas cosechadas pasan ya por el parseo (antes de cualquier parada)
+                        if lote:
+                            procesador = procesador or ProcesadorFilasAena(hora_inicio)
+                            procesador.procesar(lote)
+
+                        # Mirar el último visible
+                        h_fin = ultima_vista
+                        if re.match(r"^\d{2}:\d{2}$", h_fin):
+                            m_act = int(h_fin.split(':')[0])*60 + int(h_fin.split(':')[1])
                         
-                        # --- LÓGICA BIDIRECCIONAL (CORRECCIÓN DE ERRORES) ---
-                        diferencia = ultimo_minuto_check - m_act
+                            # --- LÓGICA BIDIRECCIONAL (CORRECCIÓN DE ERRORES) ---
+                            diferencia = ultimo_minuto_check - m_act
                         
-                        # 1. Si bajamos drásticamente (23:00 -> 01:00) -> DÍA SIGUIENTE
-                        if diferencia > 600:
-                            dia_actual += 1
-                            if clicks >= MIN_CLICKS_OBLIGATORIOS:
-                                print(f"🌙 Cambio de día DETECTADO ({h_fin}). Día relativo: {dia_actual}")
+                            # 1. Si bajamos drásticamente (23:00 -> 01:00) -> DÍA SIGUIENTE
+                            if diferencia > 600:
+                                dia_actual += 1
+                                if clicks >= MIN_CLICKS_OBLIGATORIOS:
+                                    print(f"🌙 Cambio de día DETECTADO ({h_fin}). Día relativo: {dia_actual}")
                         
-                        # 2. Si subimos drásticamente (01:00 -> 23:00) -> VOLVIMOS ATRÁS (Corregir error AENA)
-                        elif diferencia < -600:
-                            dia_actual -= 1
-                            print(f"🔙 Corrección de día detectada ({h_fin}). Volvemos al día: {dia_actual}")
-
-                        ultimo_minuto_check = m_act
-
-                        # --- CONDICIÓN DE PARADA ---
-                        # Solo paramos si ya hemos pasado al día siguiente DE VERDAD y tenemos los clicks
-                        if dia_actual >= 1 and m_act >= hora_inicio:
-                            if clicks >= MIN_CLICKS_OBLIGATORIOS:
-                                print(f"🛑 Círculo 24h cerrado ({h_fin}) y clicks cumplidos. Parando.")
+                            # 2. Si subimos drásticamente (01:00 -> 23:00) -> VOLVIMOS ATRÁS (Corregir error AENA)
+                            elif diferencia < -600:
+                                dia_actual -= 1
+                                print(f"🔙 Corrección de día detectada ({h_fin}). Volvemos al día: {dia_actual}")
+
+                            ultimo_minuto_check = m_act
+
+                            # --- PARADA INCREMENTAL: solo queríamos las próximas horas ---
+                            if ventana_minutos and dia_actual * 1440 + m_act - hora_inicio >= ventana_minutos:
+                                print(f"🛑 Ventana incremental cubierta ({h_fin}) tras {clicks} clicks. Parando.")
                                 stop_flag = True
                                 break
-                            else:
-                                # Si faltan clicks, IGNORAMOS la señal de parada y seguimos
-                                # La "Corrección de día" arreglará el flag si era un error
-                                pass
-            except: pass
 
-            try:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                btn = WebDriverWait(driver, 1).until(EC.visibility_of_element_located((By.CLASS_NAME, "btn-see-more")))
-                driver.execute_script("arguments[0].click();", btn)
+                            # --- CONDICIÓN DE PARADA ---
+                            # Solo paramos si ya hemos pasado al día siguiente DE VERDAD y tenemos los clicks
+                            if dia_actual >= 1 and m_act >= hora_inicio:
+                                if clicks >= MIN_CLICKS_OBLIGATORIOS:
+                                    print(f"🛑 Círculo 24h cerrado ({h_fin}) y clicks cumplidos. Parando.")
+                                    stop_flag = True
+                                    break
+                                else:
+                                    # Si faltan clicks, IGNORAMOS la señal de parada y seguimos
+                                    # La "Corrección de día" arreglará el flag si era un error
+                                    pass
+                except: pass
+
+                if not pulsar_ver_mas(driver, espera):
+                    print("✅ Fin de botones.")
+                    break
                 clicks += 1
+                instrumentacion.contar("clicks")
                 if clicks % 5 == 0: 
                     estado = "✅" if clicks >= MIN_CLICKS_OBLIGATORIOS else f"⏳ ({clicks}/{MIN_CLICKS_OBLIGATORIOS})"
-                    print(f" ⬇️ Click {clicks} {estado}")
-                time.sleep(0.6)
-            except:
-                print("✅ Fin de botones.")
-                break
-
-        # === FASE 2: LECTURA MASIVA (Igual, pero aplicando la misma lógica bidireccional) ===
-        print(f"\n👀 FASE 2: Procesando y ordenando...")
-        
-        elementos_hora = driver.find_elements(By.XPATH, "//*[contains(text(), ':') and string-length(text()) = 5]")
-        
-        dia_parseo = 0
-        min_anterior_parseo = hora_inicio 
-        
-        if min_anterior_parseo == -1 and elementos_hora:
-             h_txt = elementos_hora[0].text
-             if re.match(r"^\d{2}:\d{2}$", h_txt):
-                 min_anterior_parseo = int(h_txt.split(':')[0])*60 + int(h_txt.split(':')[1])
+                    print(f" ⬇️ Click {clicks} {estado} ({filas_tabla} filas)")
 
-        filas_procesadas_ids = set()
+        espera.resumen()
 
-        for i, el in enumerate(elementos_hora):
-            try:
-                hora_str = el.text
-                if not re.match(r"^\d{2}:\d{2}$", hora_str): continue
-                
-                fila_padre = el.find_element(By.XPATH, "./../..")
-                texto_fila = fila_padre.text.replace("\n", " | ")
-                
-                if texto_fila in filas_procesadas_ids: continue
-                
-                m_actual = int(hora_str.split(':')[0])*60 + int(hora_str.split(':')[1])
-                
-                # LÓGICA BIDIRECCIONAL TAMBIÉN AQUÍ PARA ASIGNAR EL DÍA CORRECTO
-                diferencia = min_anterior_parseo - m_actual
-                if diferencia > 600:
-                    dia_parseo += 1 # Pasamos a mañana
-                elif diferencia < -600:
-                    dia_parseo -= 1 # Oops, volvimos a ayer (desorden)
-                
-                min_anterior_parseo = m_actual 
+        # Sin botón puede ser el final de la tabla... o un Chrome muerto (el bucle se traga el error)
+        if not stop_flag and not driver_vivo(driver):
+            raise RuntimeError(f"Chrome no responde tras {clicks} clicks")
 
-                obj = parsear_fila_aena_v4(texto_fila, hora_str)
-                # Si el desorden hace que dia_parseo sea -1, lo forzamos a 0
-                obj["dia_relativo"] = max(0, dia_parseo) 
-                
-                if obj["vuelo"] != "N/A" or obj["origen"] != "N/A":
-                    datos_recolectados.append(obj)
-                
-                filas_procesadas_ids.add(texto_fila)
+        procesador = procesador or ProcesadorFilasAena(hora_inicio)
+        if streaming:
+            # Lo que trajo el último click; el resto ya está parseado
+            with instrumentacion.tramo("aena/cosecha_final"):
+                try:
+                    lote, podadas = cosechar_filas(driver, podar_dom)
+                    instrumentacion.contar("filas", len(lote))
+                    instrumentacion.contar("filas_podadas", podadas)
+                    procesador.procesar(lote)
+                except Exception as e:
+                    print(f"   ⚠️ Cosecha final fallida ({e}). Leyendo la tabla entera.")
+                    streaming = False
 
-            except: continue
+        # === FASE 2: LECTURA MASIVA (solo modo clásico o si la cosecha falló) ===
+        if not streaming:
+            with instrumentacion.tramo("aena/fase2"):
+                print(f"\n👀 FASE 2: Procesando y ordenando (modo {modo_extraccion})...")
+
+                filas = []
+                if modo_extraccion == "bulk":
+                    try:
+                        filas = extraer_filas_bulk(driver)
+                        print(f"   📦 {len(filas)} filas leídas en una sola llamada.")
+                    except Exception as e:
+                        print(f"   ⚠️ Extracción bulk fallida ({e}). Usando modo por elemento.")
+                        filas = []
+                if not filas:
+                    filas = extraer_filas_por_elemento(driver)
+                instrumentacion.contar("filas", len(filas))
+
+                # Si hubo streaming parcial, las filas ya vistas se descartan por texto
+                procesador.procesar(filas)
+        else:
+            print(f"\n👀 {len(procesador.resultado)} vuelos parseados durante la carga, sin FASE 2.")
+
+        datos_recolectados.extend(procesador.resultado)
+        completo = True
 
     except Exception as e:
         print(f"❌ Error: {e}")
+        if procesador: datos_recolectados = list(procesador.resultado)
     finally:
-        driver.quit()
-        return datos_recolectados
+        try: filtro.informe()
+        except: pass
+        soltar_driver(driver, pool)
+        return datos_recolectados, completo
 
 # =============================================================================
-# 4. EJECUCIÓN
+# 6. REFRESCO INCREMENTAL
 # =============================================================================
-if __name__ == "__main__":
-    vuelos_raw = obtener_vuelos_turbo()
-    
+# La mayor parte del snapshot anterior sigue siendo válida: solo re-scrapeamos las
+# próximas horas (donde cambian estados, retrasos y terminales) y reconstruimos las
+# 24h enteras cuando la última completa es demasiado vieja.
+SNAPSHOT_VUELOS = os.environ.get("AENA_SNAPSHOT", os.path.join("public", "vuelos.json"))
+ESTADO_AENA = os.environ.get("AENA_ESTADO", os.path.join("data", "aena_estado.json"))
+INCREMENTAL = os.environ.get("AENA_INCREMENTAL", "1") != "0"
+VENTANA_INCREMENTAL_H = float(os.environ.get("AENA_VENTANA_H", "3"))
+COMPLETA_CADA_H = float(os.environ.get("AENA_COMPLETA_CADA_H", "6"))
+ZONA_AENA = ZoneInfo("Europe/Madrid") # Las horas de la web son hora local
+
+def _leer_json(ruta, defecto):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return defecto
+
+def _minuto_absoluto(v):
+    return v['dia_relativo'] * 1440 + int(v['hora'][:2]) * 60 + int(v['hora'][3:5])
+
+def motivo_reconstruccion(estado, anterior, ahora):
+    """None si basta con un refresco incremental; si no, el motivo de la reconstrucción completa."""
+    if not INCREMENTAL: return "modo incremental desactivado"
+    if not anterior: return "no hay snapshot previo"
+    if not estado.get("ultima_completa") or not estado.get("fecha_base"): return "no hay estado previo"
+    edad_h = (ahora - datetime.fromisoformat(estado["ultima_completa"])).total_seconds() / 3600
+    if edad_h >= COMPLETA_CADA_H: return f"última completa hace {edad_h:.1f}h (umbral {COMPLETA_CADA_H:g}h)"
+    return None
+
+def vuelos_previos_vigentes(anterior, estado, ahora, vuelos_nuevos):
+    """
+    Del snapshot anterior, los vuelos que quedan DESPUÉS de la ventana recién scrapeada,
+    con el dia_relativo reajustado a la fecha de hoy. Lo anterior a la ventana ya pasó y
+    lo de dentro lo sustituye el scrape nuevo.
+    """
+    fin_ventana = max(_minuto_absoluto(v) for v in vuelos_nuevos)
+    desfase = (ahora.date() - date.fromisoformat(estado["fecha_base"])).days
+    vigentes = []
+    for v in anterior:
+        v = dict(v, dia_relativo=v['dia_relativo'] - desfase)
+        if v['dia_relativo'] >= 0 and _minuto_absoluto(v) > fin_ventana:
+            vigentes.append(v)
+    return vigentes
+
+def refrescar_vuelos(pool=None, archivo=SNAPSHOT_VUELOS):
+    ahora = datetime.now(ZONA_AENA)
+    estado = _leer_json(ESTADO_AENA, {})
+    anterior = _leer_json(SNAPSHOT_VUELOS, [])
+    motivo = motivo_reconstruccion(estado, anterior, ahora)
+
+    previos = []
+    if motivo:
+        print(f"🔁 Reconstrucción completa de 24h ({motivo}).")
+        vuelos_raw = obtener_vuelos(pool=pool)
+    else:
+        print(f"⚡ Refresco incremental: próximas {VENTANA_INCREMENTAL_H:g}h sobre {len(anterior)} vuelos del snapshot.")
+        vuelos_raw = obtener_vuelos(pool=pool, ventana_minutos=int(VENTANA_INCREMENTAL_H * 60))
+        if vuelos_raw:
+            previos = vuelos_previos_vigentes(anterior, estado, ahora, vuelos_raw)
+            print(f"   ♻️ {len(previos)} vuelos reutilizados del snapshot anterior.")
+
+    vuelos_clean = guardar_vuelos(vuelos_raw, archivo, previos)
+    if vuelos_clean:
+        # Si solo cambia la hora de ejecución no se reescribe (no genera commit)
+        publicacion.escribir_si_cambia(ESTADO_AENA, {
+            "fecha_base": ahora.date().isoformat(),
+            "ultima_ejecucion": ahora.isoformat(timespec="seconds"),
+            "ultima_completa": ahora.isoformat(timespec="seconds") if motivo else estado["ultima_completa"],
+            "modo": "completo" if motivo else "incremental",
+            "vuelos": len(vuelos_clean),
+        }, volatiles=publicacion.VOLATILES["aena_estado"], indent=4)
+    return vuelos_clean
+
+# =============================================================================
+# 7. EJECUCIÓN
+# =============================================================================
+def anotar_pax(vuelos, modelo=None):
+    """
+    Añade 'pax' a cada vuelo con el mismo modelo que update_data (modelo_pax) y devuelve
+    la demanda por zona: t1, t2 (incluye T2C), puente (dentro de T1) y t2c.
+    """
+    modelo = modelo or cargar_modelo()
+    demanda = {zona: {"vuelos": 0, "pax": 0} for zona in ("t1", "t2", "puente", "t2c")}
+    for v in vuelos:
+        aerolinea = modelo.aerolinea_de_vuelo(v['vuelo'])
+        origen = iata_origen(v['origen'])
+        v['pax'] = modelo.estimar(aerolinea, origen=origen)
+
+        zonas = []
+        if v['terminal'].startswith("T1"):
+            zonas.append("t1")
+            if modelo.es_puente(aerolinea, origen): zonas.append("puente")
+        elif v['terminal'].startswith("T2"):
+            zonas.append("t2")
+            if v['terminal'].startswith("T2C"): zonas.append("t2c")
+        for zona in zonas:
+            demanda[zona]["vuelos"] += 1
+            demanda[zona]["pax"] += v['pax']
+    print(f"👥 Pax estimados (modelo v{modelo.version}): " +
+          " | ".join(f"{zona.upper()} {d['pax']:,} ({d['vuelos']} vuelos)" for zona, d in demanda.items()))
+    return demanda
+
+def guardar_vuelos(vuelos_raw, archivo=SNAPSHOT_VUELOS, previos=()):
     if vuelos_raw:
-        vuelos_clean = limpiar_y_deduplicar(vuelos_raw)
-        archivo = 'vuelos.json'
-        with open(archivo, 'w', encoding='utf-8') as f:
-            json.dump(vuelos_clean, f, indent=4, ensure_ascii=False)
+        # Los previos (ya limpios) se fusionan por la misma clave (dia_relativo, hora, vuelo/origen)
+        vuelos_clean = limpiar_y_deduplicar(list(vuelos_raw) + list(previos))
+        anotar_pax(vuelos_clean)
+        with instrumentacion.tramo("aena/escritura"):
+            publicacion.publicar("vuelos", vuelos_clean, ruta=archivo)
+        instrumentacion.contar("vuelos", len(vuelos_clean))
         print(f"\n💾 ¡ÉXITO! {len(vuelos_clean)} vuelos guardados en: {archivo}")
+        return vuelos_clean
     else:
         print("⚠️ No se encontraron datos.")
+        return []
+
+if __name__ == "__main__":
+    instrumentacion.iniciar("aena_scrap")
+    refrescar_vuelos()
@@ -0,0 +1,195 @@
+"""
+Agregación por lotes de los vuelos de aviationstack.
+
+Los registros crudos se pasan una sola vez a una tabla columnar (arrays de NumPy) y a
+partir de ahí terminal, puente, easyJet, pax y los agregados por terminal y por franja
+se calculan sobre arrays enteros (máscaras + bincount), sin bucle por vuelo.
+
+    tabla = normalizar_vuelos(todos_vuelos_raw)
+    kpis_por_terminal(tabla)                      # tarjetas t1/t2/puente/t2c
+    evolucion(tabla)                              # {"00": pax, ..., "23": pax} como siempre
+    evolucion(tabla, minutos_bloque=15, dias=3)   # {"2024-05-01 00:00": pax, ...}
+
+Terminal por defecto y pax salen de modelo_pax (tabla versionada en data/). Con el
+modelo v1, mismo resultado que el bucle de update_data.procesar_vuelos_bucle.
+"""
+from datetime import date, datetime
+
+import numpy as np
+
+from modelo_pax import cargar_modelo
+
+# =============================================================================
+# 1. REGLAS
+# =============================================================================
+ESTADOS_DESCARTADOS = ("cancelled", "diverted")
+ESTADOS_ATERRIZANDO = ["active", "landed"]
+MINUTOS_DIA = 24 * 60
+
+
+# =============================================================================
+# 2. NORMALIZACIÓN (UNA PASADA SOBRE LOS REGISTROS CRUDOS)
+# =============================================================================
+def _parsear_hora(hora_str):
+    """(día ordinal, minuto del día, "HH:MM") en la hora local que trae la API, o None."""
+    try:
+        dt = datetime.fromisoformat(hora_str.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt.toordinal(), dt.hour * 60 + dt.minute, dt.strftime("%H:%M")
+
+
+def normalizar_vuelos(vuelos_raw, modelo=None):
+    """
+    Tabla columnar {columna: np.ndarray} con los vuelos válidos (mismos descartes que el
+    bucle: cancelados/desviados, sin hora o con hora ilegible, registros mal formados).
+    """
+    filas = []
+    for flight in vuelos_raw:
+        try:
+            status_raw = flight.get('flight_status', 'scheduled')
+            if status_raw in ESTADOS_DESCARTADOS:
+                continue
+            arrival = flight.get('arrival') or {}
+            departure = flight.get('departure') or {}
+            hora_str = arrival.get('estimated') or arrival.get('scheduled')
+            if not isinstance(hora_str, str):
+                continue
+            airline = (flight.get('airline') or {}).get('name', 'Desconocida')
+            if not isinstance(airline, str):
+                continue
+            modelo_avion = (flight.get('aircraft') or {}).get('iata', 'Jet')
+            terminal = arrival.get('terminal')
+            origen_iata = departure.get('iata', 'UNK')
+            filas.append((
+                hora_str,
+                status_raw in ESTADOS_ATERRIZANDO,
+                (flight.get('flight') or {}).get('iata', 'UNK'),
+                airline,
+                origen_iata,
+                departure.get('airport', origen_iata),
+                f"{modelo_avion}",
+                modelo_avion if isinstance(modelo_avion, str) else "",
+                f"{terminal}" if terminal else "",
+            ))
+        except Exception:
+            continue
+
+    # Las horas se repiten mucho (salidas programadas en punto, :05, :10...): se parsea cada una una vez
+    horas = {h: _parsear_hora(h) for h in {f[0] for f in filas}}
+    filas = [f for f in filas if horas[f[0]] is not None]
+    columnas = list(zip(*filas)) or [()] * 9
+    dia, minuto, hora = zip(*(horas[h] for h in columnas[0])) if filas else ((), (), ())
+
+    tabla = {
+        "dia": np.array(dia, dtype=np.int64),
+        "minuto": np.array(minuto, dtype=np.int64),
+        "hora": np.array(hora, dtype=str),
+        "aterrizando": np.array(columnas[1], dtype=bool),
+        "id": np.array(columnas[2], dtype=object),
+        "aerolinea": np.array(columnas[3], dtype=str),
+        "origen_iata": np.array(columnas[4], dtype=object),
+        "origen": np.array(columnas[5], dtype=object),
+        "avion": np.array(columnas[6], dtype=object),
+        "modelo": np.array(columnas[7], dtype=str),
+        "terminal": np.array(columnas[8], dtype=str),
+    }
+    return inferir(tabla, modelo)
+
+
+# =============================================================================
+# 3. INFERENCIA SOBRE ARRAYS (TERMINAL, PUENTE, EASYJET, PAX)
+# =============================================================================
+def inferir(tabla, modelo=None):
+    """Una consulta al modelo por aerolínea y por avión distintos; el resto son máscaras."""
+    modelo = modelo or cargar_modelo()
+    aerolinea = modelo.columnas_aerolinea(tabla["aerolinea"])
+    tabla["terminal"] = np.where(tabla["terminal"] == "", aerolinea["terminal"], tabla["terminal"])
+    tabla["es_puente"] = (tabla["origen_iata"] == modelo.origen_puente) & aerolinea["puente"]
+    tabla["es_easyjet"] = aerolinea["t2c"]
+    estimados = np.rint(modelo.columna_asientos(tabla["modelo"]) * aerolinea["factor_carga"]).astype(np.int64)
+    tabla["pax"] = np.where(tabla["es_puente"], modelo.pax_puente,
+                            np.where(aerolinea["pax"] >= 0, aerolinea["pax"], estimados)).astype(np.int64)
+    return tabla
+
+
+# =============================================================================
+# 4. AGREGADOS
+# =============================================================================
+def kpis_por_terminal(tabla):
+    """Vuelos y pax de T1, T2, puente (dentro de T1) y T2C (easyJet dentro de T2)."""
+    t1 = tabla["terminal"] == "1"
+    t2 = tabla["terminal"] == "2"
+    # 0 = T1, 1 = T2, 2 = otra terminal (no cuenta en las tarjetas)
+    codigo = np.select([t1, t2], [0, 1], 2)
+    vuelos = np.bincount(codigo, minlength=3)
+    pax = np.bincount(codigo, weights=tabla["pax"], minlength=3)
+    puente = t1 & tabla["es_puente"]
+    t2c = t2 & tabla["es_easyjet"]
+    return {
+        "t1": {"vuelos": int(vuelos[0]), "pax": int(pax[0])},
+        "t2": {"vuelos": int(vuelos[1]), "pax": int(pax[1])},
+        "puente": {"vuelos": int(puente.sum()), "pax": int(tabla["pax"][puente].sum())},
+        "t2c": {"vuelos": int(t2c.sum()), "pax": int(tabla["pax"][t2c].sum())},
+    }
+
+
+def evolucion(tabla, minutos_bloque=60, desde=None, dias=None, pesos="pax"):
+    """
+    Suma de `pesos` (columna de la tabla, o None para contar vuelos) por franja de
+    `minutos_bloque` minutos. Sin `dias` se suman todas las fechas en un solo día (la
+    gráfica de siempre, claves "HH" con franjas de 60 min y "HH:MM" con el resto); con
+    `dias` es una ventana de varios días desde `desde` (date; por defecto el primer día
+    con vuelos) y las claves llevan la fecha: "YYYY-MM-DD HH:MM".
+    """
+    if minutos_bloque <= 0 or MINUTOS_DIA % minutos_bloque:
+        raise ValueError(f"minutos_bloque debe dividir el día en franjas enteras: {minutos_bloque}")
+    franjas_dia = MINUTOS_DIA // minutos_bloque
+    franja = tabla["minuto"] // minutos_bloque
+    valores = tabla[pesos] if pesos else None
+    if minutos_bloque == 60 and dias is None:
+        etiquetas = [f"{h:02d}" for h in range(24)]
+    else:
+        etiquetas = [f"{m // 60:02d}:{m % 60:02d}" for m in range(0, MINUTOS_DIA, minutos_bloque)]
+
+    if dias is None:
+        totales = np.bincount(franja, weights=valores, minlength=franjas_dia)
+        return {e: int(t) for e, t in zip(etiquetas, totales)}
+
+    if desde is None:
+        inicio = int(tabla["dia"].min()) if len(tabla["dia"]) else date.today().toordinal()
+    else:
+        inicio = desde.toordinal()
+    indice = (tabla["dia"] - inicio) * franjas_dia + franja
+    dentro = (indice >= 0) & (indice < dias * franjas_dia)
+    totales = np.bincount(indice[dentro], weights=valores[dentro] if valores is not None else None,
+                          minlength=dias * franjas_dia)
+    fechas = [date.fromordinal(inicio + d).isoformat() for d in range(dias)]
+    return {f"{fechas[i // franjas_dia]} {etiquetas[i % franjas_dia]}": int(t) for i, t in enumerate(totales)}
+
+
+def lista_vuelos(tabla):
+    """Vuelos para la app, ordenados por hora (orden estable, como list.sort)."""
+    orden = np.argsort(tabla["hora"], kind="stable")
+    aterrizando = tabla["aterrizando"][orden]
+    estado = np.where(aterrizando, "Aterrizando", "En hora")
+    estado_color = np.where(aterrizando, "warning", "secondary")
+    columnas = zip(
+        tabla["id"][orden].tolist(), tabla["aerolinea"][orden].tolist(), tabla["origen"][orden].tolist(),
+        tabla["hora"][orden].tolist(), tabla["terminal"][orden].tolist(), tabla["es_puente"][orden].tolist(),
+        tabla["es_easyjet"][orden].tolist(), tabla["avion"][orden].tolist(), tabla["pax"][orden].tolist(),
+        estado.tolist(), estado_color.tolist(),
+    )
+    return [{
+        "id": id_,
+        "aerolinea": aerolinea,
+        "origen": origen,
+        "hora": hora,
+        "terminal": f"T{terminal}",
+        "es_puente": es_puente,
+        "es_t2c": es_easyjet,
+        "avion": avion,
+        "pax": pax,
+        "estado": est,
+        "estado_color": color,
+    } for id_, aerolinea, origen, hora, terminal, es_puente, es_easyjet, avion, pax, est, color in columnas]
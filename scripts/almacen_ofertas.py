@@ -0,0 +1,131 @@
+"""
+Almacén SQLite de ofertas de licencias, a nivel de anuncio.
+
+    python scripts/almacen_ofertas.py mediana --dias 90   # mediana neta por día de descanso
+    python scripts/almacen_ofertas.py permanencia         # días publicado y deriva de precio
+
+Cada oferta limpia (ver procesado_licen.py) se guarda con su huella (fuente + referencia
+del anuncio) como id, así el mismo anuncio se reconoce entre ejecuciones y días aunque
+cambie de precio. La base no se versiona: en CI viaja en la caché de Actions.
+"""
+import argparse
+import os
+import sqlite3
+from datetime import date, timedelta
+from statistics import median
+
+FILE_ALMACEN = os.environ.get("ALMACEN_OFERTAS", "data/ofertas.sqlite")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ofertas (
+    id INTEGER PRIMARY KEY,
+    fuente TEXT NOT NULL,
+    dia TEXT NOT NULL,
+    modelo TEXT NOT NULL,
+    raw TEXT,
+    primera_vez TEXT NOT NULL,
+    ultima_vez TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observaciones (
+    id INTEGER NOT NULL REFERENCES ofertas(id),
+    fecha TEXT NOT NULL,
+    precio_total INTEGER NOT NULL,
+    valor_coche INTEGER NOT NULL,
+    precio_neto INTEGER NOT NULL,
+    PRIMARY KEY (id, fecha)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_ofertas_fuente_dia_modelo ON ofertas (fuente, dia, modelo);
+CREATE INDEX IF NOT EXISTS idx_observaciones_fecha ON observaciones (fecha, id, precio_neto);
+"""
+
+
+class AlmacenOfertas:
+    def __init__(self, ruta=FILE_ALMACEN):
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self.con = sqlite3.connect(ruta)
+        self.con.executescript(ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self.con.close()
+
+    def registrar(self, df, fecha):
+        """Upsert de las ofertas limpias del día (DataFrame de limpiar_ofertas). Idempotente por fecha."""
+        filas = df[["id", "fuente", "dia", "modelo", "raw", "precio_total", "valor_coche", "precio_neto"]].to_dict("records")
+        with self.con:
+            self.con.executemany("""
+                INSERT INTO ofertas (id, fuente, dia, modelo, raw, primera_vez, ultima_vez)
+                VALUES (:id, :fuente, :dia, :modelo, :raw, :fecha, :fecha)
+                ON CONFLICT (id) DO UPDATE SET
+                    dia = excluded.dia, modelo = excluded.modelo,
+                    primera_vez = min(primera_vez, excluded.primera_vez),
+                    ultima_vez = max(ultima_vez, excluded.ultima_vez)
+            """, [dict(f, fecha=fecha) for f in filas])
+            self.con.executemany("""
+                INSERT OR REPLACE INTO observaciones (id, fecha, precio_total, valor_coche, precio_neto)
+                VALUES (:id, :fecha, :precio_total, :valor_coche, :precio_neto)
+            """, [dict(f, fecha=fecha) for f in filas])
+        return len(filas)
+
+    def mediana_por_dia(self, dias=90, hasta=None, fuente=None, modelo=None):
+        """Mediana de precio_neto por día de descanso sobre todas las observaciones de la ventana."""
+        hasta = hasta or date.today().isoformat()
+        desde = (date.fromisoformat(hasta) - timedelta(days=dias)).isoformat()
+        filtros, params = "", [desde, hasta]
+        if fuente:
+            filtros += " AND o.fuente = ?"
+            params.append(fuente)
+        if modelo:
+            filtros += " AND o.modelo = ?"
+            params.append(modelo)
+        cursor = self.con.execute(f"""
+            SELECT o.dia, b.precio_neto
+            FROM observaciones b JOIN ofertas o ON o.id = b.id
+            WHERE b.fecha > ? AND b.fecha <= ?{filtros}
+        """, params)
+        precios = {}
+        for dia, precio in cursor:
+            precios.setdefault(dia, []).append(precio)
+        return {dia: int(median(lista)) for dia, lista in precios.items()}
+
+    def permanencia(self, fuente=None):
+        """Por anuncio: días publicado y deriva del precio neto entre la primera y la última observación."""
+        cursor = self.con.execute("""
+            SELECT o.id, o.fuente, o.dia, o.modelo, o.primera_vez, o.ultima_vez,
+                   (SELECT precio_neto FROM observaciones WHERE id = o.id AND fecha = o.primera_vez),
+                   (SELECT precio_neto FROM observaciones WHERE id = o.id AND fecha = o.ultima_vez)
+            FROM ofertas o
+            WHERE ? IS NULL OR o.fuente = ?
+            ORDER BY o.primera_vez
+        """, (fuente, fuente))
+        return [{
+            "id": id_, "fuente": f, "dia": dia, "modelo": modelo,
+            "primera_vez": primera, "ultima_vez": ultima,
+            "dias_publicado": (date.fromisoformat(ultima) - date.fromisoformat(primera)).days + 1,
+            "deriva_precio": (neto_fin - neto_ini) if neto_ini is not None and neto_fin is not None else None,
+        } for id_, f, dia, modelo, primera, ultima, neto_ini, neto_fin in cursor]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consultas sobre el almacén de ofertas")
+    parser.add_argument("consulta", choices=["mediana", "permanencia"])
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--fuente")
+    parser.add_argument("--modelo")
+    parser.add_argument("--db", default=FILE_ALMACEN)
+    args = parser.parse_args()
+
+    with AlmacenOfertas(args.db) as almacen:
+        if args.consulta == "mediana":
+            for dia, precio in sorted(almacen.mediana_por_dia(args.dias, fuente=args.fuente, modelo=args.modelo).items()):
+                print(f"{dia:<20} {precio:>10,}€")
+        else:
+            for r in almacen.permanencia(args.fuente):
+                print(f"{r['id']:>20} {r['fuente']:<12} {r['modelo']:<18} {r['primera_vez']} → {r['ultima_vez']} "
+                      f"({r['dias_publicado']} días, {r['deriva_precio'] or 0:+,}€)")
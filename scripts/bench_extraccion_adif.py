@@ -0,0 +1,83 @@
+"""
+Benchmark de la extracción de la tabla de ADIF: bulk (una llamada) vs por celda.
+
+    python scripts/bench_extraccion_adif.py               # tabla sintética de 300 filas
+    python scripts/bench_extraccion_adif.py --filas 1000 -n 5
+
+Carga en Chrome headless una tabla #horas-trenes-estacion-llegadas sintética (horas con
+<br>, prefijos "RF - ", Rodalies, espacios y &nbsp;), la extrae por los dos caminos y
+compara tiempos, round-trips WebDriver y que los trenes resultantes sean idénticos.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, DIR_SCRIPTS)
+
+import instrumentacion
+from adif_scrap import celdas_desde, celdas_por_elemento, trenes_de_celdas
+from navegador import crear_driver
+
+ORIGENES = ["MADRID-PUERTA DE ATOCHA", "SEVILLA-SANTA JUSTA", "VALÈNCIA-JOAQUÍN SOROLLA", "PARIS GARE DE LYON", "MATARÓ"]
+TIPOS = ["RF - AVE 0{}", "AVLO 0{}", "OUIGO 0{}", "RI - IRYO 0{}", "MD - MD 1{}", "RODALIES R2 {}", "ALVIA 0{}", "R11 - R11 {}"]
+
+
+def generar_tabla(n_filas, semilla=42):
+    rnd = random.Random(semilla)
+    filas = []
+    for i in range(n_filas):
+        minuto = 360 + i * 1080 // max(n_filas, 1)
+        hora = f"{minuto // 60:02d}:{minuto % 60:02d}"
+        if rnd.random() < 0.3: # Retrasado: hora prevista tachada + hora real
+            hora = f"<s>{hora}</s><br> {(minuto + 7) // 60:02d}:{(minuto + 7) % 60:02d} "
+        tipo = rnd.choice(TIPOS).format(rnd.randint(1000, 9999))
+        via = rnd.choice(["", "5", "12", "&nbsp;"])
+        filas.append(f"<tr><td>{hora}</td><td> {rnd.choice(ORIGENES)} </td><td>{tipo}</td><td>{via}</td></tr>")
+    return ("<html><body><table id='horas-trenes-estacion-llegadas'><thead><tr><th>Hora</th></tr></thead>"
+            f"<tbody>{''.join(filas)}</tbody></table></body></html>")
+
+
+def medir(nombre, extraer, driver, repeticiones):
+    mejor, celdas = float("inf"), None
+    for _ in range(repeticiones):
+        with instrumentacion.tramo(nombre):
+            inicio = time.perf_counter()
+            celdas = extraer(driver)
+            mejor = min(mejor, time.perf_counter() - inicio)
+    llamadas = instrumentacion.resumen()["tramos"][nombre]["contadores"].get("webdriver", 0) // repeticiones
+    return mejor, llamadas, trenes_de_celdas(celdas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark extracción ADIF bulk vs por celda")
+    parser.add_argument("--filas", type=int, default=300)
+    parser.add_argument("-n", "--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".html", delete=False, encoding="utf-8") as f:
+        f.write(generar_tabla(args.filas))
+    instrumentacion.contar_webdriver()
+    driver = crear_driver()
+    try:
+        driver.get("file://" + f.name)
+        t_bulk, rt_bulk, trenes_bulk = medir("bulk", lambda d: celdas_desde(d, 0), driver, args.repeticiones)
+        t_celda, rt_celda, trenes_celda = medir("celda", celdas_por_elemento, driver, args.repeticiones)
+    finally:
+        driver.quit()
+        os.remove(f.name)
+
+    iguales = trenes_bulk == trenes_celda
+    print(f"🧪 {args.filas} filas sintéticas -> {len(trenes_celda)} trenes de larga distancia")
+    print(f"🔍 Equivalencia: {'OK' if iguales else 'DISTINTOS'}")
+    if not iguales:
+        for a, b in zip(trenes_bulk, trenes_celda):
+            if a != b:
+                print(f"❌ bulk: {a}\n   celda: {b}")
+                break
+    print(f"⏱️ Por celda: {t_celda * 1000:8.1f} ms, {rt_celda} round-trips WebDriver")
+    print(f"⏱️ Bulk:      {t_bulk * 1000:8.1f} ms, {rt_bulk} round-trips WebDriver (x{t_celda / t_bulk:.0f})")
+    sys.exit(0 if iguales else 1)
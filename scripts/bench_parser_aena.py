@@ -0,0 +1,103 @@
+"""
+Micro-benchmark y test de equivalencia del parser de filas AENA (v4 vs v5).
+
+    python scripts/bench_parser_aena.py                       # corpus de fixtures
+    python scripts/bench_parser_aena.py --corpus archivo.jsonl -n 20
+    python scripts/bench_parser_aena.py --generar             # regenera el corpus desde public/vuelos.json
+
+El corpus es un JSONL con [hora, texto_fila] por línea (lo mismo que devuelve la
+extracción del DOM), así que sirve también para re-parsear archivos históricos.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, DIR_SCRIPTS)
+
+from aena_scrap import parsear_fila_aena_v4, parsear_fila_aena_v5
+
+CORPUS_FIXTURES = os.path.join(DIR_SCRIPTS, "fixtures", "aena_filas.jsonl")
+SNAPSHOT = os.path.join(DIR_SCRIPTS, "..", "public", "vuelos.json")
+
+
+def generar_corpus(ruta_snapshot, semilla=42):
+    """Reconstruye filas como las pinta la web a partir de un vuelos.json, con variantes raras."""
+    rnd = random.Random(semilla)
+    filas = []
+    with open(ruta_snapshot, encoding="utf-8") as f:
+        vuelos = json.load(f)
+    for v in vuelos:
+        terminal = "T2" if v["terminal"].startswith("T2") else v["terminal"]
+        for codigo in v["vuelo"].split(" / "):
+            partes = [v["hora"], codigo, v["origen"], terminal, v["sala"], v["estado"]]
+            variante = rnd.random()
+            if variante < 0.1: partes[3] = f"Terminal {terminal}"
+            elif variante < 0.2: partes[3] = terminal.lower()
+            elif variante < 0.3: partes.insert(2, "Llegada prevista " + v["hora"])
+            elif variante < 0.35: partes[2] = "T1 " + partes[2]
+            elif variante < 0.4: partes = partes[:2]
+            elif variante < 0.45: partes[-1] = "Última llamada"
+            elif variante < 0.5: partes.append("Cinta 12")
+            filas.append([v["hora"], " | ".join(p for p in partes if p != "N/A")])
+    # Casos límite
+    filas += [["10:00", ""], ["10:00", "10:00"], ["10:00", " | | "], ["10:00", "VY1234"],
+              ["10:00", "10:00 | IBE12345 | MADRID | T1"], ["10:00", "10:00 | ab123 | X | T2 | SALA C"],
+              ["10:00", "10:00 | VLG1234 | PARÍS | TERMINAL T2 | B | Retrasado 10:40"]]
+    return filas
+
+
+def cargar_corpus(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+
+def comprobar_equivalencia(filas):
+    distintas = 0
+    for hora, texto in filas:
+        a = json.dumps(parsear_fila_aena_v4(texto, hora), ensure_ascii=False)
+        b = json.dumps(parsear_fila_aena_v5(texto, hora), ensure_ascii=False)
+        if a != b:
+            distintas += 1
+            if distintas <= 5:
+                print(f"❌ Diferencia en {texto!r}\n   v4: {a}\n   v5: {b}")
+    return distintas
+
+
+def medir(parser, filas, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for hora, texto in filas:
+            parser(texto, hora)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return len(filas) / mejor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parser AENA v4 vs v5")
+    parser.add_argument("--corpus", default=CORPUS_FIXTURES)
+    parser.add_argument("-n", "--repeticiones", type=int, default=10)
+    parser.add_argument("--generar", action="store_true", help="Regenerar el corpus de fixtures")
+    args = parser.parse_args()
+
+    if args.generar:
+        filas = generar_corpus(SNAPSHOT)
+        os.makedirs(os.path.dirname(CORPUS_FIXTURES), exist_ok=True)
+        with open(CORPUS_FIXTURES, "w", encoding="utf-8") as f:
+            for fila in filas:
+                f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+        print(f"💾 {len(filas)} filas escritas en {CORPUS_FIXTURES}")
+        sys.exit(0)
+
+    filas = cargar_corpus(args.corpus)
+    distintas = comprobar_equivalencia(filas)
+    print(f"🔍 Equivalencia: {len(filas) - distintas}/{len(filas)} filas idénticas")
+
+    v4 = medir(parsear_fila_aena_v4, filas, args.repeticiones)
+    v5 = medir(parsear_fila_aena_v5, filas, args.repeticiones)
+    print(f"⏱️ v4: {v4:,.0f} filas/s | v5: {v5:,.0f} filas/s | x{v5 / v4:.2f}")
+    sys.exit(1 if distintas else 0)
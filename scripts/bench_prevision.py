@@ -0,0 +1,89 @@
+"""
+Benchmark de reconstrucción de la previsión de demanda sobre un año de histórico.
+
+    python scripts/bench_prevision.py                  # 365 días, ~1.100 vuelos + 150 trenes/día
+    python scripts/bench_prevision.py --dias 730 -n 3
+
+Mide las dos piezas que se recalculan al reconstruir: las curvas diarias de todas las
+llegadas del periodo (un bincount + desfase) y los patrones semanales de todos los días
+(sumas acumuladas). Ambas se comparan con la versión directa, día a día.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, DIR_SCRIPTS)
+
+from prevision_demanda import (DESFASES_ZONA, FRANJAS_DIA, MINUTOS_BLOQUE, ZONAS, aplicar_desfase,
+                               curvas_diarias, perfil_dia, perfiles_semanales)
+
+
+def generar_llegadas(dias, vuelos_dia=1100, trenes_dia=150, semilla=42):
+    """Llegadas sintéticas con picos de mañana y tarde; (dia, minuto, zona, pax) como arrays."""
+    rnd = np.random.default_rng(semilla)
+    n_vuelos, n_trenes = dias * vuelos_dia, dias * trenes_dia
+    minuto = np.concatenate([
+        np.clip(rnd.normal(rnd.choice([600, 1140], n_vuelos), 150), 0, 1439),
+        rnd.integers(360, 1440, n_trenes),
+    ]).astype(np.int64)
+    zona = np.concatenate([rnd.choice(4, n_vuelos, p=[0.5, 0.3, 0.1, 0.1]),
+                           np.full(n_trenes, ZONAS.index("sants"))]).astype(np.int64)
+    pax = np.concatenate([rnd.choice([160, 170, 180, 300], n_vuelos, p=[0.6, 0.1, 0.1, 0.2]),
+                          rnd.choice([150, 200, 300, 350], n_trenes)]).astype(float)
+    dia = np.concatenate([rnd.integers(0, dias, n_vuelos), rnd.integers(0, dias, n_trenes)]).astype(np.int64)
+    return dia, minuto, zona, pax
+
+
+def curvas_directo(dia, minuto, zona, pax, n_dias):
+    """Referencia: un acumulador por llegada y el desfase franja a franja."""
+    llegadas = np.zeros((len(ZONAS), n_dias * FRANJAS_DIA))
+    for d, m, z, p in zip(dia.tolist(), minuto.tolist(), zona.tolist(), pax.tolist()):
+        llegadas[z, d * FRANJAS_DIA + m // MINUTOS_BLOQUE] += p
+    salida = np.zeros_like(llegadas)
+    for z in range(len(ZONAS)):
+        for f in range(llegadas.shape[1]):
+            for k, peso in enumerate(DESFASES_ZONA[z]):
+                if f + k < llegadas.shape[1]:
+                    salida[z, f + k] += peso * llegadas[z, f]
+    return salida.reshape(len(ZONAS), n_dias, FRANJAS_DIA).transpose(1, 0, 2)
+
+
+def medir(funcion, repeticiones):
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de reconstrucción de la previsión de demanda")
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("-n", "--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    dia, minuto, zona, pax = generar_llegadas(args.dias)
+    print(f"🧪 {len(dia):,} llegadas sintéticas en {args.dias} días")
+
+    t_curvas, curvas = medir(lambda: aplicar_desfase(curvas_diarias(dia, minuto, zona, pax, args.dias), DESFASES_ZONA),
+                             args.repeticiones)
+    t_curvas_ref, curvas_ref = medir(lambda: curvas_directo(dia, minuto, zona, pax, args.dias), 1)
+
+    dias = np.arange(args.dias, dtype=np.int64) + 738000
+    t_perfiles, perfiles = medir(lambda: perfiles_semanales(dias, curvas), args.repeticiones)
+    t_perfiles_ref, perfiles_ref = medir(lambda: [perfil_dia(dias, curvas, d) for d in dias], 1)
+
+    iguales_curvas = np.allclose(curvas, curvas_ref)
+    iguales_perfiles = all(np.isnan(p).all() if r is None else np.allclose(p, r)
+                           for p, r in zip(perfiles, perfiles_ref))
+    print(f"🔍 Equivalencia: curvas {'OK' if iguales_curvas else 'DISTINTAS'} | "
+          f"perfiles {'OK' if iguales_perfiles else 'DISTINTOS'}")
+    print(f"⏱️ Curvas:   {t_curvas * 1000:8.1f} ms (directo {t_curvas_ref * 1000:,.0f} ms, x{t_curvas_ref / t_curvas:.0f})")
+    print(f"⏱️ Perfiles: {t_perfiles * 1000:8.1f} ms (directo {t_perfiles_ref * 1000:,.0f} ms, x{t_perfiles_ref / t_perfiles:.0f})")
+    print(f"⏱️ Reconstrucción completa: {(t_curvas + t_perfiles) * 1000:.1f} ms")
+    sys.exit(0 if iguales_curvas and iguales_perfiles else 1)
@@ -0,0 +1,166 @@
+"""
+Benchmark offline de los scrapers contra fixtures grabados (ver fixtures_replay.py).
+
+    python scripts/benchmark_scrapers.py                 # todos los que tengan fixtures
+    python scripts/benchmark_scrapers.py aena adif -r 3  # 3 repeticiones
+    python scripts/benchmark_scrapers.py --json bench.json
+
+Por scraper mide: tiempo total, round-trips WebDriver, pico de RSS (Python y
+árbol completo con Chrome) y registros producidos. Cada medición corre en un
+subproceso para que los picos de memoria no se mezclen.
+"""
+import argparse
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, DIR_SCRIPTS)
+
+import fixtures_replay
+from instrumentacion import rss_arbol_kb
+
+# En replay no queremos que Chrome salga a internet: todo lo que no sea local falla rápido
+ARGS_CHROME_OFFLINE = ["--host-resolver-rules=MAP * ~NOTFOUND , EXCLUDE 127.0.0.1"]
+
+
+# =============================================================================
+# 1. MEDICIÓN (dentro del subproceso)
+# =============================================================================
+def instalar_contador(contador, args_extra=()):
+    """Cuenta cada comando WebDriver (cada uno es una petición HTTP a chromedriver)."""
+    from selenium.webdriver import Chrome
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+    init_original = Chrome.__init__
+    execute_original = WebDriver.execute
+
+    def init(self, *args, **kwargs):
+        opciones = kwargs.get("options")
+        if opciones is not None:
+            for arg in args_extra:
+                opciones.add_argument(arg)
+        init_original(self, *args, **kwargs)
+
+    def execute(self, comando, params=None):
+        contador["webdriver"] += 1
+        return execute_original(self, comando, params)
+
+    Chrome.__init__ = init
+    WebDriver.execute = execute
+
+
+def medir_en_proceso(nombre):
+    conf = fixtures_replay.SCRAPERS[nombre]
+    contador = {"webdriver": 0}
+    instalar_contador(contador, ARGS_CHROME_OFFLINE)
+    modulo = importlib.import_module(conf["modulo"])
+
+    inicio = time.perf_counter()
+    resultado = getattr(modulo, conf["funcion"])()
+    tiempo = time.perf_counter() - inicio
+
+    return {
+        "scraper": nombre,
+        "tiempo_s": round(tiempo, 3),
+        "webdriver_roundtrips": contador["webdriver"],
+        "registros": len(resultado or []),
+        # ru_maxrss viene en KB en Linux
+        "rss_python_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+# =============================================================================
+# 2. MUESTREO DE MEMORIA DEL ÁRBOL DE PROCESOS (/proc, solo Linux)
+# =============================================================================
+class MuestreadorRSS(threading.Thread):
+    def __init__(self, pid, intervalo=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.intervalo = intervalo
+        self.pico_kb = 0
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.is_set():
+            self.pico_kb = max(self.pico_kb, rss_arbol_kb(self.pid))
+            self._parar.wait(self.intervalo)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+# =============================================================================
+# 3. ORQUESTACIÓN
+# =============================================================================
+def ejecutar_benchmark(nombre):
+    servidor = fixtures_replay.arrancar_en_segundo_plano(nombre)
+    entorno = dict(os.environ)
+    entorno.update(fixtures_replay.entorno_replay(servidor))
+    entorno.setdefault("SCRAPER_API_KEY", "replay")
+
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--interno", nombre],
+        env=entorno, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    muestreador = MuestreadorRSS(proceso.pid)
+    muestreador.start()
+    salida, _ = proceso.communicate()
+    muestreador.parar()
+    servidor.shutdown()
+
+    lineas = [l for l in salida.splitlines() if l.startswith("{\"scraper\"")]
+    if proceso.returncode != 0 or not lineas:
+        print(salida[-2000:])
+        raise RuntimeError(f"El benchmark de {nombre} falló (código {proceso.returncode})")
+    resultado = json.loads(lineas[-1])
+    resultado["rss_arbol_mb"] = round(muestreador.pico_kb / 1024, 1)
+    return resultado
+
+
+def imprimir_tabla(resultados):
+    cabecera = f"{'scraper':<10} {'tiempo (s)':>10} {'webdriver':>10} {'RSS py':>8} {'RSS total':>10} {'registros':>10}"
+    print("\n" + cabecera)
+    print("-" * len(cabecera))
+    for r in resultados:
+        print(f"{r['scraper']:<10} {r['tiempo_s']:>10.2f} {r['webdriver_roundtrips']:>10} "
+              f"{r['rss_python_mb']:>8.1f} {r['rss_arbol_mb']:>10.1f} {r['registros']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline de scrapers")
+    parser.add_argument("scrapers", nargs="*", help=f"Cualquiera de: {', '.join(sorted(fixtures_replay.SCRAPERS))}")
+    parser.add_argument("-r", "--repeticiones", type=int, default=1)
+    parser.add_argument("--json", help="Guardar resultados en este fichero")
+    parser.add_argument("--interno", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(medir_en_proceso(args.interno)))
+        sys.exit(0)
+
+    desconocidos = set(args.scrapers) - set(fixtures_replay.SCRAPERS)
+    if desconocidos:
+        parser.error(f"Scrapers desconocidos: {', '.join(sorted(desconocidos))}")
+
+    nombres = args.scrapers or [n for n in sorted(fixtures_replay.SCRAPERS)
+                                if os.path.exists(os.path.join(fixtures_replay.DIR_FIXTURES, n, "manifest.json"))]
+    if not nombres:
+        print(f"⚠️ No hay fixtures en {fixtures_replay.DIR_FIXTURES}. Graba primero con fixtures_replay.py grabar <scraper>.")
+        sys.exit(1)
+
+    resultados = []
+    for nombre in nombres:
+        for i in range(args.repeticiones):
+            print(f"⏱️ {nombre} ({i + 1}/{args.repeticiones})...")
+            resultados.append(ejecutar_benchmark(nombre))
+
+    imprimir_tabla(resultados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=4)
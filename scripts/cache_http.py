@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# =============================================================================
+# CACHÉ HTTP EN DISCO (TTL POR ENDPOINT + REVALIDACIÓN CONDICIONAL)
+# =============================================================================
+DIR_CACHE = os.environ.get("CACHE_HTTP_DIR", os.path.join("data", "cache_http"))
+# Segundos de vida por endpoint (último tramo de la ruta). Ajustable: CACHE_HTTP_TTL='{"flights": 600}'
+TTL_ENDPOINTS = {"flights": 15 * 60}
+TTL_ENDPOINTS.update(json.loads(os.environ.get("CACHE_HTTP_TTL", "{}")))
+TTL_DEFECTO = 10 * 60
+# Nunca forman parte de la clave ni se guardan en disco
+PARAMS_SECRETOS = {"access_key", "api_key", "apikey", "key", "token"}
+
+
+def _escribir_json(ruta, datos):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = f"{ruta}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def _leer_json(ruta, defecto=None):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return defecto
+
+
+def peticiones_reales(response):
+    """1 + reintentos que hizo urllib3 por debajo (la cuota cuenta cada uno)."""
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    return 1 + len(getattr(retries, "history", ()) or ())
+
+
+def get_contando(sesion, url, **kwargs):
+    """
+    sesion.get que devuelve (response, peticiones reales). Si acaba en excepción, esta lleva
+    `peticiones` con el peor caso (la primera + todos los reintentos): la cuota se gasta igual.
+    """
+    try:
+        response = sesion.get(url, **kwargs)
+    except Exception as e:
+        reintentos = getattr(sesion.get_adapter(url).max_retries, "total", 0)
+        e.peticiones = 1 + (reintentos or 0)
+        raise
+    return response, peticiones_reales(response)
+
+
+def json_contando(response, peticiones):
+    """response.json(); si no es JSON, el ValueError lleva las peticiones ya gastadas."""
+    try:
+        return response.json()
+    except ValueError as e:
+        e.peticiones = peticiones
+        raise
+
+
+class CacheHTTP:
+    def __init__(self, directorio=DIR_CACHE, ttl_endpoints=None, ttl_defecto=TTL_DEFECTO):
+        self.directorio = directorio
+        self.ttl_endpoints = TTL_ENDPOINTS if ttl_endpoints is None else ttl_endpoints
+        self.ttl_defecto = ttl_defecto
+
+    def ttl(self, url):
+        endpoint = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+        return self.ttl_endpoints.get(endpoint, self.ttl_defecto)
+
+    def clave(self, url, params):
+        publicos = sorted((k, str(v)) for k, v in (params or {}).items() if k.lower() not in PARAMS_SECRETOS)
+        return hashlib.sha256(json.dumps([url, publicos]).encode("utf-8")).hexdigest()[:24]
+
+    def get(self, sesion, url, params=None, timeout=20, ttl=None):
+        """
+        Devuelve (json, origen, peticiones) con origen 'cache' (0 peticiones), 'revalidada'
+        (304 del servidor) o 'red'. Solo se guardan respuestas 200 sin 'error'.
+        """
+        ruta = os.path.join(self.directorio, self.clave(url, params) + ".json")
+        entrada = _leer_json(ruta)
+        ttl = self.ttl(url) if ttl is None else ttl
+        if entrada and time.time() - entrada["guardado"] < ttl:
+            return entrada["cuerpo"], "cache", 0
+
+        cabeceras = {}
+        if entrada and entrada.get("etag"):
+            cabeceras["If-None-Match"] = entrada["etag"]
+        if entrada and entrada.get("last_modified"):
+            cabeceras["If-Modified-Since"] = entrada["last_modified"]
+
+        response, peticiones = get_contando(sesion, url, params=params, timeout=timeout, headers=cabeceras)
+        if response.status_code == 304 and entrada:
+            entrada["guardado"] = time.time()
+            _escribir_json(ruta, entrada)
+            return entrada["cuerpo"], "revalidada", peticiones
+
+        cuerpo = json_contando(response, peticiones)
+        if response.status_code == 200 and not (isinstance(cuerpo, dict) and "error" in cuerpo):
+            _escribir_json(ruta, {
+                "url": url,
+                "guardado": time.time(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "cuerpo": cuerpo,
+            })
+        return cuerpo, "red", peticiones
+
+
+# =============================================================================
+# LIBRO DE CUOTA MENSUAL (PERSISTENTE)
+# =============================================================================
+# El libro se versiona (no está en .gitignore): quien ejecute update_data.py tiene que
+# commitearlo junto a public/data.json, o la cuota del mes vuelve a empezar de cero.
+FILE_CUOTA = os.environ.get("CUOTA_FILE", os.path.join("data", "cuota_aviationstack.json"))
+CUOTA_MES = int(os.environ.get("AVIATIONSTACK_CUOTA_MES", "100")) # Plan gratuito: 100 peticiones/mes
+RESERVA_CUOTA = float(os.environ.get("AVIATIONSTACK_RESERVA", "0.1")) # Por debajo de esto, modo mínimo
+
+
+class LibroCuota:
+    """Cuenta peticiones reales por mes y decide cuántas puede gastar cada ejecución."""
+
+    def __init__(self, ruta=FILE_CUOTA, limite=CUOTA_MES, reserva=RESERVA_CUOTA):
+        self.ruta = ruta
+        self.limite = limite
+        self.reserva = reserva
+        self.lock = threading.Lock()
+        ahora = datetime.now()
+        mes = ahora.strftime("%Y-%m")
+        self.estado = _leer_json(ruta, {})
+        if self.estado.get("mes") != mes:
+            if not self.estado and ahora.day > 1:
+                print(f"⚠️ No hay libro de cuota en {ruta}: se empieza de cero a mitad de mes. "
+                      f"Si esto es CI, el libro no se está guardando entre ejecuciones.")
+            self.estado = {"mes": mes, "usadas": 0, "ejecuciones": 0, "cache": 0}
+
+    @property
+    def restantes(self):
+        return max(0, self.limite - self.estado["usadas"])
+
+    def plan(self, maximo):
+        """
+        Peticiones permitidas en esta ejecución: `maximo` normalmente, 1 (solo la primera
+        página) si quedamos por debajo de la reserva y 0 si el mes está agotado.
+        """
+        if self.restantes <= 0:
+            print(f"⛔ Cuota agotada: {self.estado['usadas']}/{self.limite} peticiones en {self.estado['mes']}.")
+            return 0
+        if self.restantes <= self.limite * self.reserva:
+            print(f"⚠️ Cuota baja ({self.restantes} restantes): modo mínimo, 1 petición.")
+            return 1
+        return min(maximo, self.restantes)
+
+    def registrar(self, peticiones=0, desde_cache=0):
+        with self.lock:
+            self.estado["usadas"] += peticiones
+            self.estado["cache"] += desde_cache
+
+    def cerrar_ejecucion(self):
+        with self.lock:
+            self.estado["ejecuciones"] += 1
+            self.estado["ultima_ejecucion"] = datetime.now().isoformat(timespec="seconds")
+            _escribir_json(self.ruta, self.estado)
+        print(f"📒 Cuota {self.estado['mes']}: {self.estado['usadas']}/{self.limite} usadas "
+              f"({self.estado['cache']} respuestas servidas desde caché)")
@@ -0,0 +1,49 @@
+"""
+Runner combinado: AENA, ADIF y licencias con un mismo pool de Chromes calientes.
+
+    python scripts/ejecutar_todo.py                 # los tres trabajos
+    python scripts/ejecutar_todo.py aena adif       # solo algunos
+
+Chrome arranca una vez y se reutiliza entre trabajos en lugar de pagar el
+arranque (y ChromeDriverManager) en cada script.
+"""
+import sys
+import time
+
+import adif_scrap
+import aena_scrap
+import instrumentacion
+import licencia_scrap
+from navegador import PoolNavegadores
+
+TRABAJOS = {
+    "aena": lambda pool: aena_scrap.refrescar_vuelos(pool=pool),
+    "adif": lambda pool: adif_scrap.guardar_trenes(adif_scrap.obtener_trenes(pool=pool)),
+    "licencias": lambda pool: licencia_scrap.guardar_licencias(licencia_scrap.recolectar_licencias(pool=pool)),
+}
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or list(TRABAJOS)
+    desconocidos = [n for n in nombres if n not in TRABAJOS]
+    if desconocidos:
+        print(f"❌ Trabajos desconocidos: {', '.join(desconocidos)} (opciones: {', '.join(TRABAJOS)})")
+        sys.exit(1)
+
+    instrumentacion.iniciar("ejecutar_todo")
+    # Las fuentes de licencias van en paralelo: el pool admite tantos Chromes como ellas
+    pool = PoolNavegadores(maximo=licencia_scrap.MAX_DRIVERS)
+    fallos = 0
+    try:
+        for nombre in nombres:
+            inicio = time.time()
+            print(f"\n{'=' * 60}\n▶️ {nombre.upper()}\n{'=' * 60}")
+            try:
+                with instrumentacion.tramo(nombre):
+                    TRABAJOS[nombre](pool)
+            except Exception as e:
+                fallos += 1
+                print(f"❌ {nombre}: {e}")
+            print(f"⏱️ {nombre} terminado en {time.time() - inicio:.1f}s")
+    finally:
+        pool.cerrar()
+    sys.exit(1 if fallos else 0)
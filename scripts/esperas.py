@@ -0,0 +1,151 @@
+import os
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+# =============================================================================
+# ESPERAS POR EVENTO (SUSTITUYEN A LOS time.sleep FIJOS)
+# =============================================================================
+# Techo por defecto de cualquier espera. Si la página es lenta esperamos más que
+# el sleep antiguo, si es rápida salimos en cuanto la tabla cambia.
+TECHO_DEFECTO = float(os.environ.get("ESPERA_TECHO", "10"))
+
+# Cuenta filas con CSS o XPath (arguments[0] = selector, arguments[1] = tipo).
+# tipo 'hijos' = hijos directos del contenedor `sel`: coste constante aunque la tabla crezca.
+JS_CONTAR = """
+function __itaxiContar(sel, tipo) {
+    if (tipo === 'hijos') {
+        var c = document.querySelector(sel);
+        return c ? c.childElementCount : 0;
+    }
+    if (tipo === 'xpath') {
+        return document.evaluate('count(' + sel + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+    }
+    return document.querySelectorAll(sel).length;
+}
+"""
+
+# Instala un MutationObserver sobre el contenedor de la tabla ANTES de la acción
+# (click), para no perder mutaciones que ocurran entre el click y la espera.
+JS_PREPARAR = JS_CONTAR + """
+var cont = (arguments[2] && document.querySelector(arguments[2])) || document.body;
+if (window.__itaxiObs) window.__itaxiObs.disconnect();
+window.__itaxiMut = 0;
+window.__itaxiObs = new MutationObserver(function(m) { window.__itaxiMut += m.length; });
+window.__itaxiObs.observe(cont, {childList: true, subtree: true});
+return __itaxiContar(arguments[0], arguments[1]);
+"""
+
+# Resuelve en cuanto crece el nº de filas, o cuando hubo mutaciones y la tabla
+# lleva `quieto` ms sin cambiar. Si no pasa nada, resuelve al llegar al techo.
+JS_ESPERAR = JS_CONTAR + """
+var sel = arguments[0], tipo = arguments[1], previas = arguments[2];
+var techo = arguments[3], quieto = arguments[4], done = arguments[arguments.length - 1];
+var t0 = Date.now(), vistas = window.__itaxiMut || 0, ultimoCambio = vistas > 0 ? Date.now() : 0;
+(function tick() {
+    var n = __itaxiContar(sel, tipo);
+    var mut = window.__itaxiMut || 0;
+    if (mut !== vistas) { vistas = mut; ultimoCambio = Date.now(); }
+    var motivo = null;
+    if (n > previas) motivo = 'filas';
+    else if (ultimoCambio && Date.now() - ultimoCambio >= quieto) motivo = 'mutacion';
+    else if (Date.now() - t0 >= techo) motivo = 'techo';
+    if (motivo) {
+        if (window.__itaxiObs) { window.__itaxiObs.disconnect(); window.__itaxiObs = null; }
+        done({motivo: motivo, filas: n});
+    } else {
+        setTimeout(tick, 50);
+    }
+})();
+"""
+
+
+def _timeout_script(driver):
+    try:
+        return driver.timeouts.script
+    except Exception:
+        return 30 # Valor por defecto de WebDriver
+
+
+class EsperaTabla:
+    """
+    Espera compartida por los scrapers de AENA y ADIF.
+
+    Cada espera recibe el `fijo` que usaba el sleep antiguo para poder medir
+    cuántos segundos nos hemos ahorrado en la ejecución.
+    """
+
+    def __init__(self, driver, selector_filas, tipo="css", contenedor=None,
+                 techo=TECHO_DEFECTO, quieto=0.15):
+        self.driver = driver
+        self.selector_filas = selector_filas
+        self.tipo = tipo
+        self.contenedor = contenedor
+        self.techo = techo
+        self.quieto = quieto
+        self.esperas = 0
+        self.segundos_esperados = 0.0
+        self.segundos_fijos = 0.0
+        self.por_techo = 0
+
+    def _anotar(self, inicio, fijo, agotado=False):
+        transcurrido = time.time() - inicio
+        self.esperas += 1
+        self.segundos_esperados += transcurrido
+        self.segundos_fijos += fijo
+        if agotado:
+            self.por_techo += 1
+        return transcurrido
+
+    def contar_filas(self):
+        return int(self.driver.execute_script(
+            JS_CONTAR + "return __itaxiContar(arguments[0], arguments[1]);",
+            self.selector_filas, self.tipo))
+
+    def tras_accion(self, accion, fijo, techo=None):
+        """Ejecuta `accion()` (p.ej. un click) y espera a que la tabla reaccione."""
+        techo = self.techo if techo is None else techo
+        previas = int(self.driver.execute_script(JS_PREPARAR, self.selector_filas, self.tipo, self.contenedor))
+        accion()
+        inicio = time.time()
+        timeout_anterior = _timeout_script(self.driver)
+        try:
+            self.driver.set_script_timeout(techo + 5)
+            res = self.driver.execute_async_script(
+                JS_ESPERAR, self.selector_filas, self.tipo, previas,
+                int(techo * 1000), int(self.quieto * 1000))
+        except Exception:
+            # Si el script asíncrono falla, volvemos al comportamiento antiguo
+            time.sleep(max(0.0, fijo - (time.time() - inicio)))
+            res = {"motivo": "error", "filas": previas}
+        finally:
+            # Los drivers del pool se reutilizan: no les dejamos nuestro timeout
+            try: self.driver.set_script_timeout(timeout_anterior)
+            except Exception: pass
+        self._anotar(inicio, fijo, res.get("motivo") == "techo")
+        return res
+
+    def hasta_filas(self, minimo, fijo, techo=None):
+        """Espera a que haya al menos `minimo` filas (p.ej. la carga inicial)."""
+        return self.hasta(lambda d: self.contar_filas() >= minimo, fijo, techo)
+
+    def hasta(self, condicion, fijo, techo=None):
+        """Como WebDriverWait.until, pero sin lanzar excepción y midiendo el ahorro."""
+        techo = self.techo if techo is None else techo
+        inicio = time.time()
+        try:
+            resultado = WebDriverWait(self.driver, techo, poll_frequency=0.1).until(condicion)
+            self._anotar(inicio, fijo)
+            return resultado
+        except Exception:
+            self._anotar(inicio, fijo, True)
+            return None
+
+    @property
+    def ahorro(self):
+        return self.segundos_fijos - self.segundos_esperados
+
+    def resumen(self):
+        print(f"⏱️ Esperas: {self.esperas} | Esperado: {self.segundos_esperados:.1f}s "
+              f"| Sleeps fijos equivalentes: {self.segundos_fijos:.1f}s "
+              f"| Ahorro: {self.ahorro:.1f}s | Techos alcanzados: {self.por_techo}")
@@ -0,0 +1,112 @@
+import fnmatch
+import json
+import os
+
+# =============================================================================
+# FILTRO DE RED POR SITIO (CDP Network.setBlockedURLs)
+# =============================================================================
+# Cada perfil = lista de patrones a bloquear + lista de excepciones ("permitir").
+# Una excepción anula cualquier patrón de bloqueo que encaje con ella, así un
+# sitio puede recuperar p.ej. sus fuentes sin tocar el resto de la lista.
+# Medir activa el performance log de Chrome, que acumula TODOS los eventos de red
+# en memoria hasta el informe: solo para diagnóstico (MEDIR_RED=1).
+MEDIR_RED = os.environ.get("MEDIR_RED", "0") == "1"
+
+IMAGENES = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.avif"]
+FUENTES = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
+ESTILOS = ["*.css"]
+MEDIA = ["*.mp4", "*.webm", "*.mp3"]
+ANALITICA = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*connect.facebook.*", "*hotjar.com*", "*clarity.ms*", "*newrelic.com*",
+    "*nr-data.net*", "*adobedtm.com*", "*omtrdc.net*", "*demdex.net*",
+]
+COOKIES = ["*cookielaw.org*", "*onetrust.com*", "*otSDKStub*", "*otBannerSdk*"]
+
+# Sin CSS: AENA y ADIF deciden visibilidad (botón "ver más", filas ocultas) con sus estilos.
+# Bloquear CSS es opt-in por perfil, solo donde basta con el texto.
+BLOQUEO_BASE = IMAGENES + FUENTES + MEDIA + ANALITICA + COOKIES
+
+PERFILES = {
+    "comun": {"bloquear": BLOQUEO_BASE, "permitir": []},
+    # El banner de OneTrust que luego borrábamos con execute_script ya no llega a cargarse
+    "aena": {"bloquear": BLOQUEO_BASE + ["*aena.es/*/chat*", "*youtube.com*"], "permitir": []},
+    "adif": {"bloquear": BLOQUEO_BASE + ["*youtube.com*", "*twitter.com*", "*addthis.com*"], "permitir": []},
+    # ScraperAPI no pasa por Chrome; las asesorías solo necesitan el texto del body
+    "licencias": {"bloquear": BLOQUEO_BASE + ESTILOS + ["*wp-emoji*", "*recaptcha*", "*maps.googleapis.com*"], "permitir": []},
+}
+# Perfiles extra/ajustes sin tocar código: FILTRO_RED_PERFILES='{"adif": {"permitir": ["*.css"]}}'
+for _sitio, _ajuste in json.loads(os.environ.get("FILTRO_RED_PERFILES", "{}")).items():
+    PERFILES.setdefault(_sitio, {"bloquear": list(PERFILES["comun"]["bloquear"]), "permitir": []}).update(_ajuste)
+
+
+def patrones_efectivos(sitio):
+    perfil = PERFILES.get(sitio, PERFILES["comun"])
+    permitir = perfil.get("permitir", [])
+    return [p for p in perfil["bloquear"] if not any(fnmatch.fnmatch(p, a) or p == a for a in permitir)]
+
+
+def aplicar(driver, sitio="comun"):
+    """(Re)configura el filtro del driver para `sitio`. Seguro de llamar con un driver del pool."""
+    patrones = patrones_efectivos(sitio)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patrones})
+    except Exception as e:
+        print(f"   ⚠️ Filtro de red no disponible ({e})")
+    return FiltroRed(driver, sitio, patrones)
+
+
+def capacidades_medicion(options):
+    """Activa el performance log (solo red) para poder contar lo bloqueado."""
+    if MEDIR_RED:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+
+class FiltroRed:
+    """Acumula peticiones bloqueadas/descargadas leyendo el performance log de Chrome."""
+
+    def __init__(self, driver, sitio, patrones):
+        self.driver = driver
+        self.sitio = sitio
+        self.patrones = patrones
+        self.tipos = {}
+        self.bloqueadas = {}
+        self.descargadas = 0
+        self.bytes_descargados = 0
+        # Descartamos lo que hubiera de un trabajo anterior del pool
+        self.drenar()
+        self.bloqueadas, self.descargadas, self.bytes_descargados = {}, 0, 0
+
+    def drenar(self):
+        if not MEDIR_RED:
+            return
+        try:
+            lineas = self.driver.get_log("performance")
+        except Exception:
+            return
+        for linea in lineas:
+            msg = json.loads(linea["message"])["message"]
+            metodo, params = msg.get("method"), msg.get("params", {})
+            if metodo == "Network.requestWillBeSent":
+                self.tipos[params["requestId"]] = params.get("type", "Other")
+            elif metodo == "Network.loadingFailed" and params.get("blockedReason"):
+                tipo = params.get("type") or self.tipos.get(params["requestId"], "Other")
+                self.bloqueadas[tipo] = self.bloqueadas.get(tipo, 0) + 1
+                self.tipos.pop(params["requestId"], None)
+            elif metodo == "Network.loadingFinished":
+                self.descargadas += 1
+                self.bytes_descargados += int(params.get("encodedDataLength") or 0)
+                self.tipos.pop(params["requestId"], None)
+
+    def informe(self):
+        if not MEDIR_RED:
+            return None # Sin performance log no hay nada que contar
+        self.drenar()
+        total = sum(self.bloqueadas.values())
+        detalle = ", ".join(f"{t}: {n}" for t, n in sorted(self.bloqueadas.items())) or "-"
+        print(f"🛡️ Filtro de red [{self.sitio}]: {total} peticiones bloqueadas ({detalle}) "
+              f"| Descargado: {self.descargadas} peticiones, {self.bytes_descargados / 1e6:.1f} MB")
+        return {"bloqueadas": total, "por_tipo": dict(self.bloqueadas),
+                "descargadas": self.descargadas, "bytes_descargados": self.bytes_descargados}
@@ -0,0 +1,257 @@
+"""
+Grabación y replay de fixtures para probar los scrapers sin tocar las webs reales.
+
+    python scripts/fixtures_replay.py grabar aena          # visita la web real y guarda HTML/JS/XHR
+    python scripts/fixtures_replay.py servir aena -p 8765  # sirve lo grabado en local
+
+El grabador parchea selenium (performance log + CDP Network.getResponseBody) y
+requests.Session, así que no hace falta tocar el código de los scrapers.
+"""
+import argparse
+import base64
+import importlib
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DIR_FIXTURES = os.environ.get("DIR_FIXTURES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+
+# Parámetros que nunca se guardan en disco ni cuentan para casar peticiones
+PARAMS_SECRETOS = {"api_key", "access_key", "apikey", "key", "token"}
+# Tipos CDP que necesitamos para que la página funcione en replay
+TIPOS_GRABADOS = {"Document", "XHR", "Fetch", "Script"}
+
+# Qué ejecutar en cada scraper y qué variables de entorno apuntan a sus URLs
+SCRAPERS = {
+    "aena": {"modulo": "aena_scrap", "funcion": "obtener_vuelos", "urls": ["AENA_URL"]},
+    "adif": {"modulo": "adif_scrap", "funcion": "obtener_trenes", "urls": ["URL_ADIF"]},
+    "licencias": {"modulo": "licencia_scrap", "funcion": "recolectar_licencias",
+                  "urls": ["SCRAPER_API_URL", "URL_SOLANO", "URL_GARCIA", "URL_STAC"]},
+}
+
+
+def clave_peticion(metodo, url):
+    """(MÉTODO, ruta?query) sin host ni parámetros secretos."""
+    partes = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if k.lower() not in PARAMS_SECRETOS]
+    ruta = partes.path or "/"
+    if query:
+        ruta += "?" + urlencode(query)
+    return f"{metodo.upper()} {ruta}"
+
+
+# =============================================================================
+# 1. GRABADOR
+# =============================================================================
+class Grabador:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.directorio = os.path.join(DIR_FIXTURES, nombre)
+        self.entradas = []
+        self._pendientes = {}
+        self._lock = threading.Lock()
+
+    def guardar(self, metodo, url, status, tipo, cuerpo):
+        with self._lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            archivo = f"{len(self.entradas):04d}.bin"
+            with open(os.path.join(self.directorio, archivo), "wb") as f:
+                f.write(cuerpo)
+            self.entradas.append({
+                "clave": clave_peticion(metodo, url),
+                "origen": f"{urlsplit(url).scheme}://{urlsplit(url).netloc}",
+                "status": status,
+                "tipo": tipo or "application/octet-stream",
+                "archivo": archivo,
+            })
+
+    def drenar_chrome(self, driver):
+        """Lee el performance log y guarda el cuerpo de cada respuesta terminada."""
+        for linea in driver.get_log("performance"):
+            msg = json.loads(linea["message"])["message"]
+            metodo, params = msg.get("method"), msg.get("params", {})
+            if metodo == "Network.requestWillBeSent":
+                self._pendientes.setdefault(params["requestId"], {})["metodo"] = params["request"]["method"]
+            elif metodo == "Network.responseReceived" and params.get("type") in TIPOS_GRABADOS:
+                resp = params["response"]
+                self._pendientes.setdefault(params["requestId"], {}).update(
+                    url=resp["url"], status=resp["status"], tipo=resp.get("mimeType"))
+            elif metodo == "Network.loadingFinished":
+                pendiente = self._pendientes.pop(params["requestId"], None)
+                if not pendiente or "url" not in pendiente or not pendiente["url"].startswith("http"):
+                    continue
+                try:
+                    cuerpo = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                except Exception:
+                    continue
+                datos = base64.b64decode(cuerpo["body"]) if cuerpo.get("base64Encoded") else cuerpo["body"].encode("utf-8")
+                self.guardar(pendiente.get("metodo", "GET"), pendiente["url"], pendiente["status"], pendiente["tipo"], datos)
+
+    def escribir_manifiesto(self, urls):
+        os.makedirs(self.directorio, exist_ok=True)
+        with open(os.path.join(self.directorio, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"scraper": self.nombre, "urls": urls, "entradas": self.entradas}, f, ensure_ascii=False, indent=4)
+        print(f"💾 {len(self.entradas)} respuestas grabadas en {self.directorio}")
+
+
+def instalar_grabador(grabador):
+    """Parchea selenium y requests para que todo lo que se descargue acabe en el grabador."""
+    import requests
+    from selenium.webdriver import Chrome
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+    init_original = Chrome.__init__
+    execute_original = WebDriver.execute
+    request_original = requests.Session.request
+    dentro = threading.local()
+
+    def init(self, *args, **kwargs):
+        opciones = kwargs.get("options")
+        if opciones is not None:
+            opciones.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        init_original(self, *args, **kwargs)
+
+    def execute(self, comando, params=None):
+        resultado = execute_original(self, comando, params)
+        if not getattr(dentro, "activo", False) and comando != "quit":
+            dentro.activo = True
+            try:
+                grabador.drenar_chrome(self)
+            except Exception:
+                pass
+            finally:
+                dentro.activo = False
+        return resultado
+
+    def request(self, metodo, url, **kwargs):
+        r = request_original(self, metodo, url, **kwargs)
+        grabador.guardar(metodo, r.request.url, r.status_code, r.headers.get("Content-Type"), r.content)
+        return r
+
+    Chrome.__init__ = init
+    WebDriver.execute = execute
+    requests.Session.request = request
+
+
+def grabar(nombre):
+    conf = SCRAPERS[nombre]
+    grabador = Grabador(nombre)
+    instalar_grabador(grabador)
+    modulo = importlib.import_module(conf["modulo"])
+    urls = {var: getattr(modulo, var) for var in conf["urls"]}
+    resultado = getattr(modulo, conf["funcion"])()
+    grabador.escribir_manifiesto(urls)
+    print(f"✅ {nombre}: {len(resultado or [])} registros en la grabación")
+
+
+# =============================================================================
+# 2. SERVIDOR DE REPLAY (http.server)
+# =============================================================================
+class Replay:
+    """Índice de lo grabado. Peticiones repetidas se sirven en el orden grabado."""
+
+    def __init__(self, nombre):
+        self.directorio = os.path.join(DIR_FIXTURES, nombre)
+        with open(os.path.join(self.directorio, "manifest.json"), encoding="utf-8") as f:
+            self.manifiesto = json.load(f)
+        self.por_clave = {}
+        self.por_ruta = {}
+        for entrada in self.manifiesto["entradas"]:
+            self.por_clave.setdefault(entrada["clave"], []).append(entrada)
+            self.por_ruta.setdefault(entrada["clave"].split("?")[0], []).append(entrada)
+        self.servidas = {}
+        self.origenes = sorted({e["origen"] for e in self.manifiesto["entradas"]}, key=len, reverse=True)
+        self._lock = threading.Lock()
+
+    def _siguiente(self, indice, clave):
+        candidatas = indice.get(clave)
+        if not candidatas:
+            return None
+        with self._lock:
+            n = self.servidas.get((id(indice), clave), 0)
+            self.servidas[(id(indice), clave)] = n + 1
+        return candidatas[min(n, len(candidatas) - 1)]
+
+    def buscar(self, metodo, ruta):
+        clave = clave_peticion(metodo, ruta)
+        # 1º coincidencia exacta; 2º misma ruta ignorando la query (cache-busters tipo ?_=123)
+        return self._siguiente(self.por_clave, clave) or self._siguiente(self.por_ruta, clave.split("?")[0])
+
+    def cuerpo(self, entrada, base_local):
+        with open(os.path.join(self.directorio, entrada["archivo"]), "rb") as f:
+            datos = f.read()
+        tipo = entrada["tipo"]
+        if "html" in tipo or "javascript" in tipo or "json" in tipo:
+            # URLs absolutas del sitio original -> servidor local
+            for origen in self.origenes:
+                datos = datos.replace(origen.encode(), base_local.encode())
+        return datos
+
+
+def crear_servidor(nombre, puerto=0):
+    replay = Replay(nombre)
+
+    class Manejador(BaseHTTPRequestHandler):
+        def _responder(self):
+            longitud = int(self.headers.get("Content-Length") or 0)
+            if longitud:
+                self.rfile.read(longitud)
+            entrada = replay.buscar(self.command, self.path)
+            if entrada is None:
+                self.send_error(404, "Sin fixture")
+                return
+            datos = replay.cuerpo(entrada, f"http://{self.headers.get('Host')}")
+            self.send_response(entrada["status"])
+            self.send_header("Content-Type", entrada["tipo"])
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        do_GET = do_POST = _responder
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+    servidor.replay = replay
+    return servidor
+
+
+def entorno_replay(servidor):
+    """Variables de entorno que redirigen las URLs del scraper al servidor local."""
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    entorno = {}
+    for var, url in servidor.replay.manifiesto["urls"].items():
+        partes = urlsplit(url)
+        entorno[var] = base + (partes.path or "/") + (f"?{partes.query}" if partes.query else "")
+    return entorno
+
+
+def arrancar_en_segundo_plano(nombre, puerto=0):
+    servidor = crear_servidor(nombre, puerto)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Fixtures de scrapers: grabar y servir")
+    parser.add_argument("accion", choices=["grabar", "servir"])
+    parser.add_argument("scraper", choices=sorted(SCRAPERS))
+    parser.add_argument("-p", "--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.accion == "grabar":
+        grabar(args.scraper)
+    else:
+        servidor = crear_servidor(args.scraper, args.puerto)
+        for var, url in entorno_replay(servidor).items():
+            print(f"export {var}='{url}'")
+        print(f"🔁 Replay de '{args.scraper}' en http://127.0.0.1:{args.puerto} (Ctrl+C para salir)")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
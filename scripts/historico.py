@@ -0,0 +1,181 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# HISTÓRICO DIARIO DEL MERCADO DE LICENCIAS (APPEND-ONLY + SNAPSHOT COLUMNAR)
+# =============================================================================
+# - log.jsonl: una línea por upsert, nunca se reescribe (la última de cada fecha gana)
+# - snapshot.npz: columnas compactadas (NumPy), se regenera cada COMPACTAR_CADA líneas de log
+# - estado.json: lo mínimo para el paso diario en O(1): últimas 30 medianas y última fecha guardada
+# Ninguno se versiona (cambian cada día): en CI viajan en la caché de Actions y, si se pierden,
+# reconstruir() los regenera desde el CSV.
+# El CSV de la web (public/history_stats.csv) sigue siendo el mismo: se exporta en cada upsert.
+DIR_HISTORICO = os.environ.get("HISTORICO_DIR", "data/historico")
+COMPACTAR_CADA = int(os.environ.get("HISTORICO_COMPACTAR_CADA", "30"))
+
+COLUMNAS = ["date", "avg_price", "median_price", "min_price", "max_price", "volume", "volatility_std"]
+VENTANAS = {"sma_7": 7, "sma_30": 30}
+VENTANA_MAX = max(VENTANAS.values())
+
+
+def _media_movil(medianas, n):
+    """Igual que rolling(n).mean().fillna(0).astype(int) para la última fila."""
+    return int(sum(medianas[-n:]) / n) if len(medianas) >= n else 0
+
+
+def _escribir_atomico(ruta, escribir, modo="w"):
+    tmp = ruta + ".tmp"
+    with open(tmp, modo, **({} if "b" in modo else {"encoding": "utf-8"})) as f:
+        escribir(f)
+    os.replace(tmp, ruta)
+
+
+class Historico:
+    def __init__(self, directorio=DIR_HISTORICO, csv_export=None):
+        self.directorio = directorio
+        self.csv_export = csv_export
+        self.ruta_log = os.path.join(directorio, "log.jsonl")
+        self.ruta_snapshot = os.path.join(directorio, "snapshot.npz")
+        self.ruta_estado = os.path.join(directorio, "estado.json")
+        self.estado = None
+        if os.path.exists(self.ruta_estado):
+            try:
+                with open(self.ruta_estado, encoding="utf-8") as f:
+                    self.estado = json.load(f)
+            except (OSError, ValueError):
+                self.estado = None
+        if self.estado is not None:
+            self.estado.pop("fechas", None) # Formato anterior: la lista de fechas crecía sin límite
+
+    # ------------------------------------------------------------------ lectura
+    def _filas_log(self):
+        if not os.path.exists(self.ruta_log):
+            return []
+        with open(self.ruta_log, encoding="utf-8") as f:
+            return [json.loads(l) for l in f if l.strip()]
+
+    def serie(self):
+        """Histórico completo como DataFrame (snapshot + log), con sma_7/sma_30 ya calculadas."""
+        partes = []
+        if os.path.exists(self.ruta_snapshot):
+            with np.load(self.ruta_snapshot, allow_pickle=False) as npz:
+                partes.append(pd.DataFrame({c: npz[c] for c in COLUMNAS + list(VENTANAS)}))
+        log = self._filas_log()
+        if log:
+            partes.append(pd.DataFrame(log, columns=COLUMNAS + list(VENTANAS)))
+        if not partes:
+            return pd.DataFrame(columns=COLUMNAS + list(VENTANAS))
+        df = pd.concat(partes, ignore_index=True)
+        # Upsert: la última línea de cada fecha gana; orden cronológico, así la última fila
+        # es siempre la fecha más reciente (upsert solo compara con ella)
+        return df.drop_duplicates("date", keep="last").sort_values("date", kind="stable").reset_index(drop=True)
+
+    # ---------------------------------------------------------------- escritura
+    def upsert(self, registro):
+        """Añade (o reemplaza) el registro del día. Devuelve la fila guardada, con sus medias móviles."""
+        os.makedirs(self.directorio, exist_ok=True)
+        if self.estado is None:
+            self.reconstruir()
+
+        fecha = registro["date"]
+        medianas = list(self.estado["medianas"])
+        ultima_fecha = self.estado["ultima_fecha"]
+        if fecha == ultima_fecha:
+            medianas = medianas[:-1] # Re-ejecución del mismo día: reemplaza la última fila
+            reemplazo = True
+        elif ultima_fecha is None or fecha > ultima_fecha:
+            reemplazo = False # Fecha nueva: al final, como hacía el CSV
+        else:
+            # Fecha anterior a la última (corrección o hueco en mitad del histórico): cambia
+            # las medias de todo lo posterior, caso raro -> reconstrucción completa
+            self._anotar({c: registro[c] for c in COLUMNAS} | {k: 0 for k in VENTANAS})
+            self.reconstruir()
+            return self.serie().set_index("date").loc[fecha].to_dict() | {"date": fecha}
+
+        medianas.append(int(registro["median_price"]))
+        fila = {c: registro[c] for c in COLUMNAS}
+        for nombre, n in VENTANAS.items():
+            fila[nombre] = _media_movil(medianas, n)
+
+        self._anotar(fila)
+        self.estado.update(
+            medianas=medianas[-VENTANA_MAX:],
+            ultima_fecha=fecha,
+            anterior=self.estado["ultima"] if not reemplazo else self.estado["anterior"],
+            ultima=fila,
+            lineas_log=self.estado["lineas_log"] + 1,
+        )
+        self._exportar_csv_ultima(fila, reemplazo)
+        if self.estado["lineas_log"] >= COMPACTAR_CADA:
+            self.compactar()
+        else:
+            self._guardar_estado()
+        return fila
+
+    def _anotar(self, fila):
+        with open(self.ruta_log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(fila) + "\n")
+
+    def _guardar_estado(self):
+        _escribir_atomico(self.ruta_estado, lambda f: json.dump(self.estado, f))
+
+    def compactar(self, df=None):
+        """Vuelca snapshot + log en un snapshot nuevo y vacía el log."""
+        df = self.serie() if df is None else df
+        columnas = {c: df[c].to_numpy(dtype=str if c == "date" else "int64") for c in COLUMNAS + list(VENTANAS)}
+        _escribir_atomico(self.ruta_snapshot, lambda f: np.savez(f, **columnas), modo="wb")
+        open(self.ruta_log, "w").close()
+        if self.estado is not None:
+            self.estado["lineas_log"] = 0
+            self._guardar_estado()
+
+    def reconstruir(self):
+        """Recalcula todo desde snapshot + log (o desde el CSV antiguo la primera vez)."""
+        os.makedirs(self.directorio, exist_ok=True)
+        df = self.serie()
+        if df.empty and self.csv_export and os.path.exists(self.csv_export):
+            df = pd.read_csv(self.csv_export)[COLUMNAS] # Migración desde history_stats.csv
+            df = df.drop_duplicates("date", keep="last").sort_values("date", kind="stable").reset_index(drop=True)
+        for nombre, n in VENTANAS.items():
+            df[nombre] = df["median_price"].rolling(window=n).mean().fillna(0).astype(int)
+
+        registros = df.to_dict("records")
+        self.estado = {
+            "ultima_fecha": str(registros[-1]["date"]) if registros else None,
+            "medianas": [int(m) for m in df["median_price"].tail(VENTANA_MAX)],
+            "ultima": registros[-1] if registros else None,
+            "anterior": registros[-2] if len(registros) > 1 else None,
+            "lineas_log": 0,
+        }
+        self.compactar(df)
+        if self.csv_export:
+            self._exportar_csv(df)
+        return df
+
+    # ------------------------------------------------------------- export web
+    def _exportar_csv(self, df):
+        os.makedirs(os.path.dirname(self.csv_export) or ".", exist_ok=True)
+        df[COLUMNAS].to_csv(self.csv_export, index=False)
+
+    def _exportar_csv_ultima(self, fila, reemplazo):
+        """Mantiene el CSV sin reescribirlo: añade una línea o sustituye la última."""
+        if not self.csv_export:
+            return
+        if not os.path.exists(self.csv_export):
+            self._exportar_csv(self.serie())
+            return
+        linea = pd.DataFrame([fila])[COLUMNAS].to_csv(index=False, header=False)
+        with open(self.csv_export, "rb+") as f:
+            if reemplazo:
+                f.seek(0, os.SEEK_END)
+                fin = f.tell()
+                f.seek(max(0, fin - 4096))
+                cola = f.read().rstrip(b"\n")
+                f.seek(max(0, fin - 4096) + cola.rfind(b"\n") + 1)
+                f.truncate()
+            else:
+                f.seek(0, os.SEEK_END)
+            f.write(linea.encode("utf-8"))
@@ -0,0 +1,266 @@
+"""
+Instrumentación ligera de los scrapers: tramos con tiempo, contadores y pico de memoria.
+
+    import instrumentacion
+    instrumentacion.iniciar("aena_scrap")          # solo en el __main__ del script
+    with instrumentacion.tramo("aena/fase1"):
+        instrumentacion.contar("clicks")
+
+Cada ejecución añade una línea a data/metricas/<script>.jsonl (tramos con nº de veces,
+total y máximo en segundos, contadores propios de cada tramo, contadores globales y
+picos de memoria de Python y del árbol de procesos con Chrome). Las llamadas WebDriver
+se cuentan solas. Sin iniciar() todo funciona igual pero no se escribe nada, así los
+módulos se pueden importar desde el runner combinado o el benchmark. data/metricas no se
+versiona: en CI cada ejecución la sube como artefacto del workflow.
+
+PERFIL=cprofile (o pyinstrument, si está instalado) perfila la ejecución entera y deja
+el resultado junto a las métricas.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+DIR_METRICAS = os.environ.get("METRICAS_DIR", os.path.join("data", "metricas"))
+PERFIL = os.environ.get("PERFIL", "").lower() # "" | cprofile | pyinstrument
+
+
+# =============================================================================
+# 1. MEMORIA
+# =============================================================================
+def rss_arbol_kb(pid_raiz=None):
+    """RSS del proceso y todos sus descendientes (Chrome, chromedriver) leyendo /proc. 0 si no es Linux."""
+    pid_raiz = pid_raiz or os.getpid()
+    hijos = {}
+    rss = {}
+    try:
+        entradas = os.listdir("/proc")
+    except OSError:
+        return 0
+    for entrada in entradas:
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{entrada}/statm") as f:
+                paginas = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        hijos.setdefault(int(campos[1]), []).append(int(entrada))
+        rss[int(entrada)] = paginas * os.sysconf("SC_PAGE_SIZE") // 1024
+
+    total, pila = 0, [pid_raiz]
+    while pila:
+        pid = pila.pop()
+        total += rss.get(pid, 0)
+        pila.extend(hijos.get(pid, []))
+    return total
+
+
+def _pico_kb(quien):
+    # ru_maxrss viene en KB en Linux
+    return resource.getrusage(quien).ru_maxrss if resource else 0
+
+
+# =============================================================================
+# 2. COLECTOR
+# =============================================================================
+class Metricas:
+    def __init__(self, script=None, directorio=DIR_METRICAS):
+        self.script = script # None = no se escribe nada al cerrar
+        self.directorio = directorio
+        self.inicio = time.perf_counter()
+        self.fecha = datetime.now().isoformat(timespec="seconds")
+        self.tramos = {}
+        self.contadores = {}
+        self.extra = {}
+        self.pico_arbol_kb = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.perfilador = None
+        self.cerrado = False
+
+    def _pila(self):
+        if not hasattr(self.local, "pila"):
+            self.local.pila = []
+        return self.local.pila
+
+    @contextmanager
+    def tramo(self, nombre):
+        """Mide el bloque. Anidado dentro de otro tramo del mismo hilo se llama "padre/nombre"."""
+        pila = self._pila()
+        completo = "/".join(pila + [nombre])
+        pila.append(nombre)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            pila.pop()
+            rss = rss_arbol_kb()
+            with self.lock:
+                t = self.tramos.setdefault(completo, {"n": 0, "total_s": 0.0, "max_s": 0.0, "contadores": {}, "rss_arbol_mb": 0})
+                t["n"] += 1
+                t["total_s"] += duracion
+                t["max_s"] = max(t["max_s"], duracion)
+                t["rss_arbol_mb"] = max(t["rss_arbol_mb"], round(rss / 1024, 1))
+                self.pico_arbol_kb = max(self.pico_arbol_kb, rss)
+
+    def contar(self, nombre, n=1):
+        """Suma al contador global y al del tramo abierto en este hilo (si lo hay)."""
+        pila = self._pila()
+        with self.lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+            if pila:
+                t = self.tramos.setdefault("/".join(pila), {"n": 0, "total_s": 0.0, "max_s": 0.0, "contadores": {}, "rss_arbol_mb": 0})
+                t["contadores"][nombre] = t["contadores"].get(nombre, 0) + n
+
+    def anotar(self, **datos):
+        with self.lock:
+            self.extra.update(datos)
+
+    def resumen(self):
+        tramos = {}
+        for nombre, t in self.tramos.items():
+            tramos[nombre] = dict(t, total_s=round(t["total_s"], 3), max_s=round(t["max_s"], 3))
+        return {
+            "script": self.script,
+            "fecha": self.fecha,
+            "duracion_s": round(time.perf_counter() - self.inicio, 3),
+            "tramos": tramos,
+            "contadores": dict(self.contadores),
+            "memoria": {
+                "pico_python_mb": round(_pico_kb(resource.RUSAGE_SELF) / 1024, 1) if resource else None,
+                "pico_hijos_mb": round(_pico_kb(resource.RUSAGE_CHILDREN) / 1024, 1) if resource else None,
+                "pico_arbol_mb": round(max(self.pico_arbol_kb, rss_arbol_kb()) / 1024, 1),
+            },
+            "perfil": PERFIL or None,
+            **self.extra,
+        }
+
+    # ------------------------------------------------------------ perfilado
+    def iniciar_perfil(self, tipo):
+        if tipo == "cprofile":
+            import cProfile
+            self.perfilador = cProfile.Profile()
+            self.perfilador.enable()
+        elif tipo == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("⚠️ PERFIL=pyinstrument pero pyinstrument no está instalado (pip install pyinstrument).")
+                return
+            self.perfilador = Profiler()
+            self.perfilador.start()
+        elif tipo:
+            print(f"⚠️ PERFIL desconocido: {tipo} (opciones: cprofile, pyinstrument)")
+
+    def _parar_perfil(self, base):
+        if self.perfilador is None:
+            return None
+        if PERFIL == "cprofile":
+            import pstats
+            self.perfilador.disable()
+            ruta = base + ".prof"
+            self.perfilador.dump_stats(ruta)
+            print(f"🔬 Perfil cProfile en {ruta} (python -m pstats {ruta}). Top 15 por tiempo acumulado:")
+            pstats.Stats(self.perfilador).sort_stats("cumulative").print_stats(15)
+        else:
+            self.perfilador.stop()
+            ruta = base + ".html"
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(self.perfilador.output_html())
+            print(f"🔬 Perfil pyinstrument en {ruta}")
+        return ruta
+
+    # -------------------------------------------------------------- cierre
+    def cerrar(self):
+        """Escribe la línea de la ejecución (una sola vez; también se llama al salir del proceso)."""
+        if self.cerrado or not self.script:
+            return None
+        self.cerrado = True
+        os.makedirs(self.directorio, exist_ok=True)
+        base = os.path.join(self.directorio, self.script)
+        ruta_perfil = self._parar_perfil(base)
+        datos = self.resumen()
+        if ruta_perfil:
+            datos["archivo_perfil"] = ruta_perfil
+        with open(base + ".jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(datos, ensure_ascii=False) + "\n")
+
+        partes = [f"{n} {t['total_s']:.1f}s" + (f" ({', '.join(f'{v} {k}' for k, v in t['contadores'].items())})" if t["contadores"] else "")
+                  for n, t in datos["tramos"].items()]
+        print(f"📊 Métricas {self.script}: {datos['duracion_s']:.1f}s | " + " | ".join(partes))
+        print(f"   Memoria: Python {datos['memoria']['pico_python_mb']} MB, árbol con Chrome {datos['memoria']['pico_arbol_mb']} MB")
+        try:
+            if os.environ.get("GITHUB_STEP_SUMMARY"):
+                with open(os.environ["GITHUB_STEP_SUMMARY"], "a", encoding="utf-8") as f:
+                    f.write(f"\n**{self.script}** ({datos['duracion_s']:.1f}s, pico {datos['memoria']['pico_arbol_mb']} MB)\n\n"
+                            "| Tramo | n | Total (s) | Máx (s) | Contadores |\n|---|---|---|---|---|\n")
+                    for n, t in datos["tramos"].items():
+                        contadores = ", ".join(f"{k}: {v}" for k, v in t["contadores"].items())
+                        f.write(f"| {n} | {t['n']} | {t['total_s']} | {t['max_s']} | {contadores} |\n")
+        except OSError:
+            pass
+        return datos
+
+
+# =============================================================================
+# 3. API DE MÓDULO (colector del proceso)
+# =============================================================================
+_actual = Metricas()
+_webdriver_instrumentado = False
+
+
+def contar_webdriver():
+    """Cada comando WebDriver es un round-trip HTTP a chromedriver: los contamos todos."""
+    global _webdriver_instrumentado
+    if _webdriver_instrumentado:
+        return
+    try:
+        from selenium.webdriver.remote.webdriver import WebDriver
+    except ImportError:
+        return
+    execute_original = WebDriver.execute
+
+    def execute(self, comando, params=None):
+        contar("webdriver")
+        return execute_original(self, comando, params)
+
+    WebDriver.execute = execute
+    _webdriver_instrumentado = True
+
+
+def iniciar(script, directorio=DIR_METRICAS):
+    """Activa la escritura de métricas de este proceso (y el perfilador si PERFIL lo pide)."""
+    global _actual
+    _actual = Metricas(script, directorio)
+    contar_webdriver()
+    _actual.iniciar_perfil(PERFIL)
+    atexit.register(_actual.cerrar)
+    return _actual
+
+
+def tramo(nombre):
+    return _actual.tramo(nombre)
+
+
+def contar(nombre, n=1):
+    _actual.contar(nombre, n)
+
+
+def anotar(**datos):
+    _actual.anotar(**datos)
+
+
+def cerrar():
+    return _actual.cerrar()
@@ -3,6 +3,7 @@ import os
 import time
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 import requests # Necesario para ScraperAPI
 from bs4 import BeautifulSoup # Necesario para procesar el HTML de ScraperAPI
 
@@ -13,24 +14,23 @@ if 'google.colab' in sys.modules:
     print("🛠️ Entorno Colab detectado...")
     # (Instalaciones de Colab omitidas para ahorrar espacio, déjalas si las usas)
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from navegador import PoolNavegadores, Reserva
+import filtro_red
+import instrumentacion
 
-def iniciar_driver():
-    # Configuración estándar de Selenium (ya no necesitamos trucos de móvil ni stealth)
-    options = Options()
-    options.add_argument('--headless=new') 
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--window-size=1920,1080')
-    options.add_argument("--lang=es-ES")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
+# URLs de cada fuente (sobrescribibles para apuntar al servidor de replay)
+URL_MILANUNCIOS = os.environ.get("URL_MILANUNCIOS", "https://www.milanuncios.com/anuncios/?s=Licencia%20taxi%20barcelona")
+SCRAPER_API_URL = os.environ.get("SCRAPER_API_URL", "http://api.scraperapi.com")
+URL_SOLANO = os.environ.get("URL_SOLANO", "https://asesoriasolano.es/comprar-licencias/")
+URL_GARCIA = os.environ.get("URL_GARCIA", "https://asesoriagarciabcn.com/compra-y-venta-de-licencias-de-taxi-en-barcelona/")
+URL_STAC = os.environ.get("URL_STAC", "https://bolsadelicenciasstac.cat")
+
+# Concurrencia: nº de Chromes simultáneos y tiempo máximo por fuente (segundos)
+MAX_DRIVERS = int(os.environ.get("LICENCIAS_DRIVERS", "3"))
+TIMEOUT_FUENTE = {"MILANUNCIOS": 90, "SOLANO": 60, "GARCIA_BCN": 60, "STAC": 60}
 
 # =============================================================================
 # 2. MOTORES DE EXTRACCIÓN
@@ -47,7 +47,7 @@ def scrape_milanuncios_api():
         return []
 
     # URL objetivo
-    target_url = "https://www.milanuncios.com/anuncios/?s=Licencia%20taxi%20barcelona"
+    target_url = URL_MILANUNCIOS
     
     # Configuración de ScraperAPI
     payload = {
@@ -60,7 +60,7 @@ def scrape_milanuncios_api():
 
     try:
         print("   -> Solicitando HTML a ScraperAPI (esto puede tardar unos segundos)...")
-        r = requests.get('http://api.scraperapi.com', params=payload, timeout=60)
+        r = requests.get(SCRAPER_API_URL, params=payload, timeout=60)
         
         if r.status_code == 200:
             print("   ✅ Respuesta recibida con éxito.")
@@ -93,7 +93,7 @@ def scrape_solano(driver):
     datos = []
     print(f"\n🌍 [2/4] SOLANO...")
     try:
-        driver.get("https://asesoriasolano.es/comprar-licencias/")
+        driver.get(URL_SOLANO)
         time.sleep(4)
         full_text = driver.find_element(By.TAG_NAME, "body").text
         
@@ -119,7 +119,7 @@ def scrape_garcia(driver):
     datos = []
     print(f"\n🌍 [3/4] GARCÍA BCN...")
     try:
-        driver.get("https://asesoriagarciabcn.com/compra-y-venta-de-licencias-de-taxi-en-barcelona/")
+        driver.get(URL_GARCIA)
         time.sleep(4)
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
         time.sleep(2)
@@ -137,7 +137,7 @@ def scrape_stac(driver):
     datos = []
     print(f"\n🌍 [4/4] STAC...")
     try:
-        driver.get("https://bolsadelicenciasstac.cat")
+        driver.get(URL_STAC)
         time.sleep(5)
         articles = driver.find_elements(By.TAG_NAME, "article")
         if len(articles) > 0:
@@ -163,34 +163,93 @@ def scrape_stac(driver):
 # =============================================================================
 # 3. EJECUCIÓN PRINCIPAL
 # =============================================================================
-if __name__ == "__main__":
+def recolectar_licencias(pool=None):
+    """
+    Lanza las 4 fuentes a la vez: Milanuncios (solo HTTP) en su propio hilo y las
+    3 fuentes Selenium sobre un pool de drivers. Cada fuente tiene su timeout, así
+    que una web lenta no bloquea al resto: el total ≈ la fuente más lenta.
+    """
+    inicio = time.time()
+    pool_propio = pool is None
+    if pool_propio:
+        pool = PoolNavegadores(MAX_DRIVERS)
+    en_uso = {}
+
+    def con_tramo(nombre, funcion, *args):
+        with instrumentacion.tramo(f"licencias/{nombre}"):
+            ofertas = funcion(*args)
+            instrumentacion.contar("ofertas", len(ofertas or []))
+            return ofertas
+
+    def con_driver(nombre, funcion):
+        # La reserva se registra antes de arrancar Chrome: un timeout puede descartarla ya
+        reserva = en_uso[nombre] = Reserva()
+        try:
+            driver = pool.tomar(reserva)
+        except Exception:
+            en_uso.pop(nombre, None)
+            raise
+        filtro = filtro_red.aplicar(driver, "licencias")
+        try:
+            driver.set_page_load_timeout(TIMEOUT_FUENTE[nombre])
+            return con_tramo(nombre, funcion, driver)
+        finally:
+            filtro.sitio = f"licencias/{nombre}"
+            try: filtro.informe()
+            except: pass
+            en_uso.pop(nombre, None)
+            pool.devolver(driver)
+
+    hilo_http = ThreadPoolExecutor(max_workers=1)
+    hilos_selenium = ThreadPoolExecutor(max_workers=max(1, min(MAX_DRIVERS, pool.maximo)))
+    # Mismo orden que la ejecución secuencial para que el JSON salga igual
+    tareas = [
+        ("MILANUNCIOS", hilo_http.submit(con_tramo, "MILANUNCIOS", scrape_milanuncios_api)),
+        ("SOLANO", hilos_selenium.submit(con_driver, "SOLANO", scrape_solano)),
+        ("GARCIA_BCN", hilos_selenium.submit(con_driver, "GARCIA_BCN", scrape_garcia)),
+        ("STAC", hilos_selenium.submit(con_driver, "STAC", scrape_stac)),
+    ]
+
+    resultados = []
     try:
-        resultados = []
-
-        # 1. Ejecutamos MILANUNCIOS (Sin Driver, usa API)
-        resultados.extend(scrape_milanuncios_api())
-
-        # 2. Ejecutamos el resto (Con Driver Selenium)
-        driver = iniciar_driver()
-        resultados.extend(scrape_solano(driver))
-        resultados.extend(scrape_garcia(driver))
-        resultados.extend(scrape_stac(driver))
-        driver.quit()
-
-        # Guardar
-        nombre_fichero = 'licencias_totales.json'
+        for nombre, futuro in tareas:
+            restante = max(0, inicio + TIMEOUT_FUENTE[nombre] - time.time())
+            try:
+                resultados.extend(futuro.result(timeout=restante))
+            except FuturesTimeout:
+                print(f"   ⏰ {nombre}: sin respuesta en {TIMEOUT_FUENTE[nombre]}s. Se descarta.")
+                futuro.cancel()
+                if nombre in en_uso:
+                    pool.descartar(en_uso[nombre])
+            except Exception as e:
+                print(f"   🔥 {nombre}: error {e}")
+    finally:
+        hilo_http.shutdown(wait=False)
+        hilos_selenium.shutdown(wait=False)
+        if pool_propio:
+            pool.cerrar()
+
+    print(f"\n⏱️ Fuentes completadas en {time.time() - inicio:.1f}s (en paralelo, {pool.maximo} drivers).")
+    return resultados
+
+def guardar_licencias(resultados, nombre_fichero='licencias_totales.json'):
+    with instrumentacion.tramo("licencias/escritura"):
         with open(nombre_fichero, 'w', encoding='utf-8') as f:
             json.dump(resultados, f, ensure_ascii=False, indent=4)
 
-        print(f"\n✅ PROCESO COMPLETADO: {len(resultados)} ofertas guardadas en '{nombre_fichero}'.")
+    print(f"\n✅ PROCESO COMPLETADO: {len(resultados)} ofertas guardadas en '{nombre_fichero}'.")
 
-        # Descarga Colab
-        if 'google.colab' in sys.modules:
-            try:
-                from google.colab import files
-                files.download(nombre_fichero)
-            except: pass
+    # Descarga Colab
+    if 'google.colab' in sys.modules:
+        try:
+            from google.colab import files
+            files.download(nombre_fichero)
+        except: pass
 
+if __name__ == "__main__":
+    instrumentacion.iniciar("licencia_scrap")
+    try:
+        guardar_licencias(recolectar_licencias())
     except Exception as e:
         print(f"\n❌ Error fatal: {e}")
-        exit(1)
+        exit(1)
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Modelo de pasajeros y terminal por vuelo, cargado de una tabla versionada (data/modelo_pax_v1.json).
+
+    modelo = cargar_modelo()
+    modelo.estimar("Iberia", avion="320", origen="MAD")   # 180 (puente)
+    modelo.aerolinea_de_vuelo("VLG3529 / IBE5115")        # "Vueling"
+
+pax = asientos del avión x factor de carga de la aerolínea, salvo el puente y las
+aerolíneas con pax fijo. Los índices (nombre, código ICAO/IATA, tipo de avión) se
+construyen una vez al cargar y cada aerolínea se resuelve una sola vez (memorizada).
+Lo comparten update_data (vía agregacion_vuelos) y aena_scrap.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+FILE_MODELO = os.environ.get("MODELO_PAX", os.path.join(DIR_SCRIPTS, "..", "data", "modelo_pax_v1.json"))
+RE_ORIGEN_IATA = re.compile(r"\(([A-Z]{3})\)\s*$") # Origen de AENA: "MADRID (MAD)"
+
+
+def iata_origen(texto):
+    m = RE_ORIGEN_IATA.search(texto or "")
+    return m.group(1) if m else None
+
+
+class ModeloPax:
+    def __init__(self, tabla):
+        self.version = tabla["version"]
+        self.asientos_defecto = tabla["asientos_defecto"]
+        self.asientos = {str(k): v for k, v in tabla.get("asientos", {}).items()}
+        self.terminal_defecto = str(tabla.get("terminal_defecto", "1"))
+        self.origen_puente = tabla["puente"]["origen"]
+        self.pax_puente = tabla["puente"]["pax"]
+        self.aerolineas = tabla.get("aerolineas", {})
+        self.familias = tabla.get("familias", []) # Por subcadena del nombre ("easyJet Europe"...)
+
+        # Código ICAO/IATA -> nombre (para AENA, que solo trae códigos de vuelo)
+        self.por_codigo = {}
+        for nombre, datos in self.aerolineas.items():
+            for campo in ("icao", "iata"):
+                if datos.get(campo):
+                    self.por_codigo[datos[campo]] = nombre
+        for familia in self.familias:
+            for codigo in familia.get("codigos", []):
+                self.por_codigo[codigo] = familia["contiene"]
+        self._resueltas = {}
+
+    @classmethod
+    def desde_fichero(cls, ruta=FILE_MODELO):
+        with open(ruta, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # --- CONSULTAS POR REGISTRO ---
+    def aerolinea(self, nombre):
+        """{terminal, puente, pax (fijo o None), factor_carga, t2c} de una aerolínea."""
+        datos = self._resueltas.get(nombre)
+        if datos is None:
+            datos = {"terminal": None, "puente": False, "pax": None, "factor_carga": 1.0, "t2c": False}
+            if isinstance(nombre, str):
+                for familia in self.familias:
+                    if familia["contiene"] in nombre:
+                        datos.update((k, v) for k, v in familia.items() if k in datos)
+                datos.update((k, v) for k, v in self.aerolineas.get(nombre, {}).items() if k in datos)
+            datos["terminal"] = str(datos["terminal"] or self.terminal_defecto)
+            self._resueltas[nombre] = datos
+        return datos
+
+    def aerolinea_de_vuelo(self, codigo):
+        """Nombre de la aerolínea a partir del código de vuelo (el primero si viene "A / B"), o None."""
+        codigo = (codigo or "").split("/")[0].strip().upper()
+        return self.por_codigo.get(codigo[:3]) or self.por_codigo.get(codigo[:2])
+
+    def asientos_avion(self, avion):
+        return self.asientos.get(avion, self.asientos_defecto) if isinstance(avion, str) else self.asientos_defecto
+
+    def es_puente(self, nombre, origen):
+        return origen == self.origen_puente and self.aerolinea(nombre)["puente"]
+
+    def estimar(self, nombre, avion=None, origen=None):
+        if self.es_puente(nombre, origen):
+            return self.pax_puente
+        datos = self.aerolinea(nombre)
+        if datos["pax"] is not None:
+            return datos["pax"]
+        return int(round(self.asientos_avion(avion) * datos["factor_carga"]))
+
+    # --- CONSULTAS POR COLUMNA (una resolución por valor distinto) ---
+    def columnas_aerolinea(self, nombres):
+        """Arrays terminal/puente/pax (-1 = sin pax fijo)/factor_carga/t2c alineados con `nombres`."""
+        unicos, inversa = np.unique(nombres, return_inverse=True)
+        datos = [self.aerolinea(n) for n in unicos.tolist()]
+        return {
+            "terminal": np.array([d["terminal"] for d in datos], dtype=str)[inversa],
+            "puente": np.array([d["puente"] for d in datos], dtype=bool)[inversa],
+            "pax": np.array([-1 if d["pax"] is None else d["pax"] for d in datos], dtype=np.int64)[inversa],
+            "factor_carga": np.array([d["factor_carga"] for d in datos], dtype=float)[inversa],
+            "t2c": np.array([d["t2c"] for d in datos], dtype=bool)[inversa],
+        }
+
+    def columna_asientos(self, aviones):
+        unicos, inversa = np.unique(aviones, return_inverse=True)
+        return np.array([self.asientos_avion(a) for a in unicos.tolist()], dtype=float)[inversa]
+
+
+@lru_cache(maxsize=None)
+def cargar_modelo(ruta=FILE_MODELO):
+    """Modelo compartido: se lee y se indexa una vez por proceso."""
+    return ModeloPax.desde_fichero(ruta)
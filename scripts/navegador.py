@@ -0,0 +1,212 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+import filtro_red
+import instrumentacion
+from sesion_http import USER_AGENT
+
+# =============================================================================
+# FÁBRICA DE DRIVERS COMPARTIDA (AENA, ADIF, LICENCIAS)
+# =============================================================================
+# Ruta del chromedriver cacheada entre ejecuciones: ChromeDriverManager().install()
+# consulta la red y descomprime el driver, no queremos pagarlo en cada run.
+RUTA_CACHE_DRIVER = os.environ.get(
+    "CHROMEDRIVER_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "itaxi", "chromedriver.json"))
+CADUCIDAD_CACHE_DRIVER = 7 * 24 * 3600 # Revalidamos una vez por semana
+
+_lock_driver = threading.Lock()
+_ruta_driver = None
+
+
+def ruta_chromedriver():
+    """CHROMEDRIVER del entorno > caché en disco > ChromeDriverManager (y se cachea)."""
+    global _ruta_driver
+    with _lock_driver:
+        if _ruta_driver:
+            return _ruta_driver
+
+        ruta = os.environ.get("CHROMEDRIVER")
+        if not ruta and os.path.exists(RUTA_CACHE_DRIVER):
+            try:
+                with open(RUTA_CACHE_DRIVER, encoding="utf-8") as f:
+                    cache = json.load(f)
+                if os.path.exists(cache["ruta"]) and time.time() - cache["creado"] < CADUCIDAD_CACHE_DRIVER:
+                    ruta = cache["ruta"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+        if not ruta:
+            from webdriver_manager.chrome import ChromeDriverManager
+            ruta = ChromeDriverManager().install()
+            try:
+                os.makedirs(os.path.dirname(RUTA_CACHE_DRIVER), exist_ok=True)
+                with open(RUTA_CACHE_DRIVER, "w", encoding="utf-8") as f:
+                    json.dump({"ruta": ruta, "creado": time.time()}, f)
+            except OSError:
+                pass
+
+        _ruta_driver = ruta
+        return ruta
+
+
+def opciones_chrome(bloquear_recursos=True, extra=()):
+    """Un único juego de flags afinados para todos los scrapers."""
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--lang=es-ES')
+    options.add_argument(f"user-agent={USER_AGENT}")
+    options.add_argument('--disable-gpu')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--no-first-run')
+    options.add_argument('--mute-audio')
+    options.add_argument('--disable-background-networking')
+    # DOMContentLoaded basta: no esperamos a imágenes, analytics ni iframes
+    options.page_load_strategy = 'eager'
+    if bloquear_recursos:
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    for arg in extra:
+        options.add_argument(arg)
+    filtro_red.capacidades_medicion(options)
+    return options
+
+
+def crear_driver(bloquear_recursos=True, extra=()):
+    with instrumentacion.tramo("chrome"):
+        driver = webdriver.Chrome(service=Service(ruta_chromedriver()), options=opciones_chrome(bloquear_recursos, extra))
+    if bloquear_recursos:
+        # Fuentes, media y analítica no se pueden desactivar con flags: los cortamos a nivel de red.
+        # Cada scraper vuelve a aplicar su perfil de sitio al tomar el driver.
+        filtro_red.aplicar(driver, "comun")
+    return driver
+
+
+# =============================================================================
+# POOL DE NAVEGADORES (OPCIONAL, DE LARGA DURACIÓN)
+# =============================================================================
+ESPERA_CIERRE_S = 60 # cerrar() espera como mucho esto a los Chromes que aún arrancan
+
+
+class Reserva:
+    """
+    Hueco de un trabajo en el pool. Se registra antes de arrancar Chrome, así quien
+    vigila el timeout puede descartarlo aunque el driver aún no exista.
+    """
+
+    def __init__(self):
+        self.driver = None
+        self.descartada = False
+
+
+class PoolNavegadores:
+    """
+    Pool pequeño de Chromes calientes. Cada trabajo toma uno y lo devuelve al
+    acabar, así un runner combinado paga el arranque de Chrome una sola vez.
+    """
+
+    def __init__(self, maximo=1, **opciones_driver):
+        self.maximo = maximo
+        self.opciones_driver = opciones_driver
+        self.libres = queue.LifoQueue()
+        self.todos = []
+        self.descartados = set()
+        self.arrancando = set() # Reservas cuyo Chrome se está creando
+        self.lock = threading.Lock()
+        self.cambio = threading.Condition(self.lock)
+
+    def tomar(self, reserva=None):
+        reserva = reserva or Reserva()
+        try:
+            driver = self.libres.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                crear = len(self.todos) - len(self.descartados) + len(self.arrancando) < self.maximo
+                if crear:
+                    self.arrancando.add(reserva)
+            if not crear:
+                driver = self.libres.get()
+            else:
+                # Chrome arranca fuera del lock (tarda segundos); la reserva ya ocupa su hueco
+                driver = None
+                try:
+                    driver = crear_driver(**self.opciones_driver)
+                finally:
+                    with self.lock:
+                        self.arrancando.discard(reserva)
+                        if driver is not None:
+                            self.todos.append(driver)
+                        self.cambio.notify_all()
+
+        with self.lock:
+            reserva.driver = driver
+            descartada = reserva.descartada
+        if descartada:
+            # Timeout o cierre del pool mientras arrancaba: no lo dejamos huérfano
+            self.descartar(driver)
+            raise RuntimeError("driver descartado antes de empezar")
+        return driver
+
+    def devolver(self, driver):
+        if driver in self.descartados:
+            return
+        try:
+            driver.get("about:blank") # Soltamos la página anterior (y su memoria)
+        except Exception:
+            self.descartar(driver)
+            return
+        self.libres.put(driver)
+
+    def descartar(self, driver):
+        """Mata un driver colgado: la llamada Selenium bloqueada en su hilo fallará y liberará el hilo."""
+        if isinstance(driver, Reserva):
+            with self.lock:
+                driver.descartada = True
+                driver = driver.driver
+            if driver is None:
+                return # Aún arrancando: tomar() lo cerrará en cuanto exista
+        with self.lock:
+            self.descartados.add(driver)
+        try: driver.quit()
+        except: pass
+
+    def cerrar(self):
+        with self.lock:
+            # Esperamos a los Chromes a medio arrancar; si alguno se pasa, se cierra solo al llegar
+            self.cambio.wait_for(lambda: not self.arrancando, timeout=ESPERA_CIERRE_S)
+            for reserva in self.arrancando:
+                reserva.descartada = True
+            todos, descartados = self.todos, self.descartados
+            self.todos = []
+            self.descartados = set()
+        for driver in todos:
+            if driver not in descartados:
+                try: driver.quit()
+                except: pass
+
+
+def soltar_driver(driver, pool=None):
+    """Devuelve el driver al pool si lo hay; si no, lo cierra (comportamiento de siempre)."""
+    if pool:
+        pool.devolver(driver)
+    else:
+        try: driver.quit()
+        except: pass
+
+
+def driver_vivo(driver):
+    """False si Chrome o chromedriver han muerto (los bucles de los scrapers se tragan el error)."""
+    try:
+        driver.execute_script("return 1;")
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,303 @@
+"""
+Previsión de demanda de taxi por zona (T1, T2, T2C, Puente Aéreo, Sants) en franjas de 15 min.
+
+    python scripts/prevision_demanda.py      # tras aena_scrap / adif_scrap
+
+Combina las llegadas publicadas (public/vuelos.json con pax estimados por modelo_pax y
+public/trenes_sants.json, solo larga distancia) con el patrón histórico del mismo día de
+la semana, y publica public/prevision_demanda.json (+ feed) para las próximas 24h.
+La demanda está en pasajeros que llegan a la parada: cada llegada se reparte en las
+franjas siguientes según DESFASE (lo que tardan en salir del avión/andén).
+
+El histórico son las curvas observadas de cada día (data/prevision/historico.npz). La
+del día en curso se consolida franja a franja: lo ya pasado no se reescribe, porque el
+snapshot incremental de AENA deja de traer los vuelos que ya han llegado. Por lo mismo se
+guardan también las llegadas (antes del desfase) de hoy: lo que aterrizó hace un rato
+sigue repartiendo pax en la franja actual y las siguientes aunque ya no esté en el snapshot. Como cambia en
+cada ejecución no se versiona: en CI se conserva entre runs con la caché de Actions.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+import publicacion
+from modelo_pax import cargar_modelo, iata_origen
+
+FILE_VUELOS = os.environ.get("AENA_SNAPSHOT", os.path.join("public", "vuelos.json"))
+FILE_TRENES = os.environ.get("ADIF_SNAPSHOT", os.path.join("public", "trenes_sants.json"))
+FILE_PREVISION = os.path.join("public", "prevision_demanda.json")
+FILE_HISTORICO = os.environ.get("PREVISION_HISTORICO", os.path.join("data", "prevision", "historico.npz"))
+ZONA_HORARIA = ZoneInfo("Europe/Madrid")
+
+# =============================================================================
+# 1. PARÁMETROS
+# =============================================================================
+ZONAS = ["t1", "t2", "t2c", "puente", "sants"]
+MINUTOS_BLOQUE = 15
+FRANJAS_DIA = 24 * 60 // MINUTOS_BLOQUE
+# Reparto de los pax de una llegada en las franjas siguientes (0 = la de la llegada)
+DESFASE = {
+    "vuelo": [0.15, 0.45, 0.3, 0.1], # Desembarque + recogida de maletas: 15-45 min
+    "tren": [0.6, 0.4],
+}
+# Trenes de larga distancia (los que generan demanda de taxi) y pax medios por tren
+PAX_TRENES = {"AVE": 300, "AVLO": 300, "IRYO": 300, "OUIGO": 350, "TGV": 300,
+              "ALVIA": 200, "EUROMED": 200, "INTERCITY": 150, "TALGO": 150}
+SEMANAS_HISTORICO = int(os.environ.get("PREVISION_SEMANAS", "8")) # Mismo día de la semana, últimas N
+PESO_PROGRAMADO = float(os.environ.get("PREVISION_PESO_PROGRAMADO", "0.7")) # Frente al patrón histórico
+DIAS_GUARDADOS = 400
+
+
+# =============================================================================
+# 2. LLEGADAS -> ARRAYS (día relativo, minuto, zona, pax)
+# =============================================================================
+def _minuto(hora):
+    try:
+        h, m = hora.split(":")[:2]
+        return int(h) * 60 + int(m[:2])
+    except (AttributeError, ValueError):
+        return None
+
+
+def zona_vuelo(v, modelo):
+    terminal = (v.get('terminal') or "").upper()
+    if terminal.startswith("T2C"): return "t2c"
+    if terminal.startswith("T2"): return "t2"
+    if modelo.es_puente(modelo.aerolinea_de_vuelo(v.get('vuelo')), iata_origen(v.get('origen'))): return "puente"
+    return "t1"
+
+
+def llegadas_vuelos(vuelos, modelo=None):
+    """(dia_relativo, minuto, zona, pax) de los vuelos no cancelados del snapshot de AENA."""
+    modelo = modelo or cargar_modelo()
+    filas = []
+    for v in vuelos:
+        minuto = _minuto(v.get('hora'))
+        if minuto is None or "CANCELADO" in (v.get('estado') or "").upper():
+            continue
+        pax = v.get('pax')
+        if pax is None:
+            pax = modelo.estimar(modelo.aerolinea_de_vuelo(v.get('vuelo')), origen=iata_origen(v.get('origen')))
+        filas.append((v.get('dia_relativo', 0), minuto, ZONAS.index(zona_vuelo(v, modelo)), pax))
+    return filas
+
+
+def llegadas_trenes(trenes, minuto_actual):
+    """
+    Igual para Sants. El panel de ADIF solo trae la hora: lo que queda más de 2h por detrás
+    de la hora actual es de mañana.
+    """
+    filas = []
+    for t in trenes:
+        minuto = _minuto(t.get('hora'))
+        pax = PAX_TRENES.get((t.get('tren') or "").split(" ")[0].upper())
+        if minuto is None or not pax:
+            continue
+        filas.append((1 if minuto < minuto_actual - 120 else 0, minuto, ZONAS.index("sants"), pax))
+    return filas
+
+
+def _columnas(filas):
+    if not filas:
+        return (np.zeros(0, dtype=np.int64),) * 3 + (np.zeros(0),)
+    dia, minuto, zona, pax = (np.array(c) for c in zip(*filas))
+    return dia.astype(np.int64), minuto.astype(np.int64), zona.astype(np.int64), pax.astype(float)
+
+
+# =============================================================================
+# 3. CURVAS (BINCOUNT + DESFASE)
+# =============================================================================
+def curvas_diarias(dia, minuto, zona, pax, n_dias):
+    """Pax por (día, zona, franja) de la llegada, en un solo bincount. Fuera de [0, n_dias) se ignora."""
+    dentro = (dia >= 0) & (dia < n_dias) & (minuto >= 0) & (minuto < 24 * 60)
+    indice = (dia[dentro] * len(ZONAS) + zona[dentro]) * FRANJAS_DIA + minuto[dentro] // MINUTOS_BLOQUE
+    # float64 explícito: sin llegadas, bincount devuelve int64 aunque haya pesos
+    return np.bincount(indice, weights=pax[dentro], minlength=n_dias * len(ZONAS) * FRANJAS_DIA) \
+        .astype(np.float64).reshape(n_dias, len(ZONAS), FRANJAS_DIA)
+
+
+def aplicar_desfase(curvas, desfases):
+    """Reparte cada franja en las siguientes (también de un día al otro). desfases: un reparto por zona."""
+    n_dias = curvas.shape[0]
+    serie = curvas.transpose(1, 0, 2).reshape(len(ZONAS), -1) # zona x tiempo continuo
+    salida = np.zeros_like(serie)
+    for z, reparto in enumerate(desfases):
+        for k, peso in enumerate(reparto):
+            salida[z, k:] += peso * serie[z, :serie.shape[1] - k]
+    return salida.reshape(len(ZONAS), n_dias, FRANJAS_DIA).transpose(1, 0, 2)
+
+
+DESFASES_ZONA = [DESFASE["tren"] if z == "sants" else DESFASE["vuelo"] for z in ZONAS]
+
+
+# =============================================================================
+# 4. HISTÓRICO Y PATRONES SEMANALES
+# =============================================================================
+def cargar_historico(ruta=FILE_HISTORICO):
+    """
+    (días ordinales ordenados, curvas float32 días x zonas x franjas, en curso). `en curso` es
+    (día ordinal, llegadas zonas x franjas sin desfase) del último día consolidado, o None.
+    """
+    try:
+        with np.load(ruta, allow_pickle=False) as npz:
+            if list(npz["zonas"]) == ZONAS and npz["curvas"].shape[2] == FRANJAS_DIA:
+                en_curso = None
+                if "llegadas_en_curso" in npz.files:
+                    en_curso = (int(npz["dia_en_curso"]), npz["llegadas_en_curso"].astype(np.float64))
+                return npz["dias"].astype(np.int64), npz["curvas"].astype(np.float32), en_curso
+            print("⚠️ Histórico de previsión con otras zonas/franjas: se empieza de cero.")
+    except (OSError, KeyError, ValueError):
+        pass
+    return np.zeros(0, dtype=np.int64), np.zeros((0, len(ZONAS), FRANJAS_DIA), dtype=np.float32), None
+
+
+def guardar_historico(dias, curvas, en_curso=None, ruta=FILE_HISTORICO):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = ruta + ".tmp.npz"
+    extra = {}
+    if en_curso is not None:
+        extra = {"dia_en_curso": np.int64(en_curso[0]), "llegadas_en_curso": en_curso[1].astype(np.float32)}
+    np.savez_compressed(tmp, dias=dias, curvas=curvas.astype(np.float32), zonas=np.array(ZONAS), **extra)
+    os.replace(tmp, ruta)
+
+
+def consolidar_dia(dias, curvas, dia, curva, franja_actual):
+    """
+    Upsert de la curva de `dia`: las franjas anteriores a `franja_actual` se conservan si ya
+    estaban. `curva` tiene que traer ya el reparto de lo que llegó antes (ver prever).
+    """
+    pos = np.searchsorted(dias, dia)
+    if pos < len(dias) and dias[pos] == dia:
+        curvas = curvas.copy()
+        curvas[pos, :, franja_actual:] = curva[:, franja_actual:]
+    else:
+        dias = np.insert(dias, pos, dia)
+        curvas = np.insert(curvas, pos, curva, axis=0)
+    return dias[-DIAS_GUARDADOS:], curvas[-DIAS_GUARDADOS:]
+
+
+def perfil_dia(dias, curvas, dia, semanas=SEMANAS_HISTORICO):
+    """Media de las curvas del mismo día de la semana en las `semanas` anteriores, o None."""
+    distancia = dia - dias
+    mascara = (distancia > 0) & (distancia % 7 == 0) & (distancia <= 7 * semanas)
+    return curvas[mascara].mean(axis=0) if mascara.any() else None
+
+
+def perfiles_semanales(dias, curvas, semanas=SEMANAS_HISTORICO):
+    """
+    perfil_dia para TODOS los días del histórico a la vez (reconstrucción/backtest):
+    sumas acumuladas por semana, así cuesta lo mismo con 8 semanas que con 52.
+    Devuelve (n_dias, zonas, franjas) con NaN donde no hay semanas previas.
+    """
+    if not len(dias):
+        return np.zeros((0, len(ZONAS), FRANJAS_DIA))
+    inicio = int(dias[0])
+    n_semanas = -(-(int(dias[-1]) - inicio + 1) // 7)
+    denso = np.zeros((n_semanas * 7, len(ZONAS), FRANJAS_DIA))
+    hay = np.zeros(n_semanas * 7)
+    denso[dias - inicio] = curvas
+    hay[dias - inicio] = 1
+
+    acumulado = np.concatenate([np.zeros((1, 7, len(ZONAS), FRANJAS_DIA)),
+                                np.cumsum(denso.reshape(n_semanas, 7, len(ZONAS), FRANJAS_DIA), axis=0)])
+    acumulado_hay = np.concatenate([np.zeros((1, 7)), np.cumsum(hay.reshape(n_semanas, 7), axis=0)])
+    semana = np.arange(n_semanas)
+    desde = np.maximum(semana - semanas, 0)
+    suma = acumulado[semana] - acumulado[desde]
+    cuenta = acumulado_hay[semana] - acumulado_hay[desde]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        perfil = suma / cuenta[:, :, None, None]
+    return perfil.reshape(n_semanas * 7, len(ZONAS), FRANJAS_DIA)[dias - inicio]
+
+
+# =============================================================================
+# 5. PREVISIÓN
+# =============================================================================
+def prever(vuelos, trenes, ahora=None, historico=None, actualizar_historico=True):
+    """
+    Previsión para las próximas 24h desde la franja actual. Devuelve (datos para el JSON,
+    histórico actualizado con lo observado hoy).
+    """
+    ahora = ahora or datetime.now(ZONA_HORARIA)
+    dias, curvas, en_curso = historico if historico is not None else cargar_historico()
+    hoy = ahora.date().toordinal()
+    minuto_actual = ahora.hour * 60 + ahora.minute
+    franja_actual = minuto_actual // MINUTOS_BLOQUE
+
+    # Ayer, hoy y mañana (el snapshot de AENA llega hasta 24h vista) + el desfase que se cuela
+    # al día siguiente. Ayer y lo ya llegado de hoy salen de las llegadas guardadas: el snapshot
+    # ya no los trae, pero su reparto sigue cayendo en las franjas de ahora.
+    filas = llegadas_vuelos(vuelos) + llegadas_trenes(trenes, minuto_actual)
+    dia, minuto, zona, pax = _columnas(filas)
+    llegadas = curvas_diarias(dia + 1, minuto, zona, pax, 4)
+    if en_curso is not None and en_curso[0] == hoy:
+        llegadas[1, :, :franja_actual] = en_curso[1][:, :franja_actual]
+    elif en_curso is not None and en_curso[0] == hoy - 1:
+        llegadas[0] = en_curso[1]
+    programado = aplicar_desfase(llegadas, DESFASES_ZONA)[1:]
+    if actualizar_historico:
+        dias, curvas = consolidar_dia(dias, curvas, hoy, programado[0], franja_actual)
+        en_curso = (hoy, llegadas[1])
+
+    # Hasta dónde llega lo que sabemos de cada zona: más allá solo vale el histórico
+    cobertura = np.full(len(ZONAS), -1)
+    for dia, minuto, zona, _ in filas:
+        franja = dia * FRANJAS_DIA + minuto // MINUTOS_BLOQUE + len(DESFASES_ZONA[zona]) - 1
+        cobertura[zona] = max(cobertura[zona], franja)
+
+    ventana = slice(franja_actual, franja_actual + FRANJAS_DIA)
+    programado = programado.transpose(1, 0, 2).reshape(len(ZONAS), -1)[:, ventana]
+    perfiles = [perfil_dia(dias, curvas, hoy + d) for d in range(2)]
+    if all(p is not None for p in perfiles):
+        historico_ventana = np.concatenate(perfiles, axis=1)[:, ventana]
+    else:
+        historico_ventana = None
+
+    franjas = np.arange(franja_actual, franja_actual + FRANJAS_DIA)
+    cubierto = franjas[None, :] <= cobertura[:, None]
+    if historico_ventana is None:
+        esperado = programado
+    else:
+        mezcla = PESO_PROGRAMADO * programado + (1 - PESO_PROGRAMADO) * historico_ventana
+        esperado = np.where(cubierto, mezcla, historico_ventana)
+
+    inicio = datetime.combine(ahora.date(), datetime.min.time()) + timedelta(minutes=franja_actual * MINUTOS_BLOQUE)
+    datos = {
+        "generado": ahora.isoformat(timespec="seconds"),
+        "desde": inicio.strftime("%Y-%m-%dT%H:%M"),
+        "minutos_bloque": MINUTOS_BLOQUE,
+        "dias_historico": int(len(dias)),
+        "zonas": {
+            zona: {
+                "esperado": np.rint(esperado[z]).astype(int).tolist(),
+                "programado": np.rint(programado[z]).astype(int).tolist(),
+                "historico": np.rint(historico_ventana[z]).astype(int).tolist() if historico_ventana is not None else None,
+            } for z, zona in enumerate(ZONAS)
+        },
+    }
+    return datos, (dias, curvas, en_curso)
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+if __name__ == "__main__":
+    vuelos, trenes = _leer(FILE_VUELOS), _leer(FILE_TRENES)
+    print(f"🔮 Previsión de demanda con {len(vuelos)} vuelos y {len(trenes)} trenes...")
+    datos, historico = prever(vuelos, trenes)
+    guardar_historico(*historico)
+    publicacion.publicar("prevision_demanda", datos, ruta=FILE_PREVISION)
+    picos = {zona: max(range(len(z["esperado"])), key=z["esperado"].__getitem__) for zona, z in datos["zonas"].items()}
+    inicio = datetime.fromisoformat(datos["desde"])
+    for zona, pico in picos.items():
+        hora = (inicio + timedelta(minutes=pico * MINUTOS_BLOQUE)).strftime("%H:%M")
+        print(f"   {zona.upper():<7} {sum(datos['zonas'][zona]['esperado']):>6,} pax en 24h | pico {hora}")
+    print(f"✅ Previsión guardada ({datos['dias_historico']} días de histórico)")
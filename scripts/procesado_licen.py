@@ -1,3 +1,4 @@
+import hashlib
 import json
 import pandas as pd
 import numpy as np
@@ -5,12 +6,17 @@ import re
 import os
 from datetime import datetime
 
+from almacen_ofertas import FILE_ALMACEN, AlmacenOfertas
+from historico import Historico
+import publicacion
+
 # =============================================================================
 # CONFIGURACIÓN Y CONSTANTES
 # =============================================================================
 FILE_INPUT_RAW = 'licencias_totales.json' # Tu output del scraper
 FILE_HISTORY = 'public/history_stats.csv'     # Base de datos histórica
 FILE_OUTPUT_WEB = 'public/web_feed.json'      # Lo que lee tu web
+DIR_HISTORICO = 'data/historico'              # Log + snapshot del histórico (ver historico.py)
 
 # Precios Base (Tu lógica corregida con VITO > MERCEDES)
 PRECIOS_BASE = {
@@ -27,6 +33,29 @@ PRECIOS_BASE = {
 }
 MODELOS_ORDENADOS = sorted(PRECIOS_BASE.keys(), key=len, reverse=True)
 
+# Patrones compilados (compartidos por el bucle y la ruta vectorizada)
+RE_PRECIO_ETIQUETA = re.compile(r'PRECIO:?\s*\|?\s*(\d{1,3}[\.,]?\d{3})')
+RE_PRECIO_EURO = re.compile(r'(\d{1,3}[\.,]?\d{3})\s*€')
+RE_NUMERO_SUELTO = re.compile(r'(\d{5,6})')
+RE_ANIO = re.compile(r'(201[0-9]|202[0-9])')
+RE_KM = re.compile(r'(\d{2,3})[\.,]?(\d{3})\s?(KM|KMS)')
+PALABRAS_PROHIBIDAS = ['antigua', 'colección', 'alquilo', 'alquiler', 'compartir', 'chapa', 'taxi inglés', 'conductor']
+RE_PROHIBIDAS = re.compile("|".join(re.escape(p) for p in PALABRAS_PROHIBIDAS))
+FILTROS_GENERALES = ["VTC", "SANTA MARGARIDA", "3 LICENCIA"]
+RE_FILTROS_GENERALES = re.compile("|".join(re.escape(x) for x in FILTROS_GENERALES))
+DIAS = ["LUNES", "MARTES", "MIERCOLES", "JUEVES", "VIERNES"]
+# Lookahead: en cada posición devuelve el modelo más largo que empieza ahí (solapes incluidos)
+RE_MODELOS = re.compile("(?=(" + "|".join(re.escape(m) for m in MODELOS_ORDENADOS) + "))")
+RE_DIAS = re.compile("|".join(DIAS))
+RANGO_MODELO = {m: i for i, m in enumerate(MODELOS_ORDENADOS)}
+# Huella de anuncio: la referencia de la agencia ("Ref: | 39224", "Referencia: 1028") no cambia
+# aunque rebajen el precio; sin ella, el texto sin precio ni marcas que van y vienen
+RE_REFERENCIA = re.compile(r'\bREF(?:ERENCIA)?\.?\s*:?\s*\|?\s*(\d{2,}(?:/\d+)?)')
+RE_VOLATILES_HUELLA = re.compile(
+    r'PRECIO:?[\s|]*\d[\d\.,]*[\s|]*€?|\d[\d\.,]*\s*€|'
+    r'\b(?:LICENCIA\s+)?RESERVADA\b|\bREBAJAD[AO]\b|\bNUEVO PRECIO\b|\bVENDID[AO]\b')
+TAM_LOTE = 100_000 # Registros por lote en backfills
+
 # =============================================================================
 # FUNCIONES DE LIMPIEZA Y TASACIÓN
 # =============================================================================
@@ -43,12 +72,12 @@ def tasar_coche(texto_raw):
     # Antigüedad (Default 5 años)
     anio_actual = datetime.now().year
     antiguedad = 5
-    match_anio = re.search(r'(201[0-9]|202[0-9])', texto)
+    match_anio = RE_ANIO.search(texto)
     if match_anio: antiguedad = anio_actual - int(match_anio.group(1))
     
     # KMs
     kms = 0
-    match_km = re.search(r'(\d{2,3})[\.,]?(\d{3})\s?(KM|KMS)', texto)
+    match_km = RE_KM.search(texto)
     if match_km: kms = int(match_km.group(1) + match_km.group(2))
     
     # Fórmula de Depreciación
@@ -64,14 +93,17 @@ def extraer_precio(raw):
     raw_clean = raw.replace('\n', ' ').upper()
     
     # 1. Prioridad: "Precio: X" o "X €"
-    match_p = re.search(r'PRECIO:?\s*\|?\s*(\d{1,3}[\.,]?\d{3})', raw_clean)
+    match_p = RE_PRECIO_ETIQUETA.search(raw_clean)
     if match_p: return int(match_p.group(1).replace('.','').replace(',',''))
     
-    match_e = re.search(r'(\d{1,3}[\.,]?\d{3})\s*€', raw_clean)
+    match_e = RE_PRECIO_EURO.search(raw_clean)
     if match_e: return int(match_e.group(1).replace('.','').replace(',',''))
     
+    return _precio_suelto(raw_clean)
+
+def _precio_suelto(raw_clean):
     # 2. Prioridad: Números sueltos lógicos (entre 50k y 600k)
-    candidatos = re.finditer(r'(\d{5,6})', raw_clean.replace('.','').replace(',',''))
+    candidatos = RE_NUMERO_SUELTO.finditer(raw_clean.replace('.','').replace(',',''))
     for m in candidatos:
         val = int(m.group(1))
         # Rango lógico ampliado para evitar falsos positivos
@@ -82,29 +114,34 @@ def extraer_precio(raw):
                 return val
     return 0
 
+def huella_oferta(fuente, raw):
+    """
+    Huella del anuncio (63 bits). A diferencia de hash(), no cambia entre ejecuciones, y
+    tampoco cuando cambia el precio: así el almacén puede seguir la deriva de cada anuncio.
+    """
+    up = raw.upper()
+    ref = RE_REFERENCIA.search(up)
+    if ref:
+        texto = f"{fuente}|REF {ref.group(1)}"
+    else:
+        estable = RE_VOLATILES_HUELLA.sub(" ", up)
+        texto = f"{fuente}|{' '.join(estable.replace('|', ' ').split())}"
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest(), 'big') >> 1
+
 def extraer_dia(raw):
     t = raw.upper()
-    dias = ["LUNES", "MARTES", "MIERCOLES", "JUEVES", "VIERNES"]
-    dia = next((d for d in dias if d in t), "DESCONOCIDO")
+    dia = next((d for d in DIAS if d in t), "DESCONOCIDO")
     tipo = " PAR" if "PAR" in t and "IMPAR" not in t else " IMPAR" if "IMPAR" in t else ""
     return (dia + tipo) if dia != "DESCONOCIDO" else "NO ESPECIFICADO"
 
 # =============================================================================
-# EJECUCIÓN PRINCIPAL
+# LIMPIEZA DE OFERTAS: BUCLE (REFERENCIA) Y RUTA VECTORIZADA
 # =============================================================================
-def main():
-    # 1. Cargar Datos Crudos (Scraper Output)
-    if not os.path.exists(FILE_INPUT_RAW):
-        print("No hay datos nuevos. Fin.")
-        return
+COLUMNAS_OFERTAS = ["id", "fuente", "dia", "modelo", "precio_total", "valor_coche", "precio_neto", "raw"]
 
-    with open(FILE_INPUT_RAW, 'r', encoding='utf-8') as f: 
-        raw_data = json.load(f)
-    
+def limpiar_ofertas_bucle(raw_data):
+    """Implementación original, registro a registro. Se mantiene como referencia."""
     clean_items = []
-    
-    print(f"🔄 Procesando {len(raw_data)} registros...")
-
     for item in raw_data:
         raw = item.get('raw', '')
         fuente = item.get('fuente', 'DESCONOCIDO')
@@ -113,13 +150,12 @@ def main():
         if fuente == 'MILANUNCIOS':
             # Filtro Anti-Chatarra (Placas antiguas, llaveros, alquiler)
             texto_lower = raw.lower()
-            palabras_prohibidas = ['antigua', 'colección', 'alquilo', 'alquiler', 'compartir', 'chapa', 'taxi inglés', 'conductor']
-            if any(p in texto_lower for p in palabras_prohibidas):
+            if any(p in texto_lower for p in PALABRAS_PROHIBIDAS):
                 continue
         # ------------------------------------------------
         
         # Filtros generales (VTC, etc)
-        if any(x in raw.upper() for x in ["VTC", "SANTA MARGARIDA", "3 LICENCIA"]): continue
+        if any(x in raw.upper() for x in FILTROS_GENERALES): continue
         
         # Extracción inteligente STAC vs General
         texto_coche = raw
@@ -142,7 +178,7 @@ def main():
         valor_coche, modelo = tasar_coche(texto_coche)
         
         clean_items.append({
-            "id": abs(hash(raw)), # ID único para tracking simple
+            "id": huella_oferta(fuente, raw), # ID estable entre ejecuciones
             "fuente": fuente,
             "dia": extraer_dia(raw),
             "modelo": modelo,
@@ -152,7 +188,148 @@ def main():
             "raw": raw[:100] + "..."
         })
 
-    df = pd.DataFrame(clean_items)
+    return pd.DataFrame(clean_items, columns=COLUMNAS_OFERTAS)
+
+def _precio_vectorizado(textos):
+    """extraer_precio sobre una Series: etiqueta y € con str.extract; los números sueltos (raros) van al bucle."""
+    limpio = textos.str.replace('\n', ' ', regex=False).str.upper()
+    numeros = limpio.str.extract(RE_PRECIO_ETIQUETA, expand=False)
+    numeros = numeros.fillna(limpio.str.extract(RE_PRECIO_EURO, expand=False))
+    numeros = numeros.str.replace('.', '', regex=False).str.replace(',', '', regex=False)
+
+    precio = pd.Series(0, index=textos.index, dtype='int64')
+    hay = numeros.notna()
+    precio[hay] = numeros[hay].astype('int64')
+    if (~hay).any():
+        precio[~hay] = limpio[~hay].map(_precio_suelto).astype('int64')
+    return precio
+
+def _tasar_vectorizado(textos):
+    """tasar_coche sobre una Series. Devuelve (valor_coche, modelo) como arrays."""
+    t = textos.str.upper()
+    # Un único barrido de regex por fila en vez de un 'in' por modelo; gana el primero de MODELOS_ORDENADOS
+    encontrados = t.str.findall(RE_MODELOS)
+    modelo = np.array([min(e, key=RANGO_MODELO.get) if e else "DESCONOCIDO" for e in encontrados], dtype=object)
+    valor_base = np.array([PRECIOS_BASE.get(m, 10000) for m in modelo], dtype='int64')
+
+    # Antigüedad (Default 5 años)
+    anio = pd.to_numeric(t.str.extract(RE_ANIO, expand=False), errors='coerce')
+    antiguedad = np.maximum(0, (datetime.now().year - anio).fillna(5).to_numpy(dtype='int64'))
+    # KMs
+    km = t.str.extract(RE_KM)
+    kms = pd.to_numeric(km[0] + km[1], errors='coerce').fillna(0).to_numpy(dtype='int64')
+
+    # Fórmula de Depreciación. 0.85 ** n sale de una tabla calculada con el mismo
+    # pow de Python que el bucle, así los resultados son idénticos bit a bit.
+    tabla_edad = np.array([0.85 ** n for n in range(int(antiguedad.max(initial=0)) + 1)])
+    factor_edad = tabla_edad[antiguedad]
+    factor_km = np.maximum(0.2, 1 - ((kms / 100000) * 0.15))
+    valor = np.maximum(1000, valor_base * factor_edad * factor_km).astype('int64')
+
+    sin_coche = t.str.contains("SIN COCHE|SIN VEHICULO").to_numpy(dtype=bool)
+    valor[sin_coche] = 0
+    modelo[sin_coche] = "SIN COCHE"
+    return valor, modelo
+
+def _dia_vectorizado(up):
+    encontrados = up.str.findall(RE_DIAS)
+    dia = [min(e, key=DIAS.index) if e else "" for e in encontrados]
+    impar = up.str.contains("IMPAR", regex=False).to_numpy(dtype=bool)
+    par = up.str.contains("PAR", regex=False).to_numpy(dtype=bool) & ~impar
+    tipo = np.where(par, " PAR", np.where(impar, " IMPAR", ""))
+    return np.array([d + t if d else "NO ESPECIFICADO" for d, t in zip(dia, tipo)], dtype=object)
+
+def limpiar_ofertas_vectorizado(raw_data):
+    """
+    Misma salida que limpiar_ofertas_bucle, pero cargando todo en pandas una vez y
+    aplicando las regex compiladas por columnas (str.extract / str.contains).
+    Los anuncios repetidos (mismo fuente + texto, típico entre páginas y días) se procesan una sola vez.
+    """
+    todos = pd.DataFrame(list(raw_data), columns=["fuente", "raw"])
+    if todos.empty:
+        return pd.DataFrame(columns=COLUMNAS_OFERTAS)
+    todos["fuente"] = todos["fuente"].fillna("DESCONOCIDO").astype(str)
+    todos["raw"] = todos["raw"].fillna("").astype(str)
+    grupo = todos.groupby(["fuente", "raw"], sort=False).ngroup().to_numpy()
+    df = todos.drop_duplicates(["fuente", "raw"]).reset_index(drop=True) # fila i <-> grupo i
+
+    # Filtros (Anti-Chatarra de Milanuncios + generales)
+    up = df["raw"].str.upper()
+    prohibido = (df["fuente"] == "MILANUNCIOS") & df["raw"].str.lower().str.contains(RE_PROHIBIDAS)
+    general = up.str.contains(RE_FILTROS_GENERALES)
+    df, up = df[~(prohibido | general)], up[~(prohibido | general)]
+    raw = df["raw"]
+
+    # Extracción inteligente STAC vs General
+    texto_coche = raw.copy()
+    precio = pd.Series(0, index=df.index, dtype='int64')
+    es_stac = df["fuente"] == "STAC"
+    if es_stac.any():
+        partes = raw[es_stac].str.split('|', regex=False).explode()
+        partes_up = partes.str.upper()
+        tiene_precio = partes_up.str.contains("PRECIO", regex=False)
+        precio_part = partes[tiene_precio | partes.str.contains("€", regex=False)].groupby(level=0).first()
+        precio[precio_part.index] = _precio_vectorizado(precio_part)
+        coche_part = partes[(partes.str.len() > 15) & ~partes_up.str.contains("REF", regex=False) & ~tiene_precio].groupby(level=0).first()
+        texto_coche[coche_part.index] = coche_part
+
+    # Si no se encontró precio en STAC o es otra fuente, buscamos globalmente
+    sin_precio = precio == 0
+    if sin_precio.any():
+        precio[sin_precio] = _precio_vectorizado(raw[sin_precio])
+
+    # Filtro final de precio lógico
+    validos = (precio >= 50000).to_numpy()
+    df, up, raw, texto_coche, precio = df[validos], up[validos], raw[validos], texto_coche[validos], precio[validos]
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS_OFERTAS)
+
+    valor_coche, modelo = _tasar_vectorizado(texto_coche)
+    unicos = pd.DataFrame({
+        "id": [huella_oferta(f, r) for f, r in zip(df["fuente"], raw)], # ID estable entre ejecuciones
+        "fuente": df["fuente"].to_numpy(),
+        "dia": _dia_vectorizado(up),
+        "modelo": modelo,
+        "precio_total": precio.to_numpy(),
+        "valor_coche": valor_coche,
+        "precio_neto": precio.to_numpy() - valor_coche,
+        "raw": (raw.str.slice(0, 100) + "...").to_numpy(),
+    }, index=df.index, columns=COLUMNAS_OFERTAS)
+
+    # De vuelta al orden original, con las repeticiones
+    grupo = grupo[np.isin(grupo, unicos.index.to_numpy())]
+    return unicos.loc[grupo].reset_index(drop=True)
+
+def limpiar_ofertas_por_lotes(registros, tam_lote=TAM_LOTE):
+    """Para backfills de años de anuncios: procesa cualquier iterable por lotes sin cargarlo entero."""
+    lote, partes = [], []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) >= tam_lote:
+            partes.append(limpiar_ofertas_vectorizado(lote))
+            lote = []
+    if lote:
+        partes.append(limpiar_ofertas_vectorizado(lote))
+    partes = [p for p in partes if not p.empty]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_OFERTAS)
+
+# Ruta por defecto: vectorizada. PROCESADO_VECTORIZADO=0 vuelve al bucle original.
+limpiar_ofertas = limpiar_ofertas_vectorizado if os.environ.get("PROCESADO_VECTORIZADO", "1") != "0" else limpiar_ofertas_bucle
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+def main():
+    # 1. Cargar Datos Crudos (Scraper Output)
+    if not os.path.exists(FILE_INPUT_RAW):
+        print("No hay datos nuevos. Fin.")
+        return
+
+    with open(FILE_INPUT_RAW, 'r', encoding='utf-8') as f: 
+        raw_data = json.load(f)
+    
+    print(f"🔄 Procesando {len(raw_data)} registros...")
+    df = limpiar_ofertas(raw_data)
     
     if df.empty: 
         print("⚠️ No se generaron ofertas válidas.")
@@ -169,29 +346,20 @@ def main():
         "volatility_std": int(df['precio_neto'].std()) if len(df) > 1 else 0
     }
 
+    # 2b. ALMACÉN A NIVEL DE ANUNCIO (primera/última vez vista, precio por día)
+    with AlmacenOfertas(FILE_ALMACEN) as almacen:
+        almacen.registrar(df, today_stats['date'])
+
     # 3. ACTUALIZAR HISTÓRICO Y CALCULAR TENDENCIAS
-    os.makedirs(os.path.dirname(FILE_HISTORY), exist_ok=True)
-    
-    history_df = pd.DataFrame()
-    if os.path.exists(FILE_HISTORY):
-        history_df = pd.read_csv(FILE_HISTORY)
-    
-    # Añadir hoy (si no existe ya para hoy, reemplazamos, si no añadimos)
-    if not history_df.empty and today_stats['date'] in history_df['date'].values:
-        history_df.loc[history_df['date'] == today_stats['date']] = pd.DataFrame([today_stats]).values
-    else:
-        history_df = pd.concat([history_df, pd.DataFrame([today_stats])], ignore_index=True)
-    
-    history_df.to_csv(FILE_HISTORY, index=False)
-    
-    # --- CÁLCULOS FINANCIEROS AVANZADOS (BLOOMBERG STYLE) ---
-    history_df['sma_7'] = history_df['median_price'].rolling(window=7).mean().fillna(0).astype(int)
-    history_df['sma_30'] = history_df['median_price'].rolling(window=30).mean().fillna(0).astype(int)
+    # Upsert O(1): log append-only + medias móviles incrementales; el CSV se sigue exportando igual
+    historico = Historico(DIR_HISTORICO, csv_export=FILE_HISTORY)
+    historico.upsert(today_stats)
+    history_df = historico.serie()
     
     current_median = today_stats['median_price']
     prev_median = current_median
-    if len(history_df) > 1:
-        prev_median = history_df.iloc[-2]['median_price']
+    if historico.estado['anterior']:
+        prev_median = historico.estado['anterior']['median_price']
     
     delta_abs = current_median - prev_median
     delta_pct = round((delta_abs / prev_median) * 100, 2) if prev_median else 0
@@ -224,9 +392,7 @@ def main():
         "updated_at": datetime.now().strftime("%d/%m/%Y %H:%M")
     }
 
-    os.makedirs(os.path.dirname(FILE_OUTPUT_WEB), exist_ok=True)
-    with open(FILE_OUTPUT_WEB, 'w', encoding='utf-8') as f:
-        json.dump(web_output, f, ensure_ascii=False, indent=4)
+    publicacion.publicar("web_feed", web_output, ruta=FILE_OUTPUT_WEB)
     
     print(f"✅ Proceso completado. Precio actual: {current_median}€ ({delta_pct}%) - Volumen: {len(df)}")
 
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+# =============================================================================
+# PUBLICACIÓN DE FEEDS PARA LA APP (MINIFICADOS, CON HASH Y DELTA)
+# =============================================================================
+# Todo se escribe de forma atómica y solo si hay cambios reales (ver VOLATILES): los
+# workflows commitean cuando cambian bytes, así evitamos un commit por ejecución.
+# Por cada feed se escribe:
+#   public/<nombre>.json                  -> ruta de siempre (minificada) para apps antiguas
+#   public/feeds/<nombre>.<hash>.json     -> contenido inmutable, se puede cachear para siempre
+#   public/feeds/<nombre>.delta.json      -> cambios respecto a la versión anterior
+#   public/feeds/<nombre>.manifest.json   -> hash actual (lo único que la app pide siempre)
+# Un manifiesto por feed: los workflows de vuelos, trenes y licencias commitean por separado
+# y así nunca se pisan el mismo fichero.
+# La app (src/lib/feeds.ts) compara hashes y, si tiene la versión anterior, aplica el delta.
+DIR_FEEDS = os.environ.get("FEEDS_DIR", os.path.join("public", "feeds"))
+VERSIONES_GUARDADAS = 3 # Ficheros con hash que se conservan por feed
+
+# Campos que identifican un registro en los feeds que son listas (la app usa los mismos)
+CLAVES = {
+    "vuelos": ["dia_relativo", "hora", "vuelo"],
+    "trenes_sants": ["hora", "tren"],
+}
+# Campos que cambian en cada ejecución aunque los datos sean los mismos ("a.b" = anidado).
+# No cuentan para decidir si hay que escribir: si solo cambian ellos, el fichero no se toca.
+VOLATILES = {
+    "web_feed": ["updated_at"],
+    "data": ["meta.update_time", "meta.total_api_calls"],
+    "aena_estado": ["ultima_ejecucion", "modo"],
+    "prevision_demanda": ["generado"],
+}
+# Una línea por escritura real. Es local (.gitignore): en Actions va además al resumen del job.
+REGISTRO_SALIDAS = os.environ.get("REGISTRO_SALIDAS", os.path.join("data", "salidas.jsonl"))
+
+
+def json_minificado(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+
+
+def hash_contenido(contenido):
+    return hashlib.sha256(contenido).hexdigest()[:12]
+
+
+def _escribir(ruta, contenido):
+    """Escritura atómica: el servidor nunca ve un fichero a medias."""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = ruta + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+
+
+def _leer(ruta, defecto=None):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return defecto
+
+
+def sin_volatiles(datos, volatiles):
+    """Copia normalizada (como quedaría tras un json.load) sin los campos volátiles."""
+    datos = json.loads(json.dumps(datos))
+    for ruta in volatiles:
+        nodo, partes = datos, ruta.split(".")
+        for parte in partes[:-1]:
+            nodo = nodo.get(parte) if isinstance(nodo, dict) else None
+        if isinstance(nodo, dict):
+            nodo.pop(partes[-1], None)
+    return datos
+
+
+def iguales(anterior, nuevo, volatiles=()):
+    return anterior is not None and sin_volatiles(anterior, volatiles) == sin_volatiles(nuevo, volatiles)
+
+
+def claves_registros(registros, campos):
+    """Clave "campo1|campo2" por registro; las repetidas se numeran (#1, #2...) para que sean únicas."""
+    vistas = {}
+    claves = []
+    for r in registros:
+        base = "|".join("" if r.get(c) is None else str(r.get(c)) for c in campos)
+        n = vistas.get(base, 0)
+        vistas[base] = n + 1
+        claves.append(base if n == 0 else f"{base}#{n}")
+    return claves
+
+
+def calcular_delta(anterior, nuevo, campos=None):
+    """
+    Listas: registros nuevos o cambiados por clave, claves eliminadas y el orden final (si cambia).
+    Diccionarios: claves de primer nivel cambiadas/eliminadas.
+    """
+    if isinstance(nuevo, list) and isinstance(anterior, list) and campos:
+        previos = dict(zip(claves_registros(anterior, campos), anterior))
+        claves = claves_registros(nuevo, campos)
+        actuales = dict(zip(claves, nuevo))
+        delta = {
+            "cambios": {k: r for k, r in actuales.items() if previos.get(k) != r},
+            "eliminados": [k for k in previos if k not in actuales],
+        }
+        # Orden por defecto: el anterior sin los eliminados y los nuevos al final. Solo si no basta se manda entero.
+        nuevos = [k for k in claves if k not in previos]
+        if [k for k in previos if k in actuales] + nuevos != claves:
+            delta["orden"] = claves
+        return delta
+    if isinstance(nuevo, dict) and isinstance(anterior, dict):
+        return {
+            "cambios": {k: v for k, v in nuevo.items() if anterior.get(k) != v},
+            "eliminados": [k for k in anterior if k not in nuevo],
+        }
+    return None # Formatos distintos: la app descarga el fichero entero
+
+
+def registrar_cambio(ruta, anterior, nuevo, bytes_escritos, campos=None, volatiles=()):
+    """Estadísticas por fichero de una escritura real: qué cambió y cuánto pesa."""
+    delta = calcular_delta(sin_volatiles(anterior, volatiles), sin_volatiles(nuevo, volatiles), campos) \
+        if anterior is not None else None
+    if delta is not None:
+        previas = set(claves_registros(anterior, campos)) if isinstance(anterior, list) else set(anterior)
+        nuevos = sum(1 for k in delta["cambios"] if k not in previas)
+        stats = {"añadidos": nuevos, "cambiados": len(delta["cambios"]) - nuevos, "eliminados": len(delta["eliminados"])}
+    else:
+        stats = {"añadidos": len(nuevo) if isinstance(nuevo, (list, dict)) else 1, "cambiados": 0, "eliminados": 0}
+    stats.update(archivo=ruta, fecha=datetime.now().isoformat(timespec="seconds"), bytes=bytes_escritos)
+    print(f"📝 {ruta}: +{stats['añadidos']} ~{stats['cambiados']} -{stats['eliminados']} ({bytes_escritos / 1024:.1f} KB)")
+    try:
+        if REGISTRO_SALIDAS:
+            os.makedirs(os.path.dirname(REGISTRO_SALIDAS) or ".", exist_ok=True)
+            with open(REGISTRO_SALIDAS, "a", encoding="utf-8") as f:
+                f.write(json.dumps(stats, ensure_ascii=False) + "\n")
+        if os.environ.get("GITHUB_STEP_SUMMARY"):
+            with open(os.environ["GITHUB_STEP_SUMMARY"], "a", encoding="utf-8") as f:
+                f.write(f"- `{ruta}`: +{stats['añadidos']} ~{stats['cambiados']} -{stats['eliminados']} "
+                        f"({bytes_escritos / 1024:.1f} KB)\n")
+    except OSError:
+        pass
+    return stats
+
+
+def escribir_si_cambia(ruta, datos, volatiles=(), campos=None, indent=None):
+    """
+    Escribe `datos` en `ruta` (atómico) solo si difiere del fichero actual ignorando
+    los campos volátiles. Devuelve True si ha escrito.
+    """
+    anterior = _leer(ruta)
+    if iguales(anterior, datos, volatiles):
+        print(f"⏸️ {ruta}: sin cambios reales, no se reescribe.")
+        return False
+    if indent is None:
+        contenido = json_minificado(datos).encode("utf-8")
+    else:
+        contenido = json.dumps(datos, ensure_ascii=False, indent=indent).encode("utf-8")
+    _escribir(ruta, contenido)
+    registrar_cambio(ruta, anterior, datos, len(contenido), campos, volatiles)
+    return True
+
+
+def publicar(nombre, datos, ruta=None, directorio=DIR_FEEDS):
+    """Publica `datos` como feed `nombre`. Devuelve la entrada del manifiesto."""
+    volatiles = VOLATILES.get(nombre, ())
+    if ruta:
+        escribir_si_cambia(ruta, datos, volatiles, CLAVES.get(nombre))
+
+    ruta_manifiesto = os.path.join(directorio, f"{nombre}.manifest.json")
+    previo = _leer(ruta_manifiesto)
+    anterior = _leer(os.path.join(directorio, previo["archivo"])) if previo else None
+    if previo and iguales(anterior, datos, volatiles):
+        return previo # Nada que publicar: ni fichero nuevo, ni delta, ni manifiesto
+
+    contenido = json_minificado(datos).encode("utf-8")
+    hash_nuevo = hash_contenido(contenido)
+
+    archivo = f"{nombre}.{hash_nuevo}.json"
+    _escribir(os.path.join(directorio, archivo), contenido)
+
+    entrada = {
+        "hash": hash_nuevo,
+        "archivo": archivo,
+        "bytes": len(contenido),
+        "registros": len(datos) if isinstance(datos, list) else None,
+        "clave": CLAVES.get(nombre),
+        "actualizado": datetime.now().isoformat(timespec="seconds"),
+        "historial": ([previo["hash"]] + previo.get("historial", []))[:VERSIONES_GUARDADAS - 1] if previo else [],
+    }
+
+    delta = calcular_delta(anterior, datos, CLAVES.get(nombre)) if anterior is not None else None
+    ruta_delta = os.path.join(directorio, f"{nombre}.delta.json")
+    contenido_delta = json_minificado(dict(delta, desde=previo["hash"], hasta=hash_nuevo)).encode("utf-8") if delta else b""
+    if delta is not None and len(contenido_delta) < len(contenido):
+        _escribir(ruta_delta, contenido_delta)
+        entrada.update(delta=os.path.basename(ruta_delta), delta_desde=previo["hash"], delta_bytes=len(contenido_delta))
+    else:
+        delta = None # No compensa: la app descarga el fichero entero
+        if os.path.exists(ruta_delta):
+            os.remove(ruta_delta)
+
+    _escribir(ruta_manifiesto, json.dumps(entrada, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    # Limpieza de versiones viejas (la app que las tenga cacheadas ya no necesita descargarlas)
+    vigentes = {f"{nombre}.{h}.json" for h in [hash_nuevo] + entrada["historial"]}
+    for fichero in os.listdir(directorio):
+        if fichero.startswith(nombre + ".") and fichero.count(".") == 2 and fichero not in vigentes \
+                and fichero not in (os.path.basename(ruta_delta), os.path.basename(ruta_manifiesto)):
+            os.remove(os.path.join(directorio, fichero))
+
+    if delta is not None:
+        print(f"📦 Feed '{nombre}': {len(contenido) / 1024:.1f} KB, delta {entrada['delta_bytes'] / 1024:.1f} KB "
+              f"({len(delta['cambios'])} cambios, {len(delta['eliminados'])} eliminados)")
+    else:
+        print(f"📦 Feed '{nombre}': {len(contenido) / 1024:.1f} KB (sin delta)")
+    return entrada
@@ -0,0 +1,29 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# =============================================================================
+# SESIÓN HTTP COMPARTIDA (KEEP-ALIVE + REINTENTOS)
+# =============================================================================
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+def crear_sesion(reintentos=3, backoff=0.5, pool=10, cabeceras=None):
+    """
+    Session con pool de conexiones reutilizables y reintentos con backoff
+    exponencial para errores de red y 429/5xx.
+    """
+    sesion = requests.Session()
+    retry = Retry(
+        total=reintentos,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    sesion.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "es-ES,es;q=0.9"})
+    if cabeceras:
+        sesion.headers.update(cabeceras)
+    return sesion
@@ -0,0 +1,113 @@
+"""
+Servidor local que imita la API de aviationstack (/v1/flights paginado) para probar
+update_data.py sin gastar cuota.
+
+    python scripts/stub_aviationstack.py -p 8766 --total 450 --latencia 0.3 --fallos 0.1
+    AVIATIONSTACK_URL=http://127.0.0.1:8766/v1/flights API_KEY=stub python scripts/update_data.py
+
+Los vuelos son sintéticos pero deterministas (misma semilla = mismas páginas).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+AEROLINEAS = [("Vueling", "VY", "A320"), ("Iberia", "IB", "A321"), ("easyJet", "U2", "A320"),
+              ("Ryanair", "FR", "B738"), ("Lufthansa", "LH", "A320"), ("Emirates", "EK", "B77W")]
+ORIGENES = [("MAD", "Madrid"), ("LHR", "London Heathrow"), ("CDG", "Paris Charles de Gaulle"),
+            ("FCO", "Rome Fiumicino"), ("AMS", "Amsterdam Schiphol"), ("DXB", "Dubai")]
+ESTADOS = ["scheduled", "scheduled", "scheduled", "active", "landed", "cancelled"]
+
+
+def generar_vuelos(total, semilla=7):
+    rnd = random.Random(semilla)
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    vuelos = []
+    for i in range(total):
+        nombre, iata, avion = rnd.choice(AEROLINEAS)
+        origen, aeropuerto = rnd.choice(ORIGENES)
+        llegada = base + timedelta(minutes=rnd.randint(-60, 24 * 60))
+        vuelos.append({
+            "flight_status": rnd.choice(ESTADOS),
+            "departure": {"iata": origen, "airport": aeropuerto},
+            "arrival": {"iata": "BCN", "terminal": rnd.choice(["1", "2", None]),
+                        "scheduled": llegada.isoformat(), "estimated": None},
+            "airline": {"name": nombre},
+            "flight": {"iata": f"{iata}{1000 + i}"},
+            "aircraft": {"iata": avion} if rnd.random() < 0.7 else None,
+        })
+    return vuelos
+
+
+def crear_servidor(puerto=0, total=450, latencia=0.0, fallos=0.0, semilla=7):
+    vuelos = generar_vuelos(total, semilla)
+    rnd = random.Random(semilla)
+    estado = {"peticiones": 0}
+    lock = threading.Lock()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            partes = urlsplit(self.path)
+            query = {k: v[0] for k, v in parse_qs(partes.query).items()}
+            with lock:
+                estado["peticiones"] += 1
+                fallar = rnd.random() < fallos
+            if latencia:
+                time.sleep(latencia)
+
+            if not partes.path.endswith("/flights"):
+                self._json(404, {"error": {"code": "not_found"}})
+            elif not query.get("access_key"):
+                self._json(401, {"error": {"code": "missing_access_key"}})
+            elif fallar:
+                self._json(503, {"error": {"code": "service_unavailable"}})
+            else:
+                offset, limit = int(query.get("offset", 0)), int(query.get("limit", 100))
+                pagina = vuelos[offset:offset + limit]
+                self._json(200, {
+                    "pagination": {"limit": limit, "offset": offset, "count": len(pagina), "total": len(vuelos)},
+                    "data": pagina,
+                })
+
+        def _json(self, status, cuerpo):
+            datos = json.dumps(cuerpo).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+    servidor.estado = estado
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}/v1/flights"
+    return servidor
+
+
+def arrancar_en_segundo_plano(**opciones):
+    servidor = crear_servidor(**opciones)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local de la API de aviationstack")
+    parser.add_argument("-p", "--puerto", type=int, default=8766)
+    parser.add_argument("--total", type=int, default=450, help="Vuelos totales a paginar")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por petición")
+    parser.add_argument("--fallos", type=float, default=0.0, help="Probabilidad de responder 503")
+    args = parser.parse_args()
+
+    servidor = crear_servidor(args.puerto, args.total, args.latencia, args.fallos)
+    print(f"export AVIATIONSTACK_URL='{servidor.url}'")
+    print(f"🛬 Stub aviationstack con {args.total} vuelos en {servidor.url} (Ctrl+C para salir)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,82 +1,116 @@
-import requests
-import json
 import os
 import sys
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import agregacion_vuelos
+import publicacion
+from cache_http import CacheHTTP, LibroCuota, get_contando, json_contando
+from sesion_http import crear_sesion
 
 # CONFIGURACIÓN
 API_KEY = os.environ.get("API_KEY") 
-BASE_URL = "http://api.aviationstack.com/v1/flights"
-
-def obtener_datos():
-    print("📡 Escaneando radar iTaxiBcn (Modo Paginación Activado)...")
-    
-    if not API_KEY:
-        print("❌ ERROR: No hay API_KEY configurada.")
-        sys.exit(1)
-
-    # Variables para el bucle
-    todos_vuelos_raw = []
-    offset = 0
-    limit = 100
-    total_encontrados = 0
-    max_loops = 10 # MEDIDA DE SEGURIDAD: Para no gastar más de 10 peticiones si hay un error
+BASE_URL = os.environ.get("AVIATIONSTACK_URL", "http://api.aviationstack.com/v1/flights")
+LIMITE_PAGINA = 100
+MAX_LOOPS = int(os.environ.get("AVIATIONSTACK_MAX_LOOPS", "10")) # MEDIDA DE SEGURIDAD: máximo de peticiones por ejecución
+CONCURRENCIA = int(os.environ.get("AVIATIONSTACK_CONCURRENCIA", "4"))
+TIMEOUT_API = 20
+USAR_CACHE = os.environ.get("CACHE_HTTP", "1") != "0"
+AGREGACION_VECTORIZADA = os.environ.get("AGREGACION_VECTORIZADA", "1") != "0"
+MINUTOS_GRAFICA = int(os.environ.get("GRAFICA_MINUTOS", "60")) # Franja de la gráfica (15/30/60...)
 
-    loop_count = 0
+# =============================================================================
+# 1. CLIENTE PAGINADO (PRIMERA PÁGINA + RESTO EN PARALELO)
+# =============================================================================
+def pedir_pagina(sesion, offset, limit=LIMITE_PAGINA, cache=None):
+    """
+    Devuelve (json, latencia en s, origen, peticiones reales). Los 429/5xx y errores de red
+    los reintenta la sesión con backoff; con caché, una página fresca no gasta cuota. Si
+    acaba en excepción, esta lleva `peticiones` para apuntarlas igualmente en la cuota.
+    """
+    params = {
+        'access_key': API_KEY,
+        'arr_iata': 'BCN',
+        'limit': limit,
+        'offset': offset
+    }
+    inicio = time.perf_counter()
+    if cache:
+        data, origen, peticiones = cache.get(sesion, BASE_URL, params=params, timeout=TIMEOUT_API)
+    else:
+        response, peticiones = get_contando(sesion, BASE_URL, params=params, timeout=TIMEOUT_API)
+        data, origen = json_contando(response, peticiones), "red"
+    return data, time.perf_counter() - inicio, origen, peticiones
 
-    while True:
-        loop_count += 1
-        print(f"   ↳ Petición página {loop_count} (Offset: {offset})...")
+def descargar_vuelos(sesion=None, max_loops=MAX_LOOPS, concurrencia=CONCURRENCIA, limit=LIMITE_PAGINA,
+                     cache=None, cuota=None):
+    """
+    La primera página da pagination.total, así que el resto de offsets se conocen y se
+    piden a la vez (como mucho `concurrencia` en vuelo y `max_loops` páginas en total).
+    Si una página falla seguimos con lo que tengamos, como antes. Con `cuota` se apuntan
+    las peticiones reales en el libro.
+    Devuelve (vuelos_raw, peticiones reales, latencias por página).
+    """
+    sesion = sesion or crear_sesion(reintentos=3, backoff=1.0, pool=max(concurrencia, 1))
+    paginas = {}
+    latencias = []
+    contador = {"peticiones": 0}
 
-        params = {
-            'access_key': API_KEY,
-            'arr_iata': 'BCN',
-            'limit': limit,
-            'offset': offset
-        }
-        
+    def pedir(n, offset):
+        # Corre en los hilos del executor: solo pide y devuelve, sin tocar estado compartido
+        print(f"   ↳ Petición página {n} (Offset: {offset})...")
         try:
-            response = requests.get(BASE_URL, params=params)
-            try:
-                data = response.json()
-            except:
-                print(f"❌ Error JSON en página {loop_count}.")
-                break
-                
-            if 'error' in data:
-                print(f"❌ API Error: {data['error']}")
-                # Si falla una página, salimos con lo que tengamos
-                break
-
-            # Obtenemos la lista de vuelos de esta página
-            batch = data.get('data', [])
-            todos_vuelos_raw.extend(batch)
-            
-            # Revisamos la paginación para saber si seguimos o paramos
-            pagination = data.get('pagination', {})
-            total_real = pagination.get('total', 0)
-            count_actual = pagination.get('count', 0)
-            
-            print(f"      ✅ Recibidos: {count_actual} | Acumulados: {len(todos_vuelos_raw)} | Total API: {total_real}")
+            return (n, offset) + pedir_pagina(sesion, offset, limit, cache)
+        except ValueError as e:
+            print(f"❌ Error JSON en página {n}.")
+            error = e
+        except Exception as e:
+            print(f"❌ Error de conexión en página {n}: {e}")
+            error = e
+        # Sin datos, pero las peticiones que llegaron a salir cuentan para la cuota
+        return n, offset, None, 0.0, "error", getattr(error, "peticiones", 0)
 
-            # Si hemos conseguido todos, o si la API no devuelve más, o llegamos al límite de seguridad
-            if len(todos_vuelos_raw) >= total_real or count_actual == 0 or loop_count >= max_loops:
-                break
-            
-            # Preparamos el offset para la siguiente vuelta
-            offset += limit
-            
-            # Pequeña pausa para no saturar si fuera necesario (opcional)
-            # time.sleep(0.5) 
+    def anotar(resultado):
+        # Hilo principal: contadores, cuota y latencias se agregan sin carreras
+        n, offset, data, latencia, origen, peticiones = resultado
+        contador["peticiones"] += peticiones
+        if cuota:
+            cuota.registrar(peticiones, desde_cache=int(origen == "cache"))
+        if data is None:
+            return None
+        latencias.append({"pagina": n, "offset": offset, "ms": round(latencia * 1000), "origen": origen})
+        if 'error' in data:
+            print(f"❌ API Error: {data['error']}")
+            return None
+        paginas[offset] = data.get('data', [])
+        pagination = data.get('pagination', {})
+        print(f"      ✅ Página {n}: {pagination.get('count', 0)} vuelos en {latencia * 1000:.0f} ms ({origen}) | Total API: {pagination.get('total', 0)}")
+        return data
 
-        except Exception as e:
-            print(f"❌ Error de conexión en loop: {e}")
-            break
+    primera = anotar(pedir(1, 0))
+    if primera:
+        pagination = primera.get('pagination', {})
+        total_real = pagination.get('total', 0)
+        if pagination.get('count', 0) and total_real > limit and max_loops > 1:
+            offsets = list(range(limit, total_real, limit))[:max_loops - 1]
+            if len(offsets) < -(-total_real // limit) - 1:
+                print(f"   ⚠️ Límite de {max_loops} peticiones: se quedan {total_real - (len(offsets) + 1) * limit} vuelos sin pedir.")
+            with ThreadPoolExecutor(max_workers=max(concurrencia, 1)) as executor:
+                for resultado in executor.map(pedir, range(2, len(offsets) + 2), offsets):
+                    anotar(resultado)
 
-    # --- PROCESAMIENTO DE DATOS (YA CON TODA LA LISTA COMPLETA) ---
-    print(f"✨ Procesando {len(todos_vuelos_raw)} vuelos totales...")
+    todos_vuelos_raw = [v for offset in sorted(paginas) for v in paginas[offset]]
+    if latencias:
+        ms = sorted(l["ms"] for l in latencias)
+        print(f"   ⏱️ {len(ms)} páginas | latencia mediana {ms[len(ms) // 2]} ms | máx {ms[-1]} ms")
+    return todos_vuelos_raw, contador["peticiones"], sorted(latencias, key=lambda l: l["pagina"])
 
+# =============================================================================
+# 2. PROCESAMIENTO (TABLA COLUMNAR, VER agregacion_vuelos.py)
+# =============================================================================
+def procesar_vuelos_bucle(todos_vuelos_raw):
+    """Versión original, vuelo a vuelo. Se mantiene como referencia (AGREGACION_VECTORIZADA=0)."""
     kpis = {
         "t1": {"vuelos": 0, "pax": 0},
         "t2": {"vuelos": 0, "pax": 0},
@@ -179,6 +213,37 @@ def obtener_datos():
             continue
 
     lista_vuelos.sort(key=lambda x: x['hora'])
+    return kpis, evolucion_por_hora, lista_vuelos
+
+def procesar_vuelos(todos_vuelos_raw, minutos_bloque=MINUTOS_GRAFICA):
+    """Devuelve (kpis, evolución por franja, lista de vuelos ordenada por hora)."""
+    if not AGREGACION_VECTORIZADA:
+        return procesar_vuelos_bucle(todos_vuelos_raw)
+    tabla = agregacion_vuelos.normalizar_vuelos(todos_vuelos_raw)
+    return (agregacion_vuelos.kpis_por_terminal(tabla),
+            agregacion_vuelos.evolucion(tabla, minutos_bloque),
+            agregacion_vuelos.lista_vuelos(tabla))
+
+def obtener_datos():
+    print("📡 Escaneando radar iTaxiBcn (Modo Paginación Activado)...")
+    
+    if not API_KEY:
+        print("❌ ERROR: No hay API_KEY configurada.")
+        sys.exit(1)
+
+    cuota = LibroCuota()
+    max_loops = cuota.plan(MAX_LOOPS) # Rechaza (0) o rebaja la ejecución si el mes va justo
+    if not max_loops:
+        print("⏭️ Sin cuota este mes: se mantiene el data.json actual.")
+        sys.exit(0)
+    todos_vuelos_raw, loop_count, _ = descargar_vuelos(max_loops=max_loops, cache=CacheHTTP() if USAR_CACHE else None, cuota=cuota)
+    cuota.cerrar_ejecucion()
+    print(f"      Acumulados: {len(todos_vuelos_raw)} con {loop_count} peticiones reales a la API")
+
+    # --- PROCESAMIENTO DE DATOS (YA CON TODA LA LISTA COMPLETA) ---
+    print(f"✨ Procesando {len(todos_vuelos_raw)} vuelos totales...")
+
+    kpis, evolucion_por_hora, lista_vuelos = procesar_vuelos(todos_vuelos_raw)
 
     resultado = {
         "meta": {
@@ -201,9 +266,8 @@ def obtener_datos():
 if __name__ == "__main__":
     datos = obtener_datos()
     if datos:
-        os.makedirs('public', exist_ok=True)
-        with open('public/data.json', 'w') as f:
-            json.dump(datos, f)
+        # Solo se reescribe si cambia algo más que meta.update_time (evita un commit por ejecución)
+        publicacion.escribir_si_cambia('public/data.json', datos, volatiles=publicacion.VOLATILES["data"])
         print("✅ Datos iTaxiBcn generados correctamente")
     else:
         sys.exit(1)
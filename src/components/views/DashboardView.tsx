@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import { RefreshCw, Plane, Train, Users, Clock, ChevronRight, TrendingUp, Calendar, Settings } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 import { useEvents } from "@/hooks/useEvents";
 import { useWaitingTimes, getZoneWaitingTime, getZoneTaxistasActivos } from "@/hooks/useWaitingTimes";
 import { useNavigate } from "react-router-dom";
@@ -109,8 +110,8 @@ export function DashboardView({ onTerminalClick, onViewAllFlights, onViewAllEven
 
   const fetchData = () => {
     Promise.all([
-      fetch("/vuelos.json?t=" + Date.now()).then(res => res.json()).catch(() => []),
-      fetch("/trenes_sants.json?t=" + Date.now()).then(res => res.json()).catch(() => []),
+      fetchFeed("vuelos", "/vuelos.json").catch(() => []),
+      fetchFeed("trenes_sants", "/trenes_sants.json").catch(() => []),
       fetch("/analisis_licencias_taxi.json?t=" + Date.now()).then(res => res.json()).catch(() => null)
     ]).then(([vuelosData, trenesData, licenciasData]) => {
       setVuelos(Array.isArray(vuelosData) ? vuelosData : []);
@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import { Plane, Clock, Users, ArrowDown, RefreshCw } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
 import { 
@@ -17,6 +18,7 @@ interface VueloRaw {
   sala: string;
   estado: string;
   dia_relativo: number;
+  pax?: number; // Estimado por scripts/modelo_pax.py (snapshots antiguos no lo traen)
 }
 
 // Función para parsear hora "HH:MM" a minutos del día
@@ -26,6 +28,10 @@ const parseHora = (hora: string): number => {
   return (h || 0) * 60 + (m || 0);
 };
 
+// Pax del scraper si viene; si no, la estimación fija de siempre por tipo de terminal
+const estimarPax = (vuelo: VueloRaw, type: 't1' | 't2' | 't2c' | 'puente'): number =>
+  vuelo.pax ?? (type === 'puente' ? 150 : type === 't2c' ? 180 : 200);
+
 // Determinar tipo de terminal basado en los datos reales del scraper
 const getTerminalType = (vuelo: VueloRaw): 't1' | 't2' | 't2c' | 'puente' => {
   const terminal = vuelo.terminal?.toUpperCase() || "";
@@ -76,8 +82,7 @@ export function FlightsView() {
   const [chartType, setChartType] = useState<"vuelos" | "pasajeros">("pasajeros");
 
   useEffect(() => {
-    fetch("/vuelos.json?t=" + Date.now())
-      .then((res) => res.json())
+    fetchFeed("vuelos", "/vuelos.json")
       .then((data) => {
         console.log("📡 FlightsView - Vuelos cargados:", data?.length || 0);
         setVuelos(Array.isArray(data) ? data : []);
@@ -133,7 +138,7 @@ export function FlightsView() {
   vuelosSorted.forEach(vuelo => {
     const type = getTerminalType(vuelo);
     terminalData[type].vuelos.push(vuelo);
-    const paxEstimado = type === 'puente' ? 150 : type === 't2c' ? 180 : 200;
+    const paxEstimado = estimarPax(vuelo, type);
     terminalData[type].pax += paxEstimado;
   });
 
@@ -154,7 +159,7 @@ export function FlightsView() {
   vuelosSorted.forEach(v => {
     const hora = parseInt(v.hora?.split(":")[0] || "0", 10);
     const type = getTerminalType(v);
-    const paxEstimado = type === 'puente' ? 150 : type === 't2c' ? 180 : 200;
+    const paxEstimado = estimarPax(v, type);
     if (hourlyGroups[hora]) {
       hourlyGroups[hora].vuelos += 1;
       hourlyGroups[hora].pax += paxEstimado;
@@ -309,7 +314,7 @@ export function FlightsView() {
               const termColor = terminalStats.find(t => t.id === termType)?.color || "#666";
               const codigoPrincipal = flight.vuelo?.split("/")[0]?.trim() || flight.vuelo;
               const origenCorto = flight.origen?.split("(")[0]?.trim() || flight.origen;
-              const paxEstimado = termType === 'puente' ? 150 : termType === 't2c' ? 180 : 200;
+              const paxEstimado = estimarPax(flight, termType);
               
               return (
                 <div key={idx} className="flex flex-col md:flex-row md:items-center gap-3 md:gap-6 p-4 md:p-6 hover:bg-accent/30 transition-colors">
@@ -1,6 +1,7 @@
 import { useState, useEffect, useMemo } from "react";
 import { ArrowLeft, Plane, RefreshCw, Flame, Clock, ChevronDown, Globe } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 import { Accordion, AccordionContent, AccordionItem, AccordionTrigger } from "@/components/ui/accordion";
 
 interface VueloRaw {
@@ -95,8 +96,7 @@ export function FullDayView({ onBack }: FullDayViewProps) {
   const [lastUpdate, setLastUpdate] = useState<string>("");
 
   useEffect(() => {
-    fetch("/vuelos.json?t=" + Date.now())
-      .then((res) => res.json())
+    fetchFeed("vuelos", "/vuelos.json")
       .then((data) => {
         if (Array.isArray(data)) {
           setVuelos(data);
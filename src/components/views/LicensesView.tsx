@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import { TrendingUp, TrendingDown, RefreshCw, Info, AlertCircle, Tag, BarChart3, Calendar, Activity, Car } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 import { Badge } from "@/components/ui/badge";
 import { AreaChart, Area, XAxis, YAxis, Tooltip, ResponsiveContainer, BarChart, Bar, Cell, LabelList } from "recharts";
 
@@ -73,7 +74,7 @@ export function LicensesView() {
 
   useEffect(() => {
     Promise.all([
-      fetch("/web_feed.json?t=" + Date.now()).then(res => res.json()),
+      fetchFeed<WebFeedData>("web_feed", "/web_feed.json"),
       fetch("/history_stats.csv?t=" + Date.now()).then(res => res.text())
     ])
       .then(([jsonData, csvText]) => {
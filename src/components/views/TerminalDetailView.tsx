@@ -1,6 +1,7 @@
 import { useState, useEffect, useMemo } from "react";
 import { Plane, Clock, ArrowLeft, RefreshCw, Flame, Globe } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 import { Button } from "@/components/ui/button";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, Cell, ReferenceLine, LabelList } from "recharts";
 
@@ -107,8 +108,7 @@ export function TerminalDetailView({ terminalId, onBack }: TerminalDetailViewPro
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetch("/vuelos.json?t=" + Date.now())
-      .then((res) => res.json())
+    fetchFeed("vuelos", "/vuelos.json")
       .then((data) => {
         setVuelos(Array.isArray(data) ? data : []);
         setLoading(false);
@@ -1,6 +1,7 @@
 import { useState, useEffect, useMemo } from "react";
 import { ArrowLeft, Train, Clock, MapPin, RefreshCw } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 
 interface TrenSants {
   hora: string;
@@ -89,8 +90,7 @@ export function TrainsByCityView({ city, onBack }: TrainsByCityViewProps) {
   const [lastUpdate, setLastUpdate] = useState<string>("");
 
   useEffect(() => {
-    fetch("/trenes_sants.json?t=" + Date.now())
-      .then(res => res.json())
+    fetchFeed("trenes_sants", "/trenes_sants.json")
       .then((data: TrenSants[]) => {
         // Eliminar duplicados
         const uniqueTrenes = data.filter((tren, index, self) =>
@@ -1,6 +1,7 @@
 import { useState, useEffect, useMemo } from "react";
 import { ArrowLeft, Train, RefreshCw, Clock, MapPin } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 
 interface TrenSants {
   hora: string;
@@ -83,8 +84,7 @@ export function TrainsByOperatorView({ operator, onBack }: TrainsByOperatorViewP
   const [lastUpdate, setLastUpdate] = useState<string>("");
 
   useEffect(() => {
-    fetch("/trenes_sants.json?t=" + Date.now())
-      .then(res => res.json())
+    fetchFeed("trenes_sants", "/trenes_sants.json")
       .then((data: TrenSants[] | { trenes: TrenSants[] }) => {
         const trenesData = Array.isArray(data) ? data : data.trenes || [];
         const uniqueTrenes = trenesData.filter((tren, index, self) =>
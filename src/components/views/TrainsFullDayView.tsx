@@ -1,6 +1,7 @@
 import { useState, useEffect, useMemo } from "react";
 import { ArrowLeft, Train, RefreshCw, Flame, Clock, MapPin, ChevronRight } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 
 interface TrenSants {
   hora: string;
@@ -99,8 +100,7 @@ export function TrainsFullDayView({ onBack, onCityClick, onOperatorClick }: Trai
   const [fileUpdateTime, setFileUpdateTime] = useState<string>("");
 
   useEffect(() => {
-    fetch("/trenes_sants.json?t=" + Date.now())
-      .then(res => res.json())
+    fetchFeed("trenes_sants", "/trenes_sants.json")
       .then((data: TrenSants[] | { trenes: TrenSants[], meta?: { update_time?: string } }) => {
         let trenesData: TrenSants[];
         if (Array.isArray(data)) {
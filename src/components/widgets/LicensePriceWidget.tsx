@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { TrendingUp, TrendingDown, ChevronRight } from "lucide-react";
 import { AreaChart, Area, XAxis, YAxis, ResponsiveContainer } from "recharts";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 
 interface WebFeedData {
   ticker: {
@@ -56,7 +57,7 @@ export function LicensePriceWidget({ onClick }: LicensePriceWidgetProps) {
 
   useEffect(() => {
     Promise.all([
-      fetch("/web_feed.json?t=" + Date.now()).then(res => res.json()),
+      fetchFeed<WebFeedData>("web_feed", "/web_feed.json"),
       fetch("/history_stats.csv?t=" + Date.now()).then(res => res.text())
     ])
       .then(([jsonData, csvText]) => {
@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import { Train, Clock, MapPin, Calendar, RefreshCw } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { fetchFeed } from "@/lib/feeds";
 
 interface TrenSants {
   hora: string;
@@ -62,8 +63,7 @@ export function TrainsWidget({ onViewFullDay }: TrainsWidgetProps) {
 
   useEffect(() => {
     const fetchTrenes = () => {
-      fetch("/trenes_sants.json?t=" + Date.now())
-        .then(res => res.json())
+      fetchFeed("trenes_sants", "/trenes_sants.json")
         .then((data: TrenSants[]) => {
           // Eliminar duplicados (mismo hora + tren)
           const uniqueTrenes = data.filter((tren, index, self) =>
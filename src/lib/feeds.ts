@@ -0,0 +1,128 @@
+// Descarga de feeds publicados por scripts/publicacion.py.
+// Solo el manifiesto del feed se pide siempre; el feed se sirve desde caché local si el hash
+// no ha cambiado, se parchea con el delta si tenemos la versión anterior, y si no se baja
+// el fichero con hash (inmutable, así que el navegador/CDN lo puede cachear).
+
+interface FeedEntry {
+  hash: string;
+  archivo: string;
+  clave: string[] | null;
+  delta?: string;
+  delta_desde?: string;
+}
+
+interface FeedDelta {
+  desde: string;
+  hasta: string;
+  cambios: Record<string, unknown>;
+  eliminados: string[];
+  orden?: string[];
+}
+
+interface CachedFeed {
+  hash: string;
+  data: unknown;
+}
+
+const FEEDS_BASE = "/feeds";
+const CACHE_PREFIX = "itaxi_feed_";
+
+async function fetchManifest(nombre: string): Promise<FeedEntry | undefined> {
+  // Un manifiesto por feed (~300 bytes); es lo único que se pide siempre sin caché
+  const res = await fetch(`${FEEDS_BASE}/${nombre}.manifest.json?t=${Date.now()}`);
+  if (!res.ok) return undefined;
+  return res.json();
+}
+
+function readCache(nombre: string): CachedFeed | null {
+  try {
+    const raw = localStorage.getItem(CACHE_PREFIX + nombre);
+    return raw ? JSON.parse(raw) : null;
+  } catch {
+    return null;
+  }
+}
+
+function writeCache(nombre: string, hash: string, data: unknown) {
+  try {
+    localStorage.setItem(CACHE_PREFIX + nombre, JSON.stringify({ hash, data }));
+  } catch {
+    // Sin espacio en localStorage: seguimos sin caché
+  }
+}
+
+// Misma clave que publicacion.claves_registros: "campo1|campo2", repetidas numeradas con #n
+function recordKeys(records: Record<string, unknown>[], campos: string[]): string[] {
+  const seen: Record<string, number> = {};
+  return records.map((r) => {
+    const base = campos.map((c) => (r[c] === null || r[c] === undefined ? "" : String(r[c]))).join("|");
+    const n = seen[base] ?? 0;
+    seen[base] = n + 1;
+    return n === 0 ? base : `${base}#${n}`;
+  });
+}
+
+function applyDelta(data: unknown, delta: FeedDelta, campos: string[] | null): unknown | null {
+  if (Array.isArray(data) && campos) {
+    const previous = new Map<string, unknown>();
+    recordKeys(data, campos).forEach((k, i) => previous.set(k, data[i]));
+    const removed = new Set(delta.eliminados);
+    const orden = delta.orden ?? [
+      ...[...previous.keys()].filter((k) => !removed.has(k)),
+      ...Object.keys(delta.cambios).filter((k) => !previous.has(k)),
+    ];
+    const merged = new Map(previous);
+    Object.entries(delta.cambios).forEach(([k, v]) => merged.set(k, v));
+    if (orden.some((k) => !merged.has(k))) return null;
+    return orden.map((k) => merged.get(k));
+  }
+  if (data && typeof data === "object" && !Array.isArray(data)) {
+    const result: Record<string, unknown> = { ...(data as Record<string, unknown>), ...delta.cambios };
+    delta.eliminados.forEach((k) => delete result[k]);
+    return result;
+  }
+  return null;
+}
+
+async function fetchJson(url: string): Promise<unknown> {
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`${url} ${res.status}`);
+  return res.json();
+}
+
+/**
+ * Devuelve el contenido del feed `nombre` (vuelos, trenes_sants, web_feed...).
+ * Si no hay manifiesto (despliegue antiguo) cae a `legacyPath` como antes.
+ * T = any como res.json(): cada vista valida la forma de los datos como ya hacía.
+ */
+export async function fetchFeed<T = any>(nombre: string, legacyPath: string): Promise<T> {
+  let entry: FeedEntry | undefined;
+  try {
+    entry = await fetchManifest(nombre);
+  } catch {
+    entry = undefined;
+  }
+  if (!entry) {
+    return (await fetchJson(`${legacyPath}?t=${Date.now()}`)) as T;
+  }
+
+  const cached = readCache(nombre);
+  if (cached?.hash === entry.hash) return cached.data as T;
+
+  if (cached && entry.delta && entry.delta_desde === cached.hash) {
+    try {
+      const delta = (await fetchJson(`${FEEDS_BASE}/${entry.delta}?h=${entry.hash}`)) as FeedDelta;
+      const patched = delta.desde === cached.hash ? applyDelta(cached.data, delta, entry.clave) : null;
+      if (patched !== null) {
+        writeCache(nombre, entry.hash, patched);
+        return patched as T;
+      }
+    } catch {
+      // Delta no disponible: descarga completa
+    }
+  }
+
+  const data = await fetchJson(`${FEEDS_BASE}/${entry.archivo}`);
+  writeCache(nombre, entry.hash, data);
+  return data as T;
+}
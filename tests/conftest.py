@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los scripts se ejecutan como `python scripts/x.py` y se importan entre sí por nombre
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
@@ -0,0 +1,64 @@
+import pytest
+
+import adif_scrap
+
+URL = "https://adif.test/sants"
+
+
+def pagina(filas, boton):
+    trs = "".join(f"<tr><td>{h}</td><td>MADRID</td><td>AVE {h.replace(':', '')}</td><td>5</td></tr>" for h in filas)
+    return f"""<html><body>
+<form method="post" action="{URL}"><div id="tab-llegadas">
+  <input type="radio" name="tipo" value="cercanias"><input type="radio" name="tipo" value="ld">
+  <input type="submit" name="consultar" value="Consultar"></div>
+  <table id="horas-trenes-estacion-llegadas"><tbody>{trs}</tbody></table>
+  <div id="tabla-horas-trenes-llegadas-load-more">{boton}</div>
+</form></body></html>"""
+
+
+class Respuesta:
+    def __init__(self, html):
+        self.content = html.encode()
+        self.url = URL
+
+    def raise_for_status(self):
+        pass
+
+
+class SesionFalsa:
+    """GET = portada; cada POST del formulario devuelve la siguiente página de la tabla."""
+
+    def __init__(self, paginas):
+        self.paginas = list(paginas)
+
+    def get(self, url, **kwargs):
+        return Respuesta(pagina([], ""))
+
+    def post(self, url, data=None, **kwargs):
+        return Respuesta(self.paginas.pop(0))
+
+
+HORAS = [f"{h:02d}:{m:02d}" for h in range(8, 20) for m in (0, 30)]
+CARGAR_MAS = '<input type="submit" name="mas" value="Cargar más">'
+
+
+def test_http_acepta_la_tabla_cuando_el_boton_queda_deshabilitado():
+    sesion = SesionFalsa([pagina(HORAS[:12], CARGAR_MAS),
+                          pagina(HORAS, CARGAR_MAS.replace("<input", "<input disabled"))])
+    datos = adif_scrap.obtener_trenes_http(sesion)
+    assert [t["hora"] for t in datos] == HORAS
+
+
+@pytest.mark.parametrize("boton", ["", CARGAR_MAS.replace("<input", '<input style="display: none"')])
+def test_http_rechaza_la_primera_pagina_sin_final_claro(boton):
+    # Más de MIN_TRENES_HTTP trenes, pero sin botón (o oculto) no sabemos si es el día entero
+    sesion = SesionFalsa([pagina(HORAS[:12], boton)])
+    with pytest.raises(ValueError):
+        adif_scrap.obtener_trenes_http(sesion)
+
+
+def test_http_rechaza_la_tabla_si_no_deja_de_paginar(monkeypatch):
+    monkeypatch.setattr(adif_scrap, "MAX_PAGINAS_HTTP", 3)
+    sesion = SesionFalsa([pagina(HORAS[:12 + 2 * i], CARGAR_MAS) for i in range(4)])
+    with pytest.raises(ValueError):
+        adif_scrap.obtener_trenes_http(sesion)
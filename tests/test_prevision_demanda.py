@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from prevision_demanda import DESFASE, FRANJAS_DIA, ZONAS, ZONA_HORARIA, cargar_historico, guardar_historico, prever
+
+T2 = ZONAS.index("t2")
+
+
+def vuelo(hora, pax=100):
+    return {"hora": hora, "dia_relativo": 0, "vuelo": "VY1234", "origen": "LONDRES (LGW)", "terminal": "T2", "estado": "", "pax": pax}
+
+
+def historico_vacio():
+    return (np.zeros(0, dtype=np.int64), np.zeros((0, len(ZONAS), FRANJAS_DIA), dtype=np.float32), None)
+
+
+def test_el_reparto_de_lo_ya_llegado_se_conserva_entre_ejecuciones():
+    # 09:50 (franja 39): el vuelo de las 09:55 está en el snapshot
+    _, historico = prever([vuelo("09:55")], [], ahora=datetime(2026, 10, 19, 9, 50, tzinfo=ZONA_HORARIA),
+                          historico=historico_vacio())
+    # 10:05 (franja 40): ya ha aterrizado y el snapshot incremental no lo trae
+    datos, (dias, curvas, _) = prever([vuelo("10:40", pax=50)], [], ahora=datetime(2026, 10, 19, 10, 5, tzinfo=ZONA_HORARIA),
+                                      historico=historico)
+
+    reparto = np.array(DESFASE["vuelo"])
+    esperado = np.zeros(FRANJAS_DIA)
+    esperado[39:43] += 100 * reparto # 09:55
+    esperado[42:46] += 50 * reparto  # 10:40
+    assert curvas[-1, T2] == pytest.approx(esperado)
+    # La previsión publicada desde la franja actual también cuenta lo que sigue saliendo del avión
+    assert datos["zonas"]["t2"]["programado"][:3] == [45, 30, 18] # 10 + 7.5 en la 10:30
+
+
+def test_el_reparto_de_ayer_cae_en_las_primeras_franjas_de_hoy(tmp_path):
+    _, historico = prever([vuelo("23:55")], [], ahora=datetime(2026, 10, 19, 23, 50, tzinfo=ZONA_HORARIA),
+                          historico=historico_vacio())
+    ruta = str(tmp_path / "historico.npz")
+    guardar_historico(*historico, ruta=ruta)
+
+    _, (dias, curvas, _) = prever([], [], ahora=datetime(2026, 10, 20, 0, 5, tzinfo=ZONA_HORARIA),
+                                  historico=cargar_historico(ruta))
+    assert dias[-1] == datetime(2026, 10, 20).toordinal()
+    assert curvas[-1, T2, :3] == pytest.approx(100 * np.array(DESFASE["vuelo"][1:]))
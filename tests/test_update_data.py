@@ -0,0 +1,55 @@
+import pytest
+
+import stub_aviationstack
+import update_data
+from sesion_http import crear_sesion
+
+TOTAL = 450
+LIMITE = 100
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    # 30% de 503: la sesión los reintenta y las páginas tienen que acabar llegando todas
+    servidor = stub_aviationstack.arrancar_en_segundo_plano(total=TOTAL, fallos=0.3, latencia=0.01)
+    monkeypatch.setattr(update_data, "BASE_URL", servidor.url)
+    monkeypatch.setattr(update_data, "API_KEY", "stub")
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.mark.parametrize("concurrencia", [1, 4])
+def test_paginas_en_orden_sin_huecos_ni_duplicados(stub, concurrencia):
+    sesion = crear_sesion(reintentos=10, backoff=0.001, pool=concurrencia)
+    vuelos, peticiones, latencias = update_data.descargar_vuelos(
+        sesion=sesion, limit=LIMITE, concurrencia=concurrencia, max_loops=10)
+
+    esperados = [v["flight"]["iata"] for v in stub_aviationstack.generar_vuelos(TOTAL)]
+    recibidos = [v["flight"]["iata"] for v in vuelos]
+    assert len(recibidos) == len(set(recibidos)) == TOTAL
+    assert recibidos == esperados
+    assert [l["pagina"] for l in latencias] == list(range(1, TOTAL // LIMITE + 2))
+    assert peticiones >= len(latencias)
+
+
+@pytest.mark.parametrize("usar_cache", [False, True])
+def test_cuota_cuenta_los_reintentos(stub, tmp_path, usar_cache):
+    sesion = crear_sesion(reintentos=10, backoff=0.001, pool=4)
+    cuota = update_data.LibroCuota(ruta=str(tmp_path / "cuota.json"))
+    cache = update_data.CacheHTTP(directorio=str(tmp_path / "cache")) if usar_cache else None
+    _, peticiones, _ = update_data.descargar_vuelos(sesion=sesion, limit=LIMITE, cache=cache, cuota=cuota)
+
+    assert peticiones == cuota.estado["usadas"] == stub.estado["peticiones"]
+
+
+def test_cuota_cuenta_peticiones_fallidas(monkeypatch, tmp_path):
+    # Puerto cerrado: todas las conexiones fallan y la excepción sale tras agotar los reintentos
+    monkeypatch.setattr(update_data, "BASE_URL", "http://127.0.0.1:9/v1/flights")
+    monkeypatch.setattr(update_data, "API_KEY", "stub")
+    sesion = crear_sesion(reintentos=2, backoff=0.001)
+    cuota = update_data.LibroCuota(ruta=str(tmp_path / "cuota.json"))
+    vuelos, peticiones, _ = update_data.descargar_vuelos(sesion=sesion, cuota=cuota)
+
+    assert vuelos == []
+    assert peticiones == cuota.estado["usadas"] == 3